@@ -1,6 +1,28 @@
-from .agent import Agent
-from .agent import IAgent
-from .prompt_agent import PromptAgent
-from .agent import FINAL_ANSWER
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = [name for name in globals() if not name.startswith("_")]
+if TYPE_CHECKING:
+    from .agent import Agent, FINAL_ANSWER
+    from .interface.agent import IAgent
+    from .prompt_agent import PromptAgent
+
+_exports = {
+    "Agent": ".agent",
+    "IAgent": ".interface.agent",
+    "PromptAgent": ".prompt_agent",
+    "FINAL_ANSWER": ".agent",
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_exports])
@@ -0,0 +1,90 @@
+import json
+from typing import List
+from pydantic import ValidationError
+
+from type import ChatAction
+
+
+class ActionStreamParser:
+    """
+    Scan the streamed JSON response of the PromptAgent and return the `action` object as soon as its closing brace
+    arrives, while the model may still be emitting the other fields.
+
+    Only the structure of the top-level object is tracked (string and escape state, nesting depth and the current
+    key), so each character is visited once and nothing is parsed until the action object is complete.
+
+    Example:
+        parser = ActionStreamParser()
+        for token in stream:
+            action = parser.feed(token)
+            if action:
+                ...  # dispatch the tool
+    """
+
+    def __init__(self, key: str = "action"):
+        self._key = key
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._last_string = None
+        self._current_key = None
+        self._capture: List[str] | None = None
+        self.done = False
+
+    def feed(self, token: str) -> ChatAction | None:
+        """
+        Feed the next piece of the response.
+
+        Returns:
+            ChatAction: The action once its object is complete and carries `name`, `args` and `edit`, otherwise None.
+        """
+        if self.done:
+            return None
+        for char in token:
+            if self._capture is not None:
+                self._capture.append(char)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = "".join(self._string)
+                elif self._depth == 1:
+                    self._string.append(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string = []
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 2 and char == "{" and self._current_key == self._key:
+                    self._capture = [char]
+            elif char in "}]":
+                self._depth -= 1
+                if self._capture is not None and self._depth == 1:
+                    return self._action("".join(self._capture))
+            elif self._depth == 1 and char == ":":
+                self._current_key = self._last_string
+            elif self._depth == 1 and char == ",":
+                self._current_key = None
+        return None
+
+    def _action(self, content: str) -> ChatAction | None:
+        self.done = True
+        self._capture = None
+        try:
+            action = json.loads(content)
+        except json.decoder.JSONDecodeError:
+            return None
+        if not all(field in action for field in ("name", "args", "edit")):
+            return None
+        try:
+            return ChatAction.model_validate(action)
+        except ValidationError:
+            return None
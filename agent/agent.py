@@ -1,5 +1,8 @@
 import os
+import inspect
 import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union, Tuple, List, Protocol
 from openai.types.chat import (
     ChatCompletionMessage,
@@ -14,12 +17,17 @@ from openai.types.chat import (
 from type import StatusCode, ActionPermission
 
 from memory import ChatMemory, ChatBufferMemory
+from observation import ObservationCompactor, BlobStore
+import tracing
 from agent.interface.chat import IChat
 from agent.interface.agent import IAgent
-from agent.chat.terminal_chat import TerminalChat
+from agent.chat.common import run_async
+from tool.capture import submit_relayed, relayed_result
 
 current_dir = os.path.dirname(os.path.realpath(__file__))
 FINAL_ANSWER = "ANSWER:"
+# the tool paging the stored observations, its pages are saved as they are
+READ_OBSERVATION = BlobStore.read_observation.__name__
 
 
 class Agent(IAgent):
@@ -34,13 +42,24 @@ class Agent(IAgent):
         memory: ChatMemory = None,
         chat_console: IChat | None = None,
         max_iter=6,
-        max_obs=200,  # max observation content!
+        max_obs=None,  # max observation tokens saved into the memory, the full ones are kept in the blob_store
         is_terminal=(lambda content: content is not None and FINAL_ANSWER in content),
         response_model=None,
+        max_tool_workers=1,  # run the tool calls of one turn concurrently when > 1
+        stream=False,  # render the tokens as they arrive by the client.stream
+        tool_cache=None,  # cache.ToolCache serving the repeated idempotent tool calls
+        compactor: ObservationCompactor | None = None,  # compact the observations, default by the max_obs
+        blob_store: BlobStore | None = None,  # keep the full observations the compaction cut, paged by read_observation
     ):
+        if stream and not callable(getattr(client, "stream", None)):
+            # e.g. the async clients, their responses are awaited whole
+            raise ValueError(f"the {type(client).__name__} can't stream the responses, set stream=False")
         self._name = name
         self._client = client
         self._system = system
+        blob_store = default_blob_store(max_obs, compactor, blob_store)
+        if blob_store is not None:
+            tools = [*tools, blob_store.read_observation]
         # registered the tools for the agent to be invoked
         self._functions = self.register_actions(tools)
         # the tools for model
@@ -50,20 +69,35 @@ class Agent(IAgent):
         self._memory = (
             memory if memory is not None else ChatBufferMemory(memory_id=name, size=10)
         )
-        self.chat_console = (
-            chat_console
-            if chat_console is not None
-            else TerminalChat(name, self._memory)
-        )
+        if chat_console is None:
+            # rich is loaded only by the agent rendering on the terminal
+            from agent.chat.terminal_chat import TerminalChat
+
+            chat_console = TerminalChat(name, self._memory)
+        self.chat_console = chat_console
         # self.avatar = self._console.avatar
         self._max_iter = max_iter
         self._max_obs = max_obs
+        if compactor is None:
+            compactor = ObservationCompactor(max_obs, blob_store=blob_store)
+        elif blob_store is not None:
+            # the read_observation tool is registered, so the compactor must keep the outputs it pages
+            compactor.attach(blob_store)
+        self._compactor = compactor
+        # the bytes and tokens saved by each step on the last observation
+        self.compaction_reports = []
+        self._iteration = 0  # the model requests in the current run, recorded on the spans
         self._is_terminal = is_terminal
 
         self.chat_console.system(self._system)
 
         self._response_model = response_model
 
+        self._max_tool_workers = max_tool_workers
+        self._tool_executor: ThreadPoolExecutor | None = None
+        self._stream = stream
+        self._tool_cache = tool_cache
+
     @property
     def name(self):
         return self._name
@@ -73,17 +107,54 @@ class Agent(IAgent):
         return self.chat_console.avatar
 
     def messages(self) -> List[ChatCompletionMessageParam]:
-        return self._memory.get(None)
+        return list(self._memory.get(None))
 
     # Give the assistant response based on the memory messages
     def _thinking(self) -> ChatCompletionAssistantMessageParam:
-        new_messages = self._memory.get(self._system)
-        assistant_param = self.chat_console.assistant_thinking(
-            self._client, new_messages, self._tools, self._response_model
+        self._iteration += 1
+        with tracing.span(
+            "agent.think", agent=self._name, iteration=self._iteration
+        ) as span:
+            # a copy, the stream and the client may read the messages after the memory has moved on
+            new_messages = list(self._memory.get(self._system))
+            if self._stream:
+                assistant_param = self.chat_console.assistant_streaming(
+                    self._open_stream, new_messages, self._tools, self._response_model
+                )
+            else:
+                assistant_param = self.chat_console.assistant_thinking(
+                    self._client, new_messages, self._tools, self._response_model
+                )
+                span.set_attributes(**self._usage_attributes())
+            self._memory.add(assistant_param)
+        return assistant_param
+
+    # open the client.ChatStream of the completion, the subclass can listen to the tokens before they are rendered
+    def _open_stream(self, *args):
+        stream = self._client.stream(*args)
+        span = tracing.current_span()
+        stream.add_done_callback(
+            lambda _: span.set_attributes(**tracing.usage_attributes(stream.usage))
         )
-        self._memory.add(assistant_param)
+        return stream
+
+    async def _athinking(self) -> ChatCompletionAssistantMessageParam:
+        self._iteration += 1
+        with tracing.span(
+            "agent.think", agent=self._name, iteration=self._iteration
+        ) as span:
+            new_messages = list(self._memory.get(self._system))
+            assistant_param = await self.chat_console.async_assistant_thinking(
+                self._client, new_messages, self._tools, self._response_model
+            )
+            span.set_attributes(**self._usage_attributes())
+            self._memory.add(assistant_param)
         return assistant_param
 
+    # the usage of the last request, the concurrent sessions sharing a client may see each other's
+    def _usage_attributes(self) -> dict:
+        return tracing.usage_attributes(getattr(self._client, "last_usage", None))
+
     def chatbot(self):
         print()
         message = self.chat_console.next_message(self._memory, tools=self._tools)
@@ -93,6 +164,17 @@ class Agent(IAgent):
         self,
         message: Union[ChatCompletionMessageParam, str],
     ) -> ChatCompletionAssistantMessageParam | None:
+        self._iteration = 0
+        try:
+            with tracing.span("agent.run", agent=self._name):
+                return self._run(message)
+        finally:
+            self._shutdown_tool_pool()
+
+    def _run(
+        self,
+        message: Union[ChatCompletionMessageParam, str],
+    ) -> ChatCompletionAssistantMessageParam | None:
 
         # 1. Inputting message into the memory
         is_user_input = self._input(message)
@@ -133,40 +215,93 @@ class Agent(IAgent):
         if i == self._max_iter:
             self.chat_console.error(f"Reached maximum iterations: {self._max_iter}!\n")
 
+    # the same loop as run, but the model requests and tool calls are awaited, so the sessions can share one event loop
+    async def arun(
+        self,
+        message: Union[ChatCompletionMessageParam, str],
+    ) -> ChatCompletionAssistantMessageParam | None:
+        self._iteration = 0
+        try:
+            with tracing.span("agent.run", agent=self._name):
+                return await self._arun(message)
+        finally:
+            self._shutdown_tool_pool()
+            await self._aclose_client()
+
+    async def _arun(
+        self,
+        message: Union[ChatCompletionMessageParam, str],
+    ) -> ChatCompletionAssistantMessageParam | None:
+
+        is_user_input = self._input(message)
+        assistant_message = await self._athinking()
+        status, result = await self._aacting()
+        i = 0
+        while i < self._max_iter:
+            if status == StatusCode.ANSWER:
+                if not self._user_input:
+                    self._memory.clear()
+                    return ChatCompletionAssistantMessageParam(
+                        name=self._name, content=result, role="assistant"
+                    )
+                message = await asyncio.to_thread(
+                    self.chat_console.next_message, self._memory, tools=self._tools
+                )
+                if message:
+                    i = 0
+                    is_user_input = self._input(message)
+                else:
+                    return result
+            elif status == StatusCode.OBSERVATION:
+                print()
+            elif status == StatusCode.ACTION_FORBIDDEN:
+                return ChatCompletionUserMessageParam(
+                    role="user", content=result, name=self.name
+                )
+            else:
+                self.chat_console.error(result)
+                return ChatCompletionUserMessageParam(
+                    role="user", content=result, name=self.name
+                )
+            assistant_message = await self._athinking()
+            status, result = await self._aacting()
+            i += 1
+        if i == self._max_iter:
+            self.chat_console.error(f"Reached maximum iterations: {self._max_iter}!\n")
+
     # answer or observation
     def _acting(self) -> Tuple[StatusCode, str]:
-        chat_assistant_param = self._memory.get(None)[-1]
+        with tracing.span(
+            "agent.act", agent=self._name, iteration=self._iteration
+        ) as span:
+            status, result = self._tool_acting()
+            span.set_attribute("status", status.name)
+        return status, result
+
+    def _tool_acting(self) -> Tuple[StatusCode, str]:
+        chat_assistant_param = self._memory.last()
         if chat_assistant_param.get("tool_calls"):
-            for tool_call in chat_assistant_param.get("tool_calls"):
-                func_name = tool_call.function.name
-                func_args = tool_call.function.arguments
-                if isinstance(func_args, str):
-                    func_args = json.loads(tool_call.function.arguments)
+            tool_calls = chat_assistant_param.get("tool_calls")
+            if self._max_tool_workers > 1 and len(tool_calls) > 1:
+                return self._concurrent_acting(tool_calls)
+            observed = set()
+            for tool_call in tool_calls:
+                func_name, func_args = self._tool_call_args(tool_call)
 
                 # validate the tool
                 if not func_name in self._functions:
-                    return StatusCode.ERROR, f"The '{func_name}' isn't registered!"
-
-                if not self.chat_console.before_action(
-                    self._action_permission,
-                    func_name,
-                    func_args,
-                    functions=self._functions,
-                ):
-                    tool_observation = ChatCompletionToolMessageParam(
-                        tool_call_id=tool_call.id,
-                        content=f"Action({func_name}: {tool_call.id}) are not allowed by the user.",
-                        role="tool",
-                    )
-                    self._memory.add(tool_observation)
-                    return (
-                        StatusCode.ANSWER,
-                        f"Action{func_name} are not allowed by the user.",
-                    )
+                    err_message = f"The '{func_name}' isn't registered!"
+                    self._skipped_observations(tool_calls, observed, err_message)
+                    return StatusCode.ERROR, err_message
+
+                if not self._before_action(func_name, func_args):
+                    return self._forbidden_action(tool_call.id, func_name, tool_calls, observed)
 
                 err_message = self._observation(tool_call.id, func_name, func_args)
                 if err_message is not None:
+                    self._skipped_observations(tool_calls, observed, err_message)
                     return StatusCode.ERROR, err_message
+                observed.add(tool_call.id)
             return StatusCode.OBSERVATION, "all tool calls were successful!"
         elif chat_assistant_param.get("content"):
             # if chat_message.content.startswith(FINAL_ANSWER):
@@ -180,43 +315,312 @@ class Agent(IAgent):
                 f"Invalid response message: {chat_assistant_param}",
             )
 
+    # approve the tool calls one by one, then invoke the approved calls together on the
+    # tool executor and save their observations in the original tool_call_id order
+    def _concurrent_acting(self, tool_calls) -> Tuple[StatusCode, str]:
+        err_message, approved_calls, forbidden_call = self._approve_tool_calls(
+            tool_calls
+        )
+        observed = set()
+        if err_message is not None:
+            self._skipped_observations(tool_calls, observed, err_message)
+            return StatusCode.ERROR, err_message
+
+        futures = [
+            submit_relayed(self._tool_pool(), self._tool(func_name), **func_args)
+            for _, func_name, func_args in approved_calls
+        ]
+
+        for (tool_call_id, func_name, func_args), future in zip(
+            approved_calls, futures
+        ):
+            err_message = self._observation(
+                tool_call_id, func_name, func_args, future=future
+            )
+            if err_message is not None:
+                self._skipped_observations(tool_calls, observed, err_message)
+                return StatusCode.ERROR, err_message
+            observed.add(tool_call_id)
+
+        if forbidden_call is not None:
+            return self._forbidden_action(*forbidden_call, tool_calls, observed)
+        return StatusCode.OBSERVATION, "all tool calls were successful!"
+
+    async def _aacting(self) -> Tuple[StatusCode, str]:
+        with tracing.span(
+            "agent.act", agent=self._name, iteration=self._iteration
+        ) as span:
+            status, result = await self._tool_aacting()
+            span.set_attribute("status", status.name)
+        return status, result
+
+    async def _tool_aacting(self) -> Tuple[StatusCode, str]:
+        chat_assistant_param = self._memory.last()
+        tool_calls = chat_assistant_param.get("tool_calls")
+        if not tool_calls:
+            return self._tool_acting()  # answer or invalid response, nothing to await
+
+        if self._max_tool_workers <= 1 or len(tool_calls) == 1:
+            # approve, invoke and observe each call before the next one is asked, like the _tool_acting
+            observed = set()
+            for tool_call in tool_calls:
+                func_name, func_args = self._tool_call_args(tool_call)
+                if not func_name in self._functions:
+                    err_message = f"The '{func_name}' isn't registered!"
+                    self._skipped_observations(tool_calls, observed, err_message)
+                    return StatusCode.ERROR, err_message
+
+                if not await run_async(self._before_action, func_name, func_args):
+                    return self._forbidden_action(tool_call.id, func_name, tool_calls, observed)
+
+                try:
+                    result = await run_async(self._tool(func_name), **func_args)
+                except Exception as e:
+                    result = self._failed_observation(func_name, e)
+                err_message = await self._aobservation(
+                    tool_call.id, func_name, func_args, result
+                )
+                if err_message is not None:
+                    self._skipped_observations(tool_calls, observed, err_message)
+                    return StatusCode.ERROR, err_message
+                observed.add(tool_call.id)
+            return StatusCode.OBSERVATION, "all tool calls were successful!"
+
+        # the console asks for the permissions on a thread, the other sessions keep running meanwhile
+        err_message, approved_calls, forbidden_call = await run_async(
+            self._approve_tool_calls, tool_calls
+        )
+        observed = set()
+        if err_message is not None:
+            self._skipped_observations(tool_calls, observed, err_message)
+            return StatusCode.ERROR, err_message
+
+        # the approved tool calls run together bounded by the max_tool_workers
+        semaphore = asyncio.Semaphore(self._max_tool_workers)
+
+        async def invoke(func_name, func_args):
+            async with semaphore:
+                return await run_async(self._tool(func_name), **func_args)
+
+        results = await asyncio.gather(
+            *[invoke(func_name, func_args) for _, func_name, func_args in approved_calls],
+            return_exceptions=True,
+        )
+
+        for (tool_call_id, func_name, func_args), result in zip(
+            approved_calls, results
+        ):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, BaseException):
+                result = self._failed_observation(func_name, result)
+            err_message = await self._aobservation(
+                tool_call_id, func_name, func_args, result
+            )
+            if err_message is not None:
+                self._skipped_observations(tool_calls, observed, err_message)
+                return StatusCode.ERROR, err_message
+            observed.add(tool_call_id)
+
+        if forbidden_call is not None:
+            return self._forbidden_action(*forbidden_call, tool_calls, observed)
+        return StatusCode.OBSERVATION, "all tool calls were successful!"
+
+    # the exception raised by a tool is observed by the model instead of aborting the other calls and the run
+    def _failed_observation(self, func_name, error: BaseException) -> str:
+        return f"The '{func_name}' failed with {type(error).__name__}: {error}"
+
+    # validate and ask the permission for the tool calls in order, stop at the first forbidden one
+    def _approve_tool_calls(self, tool_calls):
+        approved_calls = []
+        for tool_call in tool_calls:
+            func_name, func_args = self._tool_call_args(tool_call)
+            if not func_name in self._functions:
+                return f"The '{func_name}' isn't registered!", approved_calls, None
+
+            if not self._before_action(func_name, func_args):
+                return None, approved_calls, (tool_call.id, func_name)
+            approved_calls.append((tool_call.id, func_name, func_args))
+        return None, approved_calls, None
+
+    # ask the console for the permission of the action, the span measures the time waiting for the user
+    def _before_action(self, func_name, func_args, func_edit=0) -> bool:
+        with tracing.span(
+            "agent.before_action", agent=self._name, tool=func_name
+        ) as span:
+            approved = self.chat_console.before_action(
+                self._action_permission,
+                func_name,
+                func_args,
+                func_edit=func_edit,
+                functions=self._functions,
+            )
+            span.set_attribute("approved", approved)
+        return approved
+
+    # the registered function, served from the tool cache if it's set
+    def _tool(self, func_name, func_edit=0):
+        func = self._functions[func_name]
+        if self._tool_cache is None:
+            return func
+        return self._tool_cache.wrap(func_name, func, func_edit=func_edit)
+
+    def _tool_pool(self) -> ThreadPoolExecutor:
+        if self._tool_executor is None:
+            self._tool_executor = ThreadPoolExecutor(
+                max_workers=self._max_tool_workers,
+                thread_name_prefix=f"{self._name}-tool",
+            )
+        return self._tool_executor
+
+    # the tool threads of a run are released once it returns, the next run starts a new pool
+    def _shutdown_tool_pool(self):
+        if self._tool_executor is not None:
+            self._tool_executor.shutdown(wait=True, cancel_futures=True)
+            self._tool_executor = None
+
+    def close(self):
+        """Release the tool executor, e.g. when the agent is interrupted outside the run."""
+        self._shutdown_tool_pool()
+
+    # the async client keeps its connection pool on the loop of the run, it's released with the run
+    async def _aclose_client(self):
+        close = getattr(self._client, "close", None)
+        if close is not None and inspect.iscoroutinefunction(close):
+            await close()
+
+    def _tool_call_args(self, tool_call: ChatCompletionMessageToolCall):
+        func_args = tool_call.function.arguments
+        if isinstance(func_args, str):
+            func_args = json.loads(tool_call.function.arguments)
+        return tool_call.function.name, func_args
+
+    def _forbidden_action(
+        self, tool_call_id, func_name, tool_calls=(), observed=()
+    ) -> Tuple[StatusCode, str]:
+        tool_observation = ChatCompletionToolMessageParam(
+            tool_call_id=tool_call_id,
+            content=f"Action({func_name}: {tool_call_id}) are not allowed by the user.",
+            role="tool",
+        )
+        self._memory.add(tool_observation)
+        self._skipped_observations(
+            tool_calls, {*observed, tool_call_id}, f"the action {func_name} was not allowed by the user"
+        )
+        return (
+            StatusCode.ANSWER,
+            f"Action{func_name} are not allowed by the user.",
+        )
+
+    # every tool call of the assistant message needs its tool message, or the next request is rejected by the provider,
+    # so the calls not observed after an early return are answered as skipped
+    def _skipped_observations(self, tool_calls, observed, reason: str):
+        for tool_call in tool_calls:
+            if tool_call.id in observed:
+                continue
+            self._memory.add(
+                ChatCompletionToolMessageParam(
+                    tool_call_id=tool_call.id,
+                    content=f"The '{tool_call.function.name}' was skipped: {reason}",
+                    role="tool",
+                )
+            )
+
     # save the observation into the memory, return error message
-    def _observation(self, tool_call_id, func_name, func_args) -> None | str:
+    def _observation(
+        self, tool_call_id, func_name, func_args, future=None
+    ) -> None | str:
         # invoke function
         # observation = self._functions[func_name](**func_args)
 
-        observation = self.chat_console.obs(self._functions[func_name], func_args)
+        tool = self._tool(func_name)
 
-        # The agent autonomously handles handoffs. https://cookbook.openai.com/examples/orchestrating_agents#executing-routines
-        if isinstance(observation, IAgent):
-            agent: Agent = observation
-            task: str = func_args["message"]
+        # the exception raised by the tool is observed by the model, like the awaited calls of the _tool_aacting
+        def func(**kwargs):
+            try:
+                if future is not None:  # the tool is already running on the tool executor
+                    return relayed_result(future)
+                return tool(**kwargs)
+            except Exception as e:
+                return self._failed_observation(func_name, e)
 
-            # self._console.delivery(self.name, agent.name, task)
-            agent_observation: ChatCompletionAssistantMessageParam = agent.run(
-                ChatCompletionUserMessageParam(
-                    role="user", content=task, name=self.name
-                )
-                # ChatCompletionUserMessageParam(role="user", content=task)
-            )
-            if not agent_observation:
-                return f"Agent({agent.name}) failed to handle the task: {task}"
-            is_user_input = self._input(agent_observation, agent.name, agent.avatar)
-            # self._console.delivery(observation, agent.name, self.name, agent.avatar)
-        else:  # default
-            # append the tool response: observation
-            tool_observation = ChatCompletionToolMessageParam(
-                tool_call_id=tool_call_id,
-                # tool_name=tool_call.function.name, # tool name is not supported by groq client now
-                content=f"{observation}",
-                role="tool",
+        with tracing.span("agent.observe", agent=self._name, tool=func_name):
+            observation = self.chat_console.obs(func, func_args)
+
+            # The agent autonomously handles handoffs. https://cookbook.openai.com/examples/orchestrating_agents#executing-routines
+            if isinstance(observation, IAgent):
+                agent: Agent = observation
+                task: str = func_args["message"]
+
+                # self._console.delivery(self.name, agent.name, task)
+                with tracing.span("agent.handoff", agent=self._name, to=agent.name):
+                    agent_observation: ChatCompletionAssistantMessageParam = agent.run(
+                        ChatCompletionUserMessageParam(
+                            role="user", content=task, name=self.name
+                        )
+                        # ChatCompletionUserMessageParam(role="user", content=task)
+                    )
+                return self._handoff_observation(agent, task, agent_observation)
+
+            self._tool_observation(tool_call_id, observation, func_name)
+        return None
+
+    # display the awaited tool result, then save it like the _observation
+    async def _aobservation(
+        self, tool_call_id, func_name, func_args, result
+    ) -> None | str:
+        with tracing.span("agent.observe", agent=self._name, tool=func_name):
+            # the console renders and validates the observation on a thread, it may wait for the user
+            observation = await run_async(
+                self.chat_console.obs, lambda **kwargs: result, func_args
             )
-            self._memory.add(tool_observation)
-            # observation = self.chat_console.observation(
-            #     tool_observation,
-            # )
+
+            if isinstance(observation, IAgent):
+                agent: IAgent = observation
+                task: str = func_args["message"]
+                with tracing.span("agent.handoff", agent=self._name, to=agent.name):
+                    agent_observation: ChatCompletionAssistantMessageParam = (
+                        await agent.arun(
+                            ChatCompletionUserMessageParam(
+                                role="user", content=task, name=self.name
+                            )
+                        )
+                    )
+                return self._handoff_observation(agent, task, agent_observation)
+
+            self._tool_observation(tool_call_id, observation, func_name)
         return None
 
+    def _handoff_observation(self, agent: IAgent, task, agent_observation) -> None | str:
+        if not agent_observation:
+            return f"Agent({agent.name}) failed to handle the task: {task}"
+        is_user_input = self._input(agent_observation, agent.name, agent.avatar)
+        # self._console.delivery(observation, agent.name, self.name, agent.avatar)
+        return None
+
+    def _tool_observation(self, tool_call_id, observation, func_name=None):
+        # append the tool response: observation
+        tool_observation = ChatCompletionToolMessageParam(
+            tool_call_id=tool_call_id,
+            # tool_name=tool_call.function.name, # tool name is not supported by groq client now
+            content=self._compact(f"{observation}", func_name),
+            role="tool",
+        )
+        self._memory.add(tool_observation)
+        # observation = self.chat_console.observation(
+        #     tool_observation,
+        # )
+
+    # compact the observation before it's saved into the memory, the console has displayed the whole one
+    def _compact(self, observation: str, func_name: str = None) -> str:
+        # a page of a stored observation is what the model asked for, compacting it would spill it again
+        if func_name == READ_OBSERVATION:
+            self.compaction_reports = []
+            return observation
+        content, reports = self._compactor.compact(observation)
+        self.compaction_reports = reports
+        return content
+
     # https://github.com/openai/openai-python/blob/main/src/openai/types/chat/chat_completion_message_param.py
     # https://github.com/openai/openai-python/blob/main/src/openai/types/chat/chat_completion_tool_param.py
     # https://platform.openai.com/docs/guides/function-calling
@@ -237,3 +641,12 @@ class Agent(IAgent):
         self._memory.add(message)
         self.chat_console.input(message, agent_name, agent_avatar)
         return is_user_input
+
+
+# the truncated observations are kept whole and paged by read_observation, so the max_obs never loses rows for good
+def default_blob_store(
+    max_obs, compactor: ObservationCompactor | None, blob_store: BlobStore | None
+) -> BlobStore | None:
+    if blob_store is None and compactor is None and max_obs is not None:
+        return BlobStore()
+    return blob_store
@@ -1,3 +1,6 @@
+import asyncio
+import inspect
+from typing import Callable, Any
 from openai.types.chat import (
     ChatCompletionMessage,
     ChatCompletionAssistantMessageParam,
@@ -33,3 +36,15 @@ def assistant_message_to_param(
     #     assistant_param["refusal"] = assistant_message.refusal
 
     return assistant_param
+
+
+async def run_async(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Await the coroutine function directly, or run the blocking function in the default executor so it doesn't
+    stall the other sessions on the event loop.
+    """
+    if inspect.iscoroutinefunction(func) or inspect.iscoroutinefunction(
+        getattr(func, "__call__", None)
+    ):
+        return await func(*args, **kwargs)
+    return await asyncio.to_thread(func, *args, **kwargs)
@@ -79,7 +79,7 @@ class StreamlitChat(IChat):
         print("============================================================")
         user_input = st.chat_input("Ask a question")
         if user_input == "/debug":
-            st.write(agent._memory.get(None))
+            st.write(list(agent._memory.get(None)))
         if user_input == "/system":
             st.write(agent._system)
         elif user_input is not None:
@@ -156,6 +156,35 @@ class StreamlitChat(IChat):
                 )
         return assistant_param
 
+    def assistant_streaming(
+        self, stream_func: Callable[..., Any], *args: Any
+    ) -> ChatCompletionMessageParam:
+        with st.chat_message(self.name, avatar=self.avatar):
+            placeholder = st.empty()
+            stream = stream_func(*args)
+            for _ in stream:
+                placeholder.markdown(stream.content + "▌")
+            message, price = stream.complete()
+
+            assistant_param: ChatCompletionAssistantMessageParam = (
+                assistant_message_to_param(message, self.name)
+            )
+            print_message = assistant_param.get("content")
+            if assistant_param.get("tool_calls"):
+                print_message = get_tool_message(assistant_param.get("tool_calls")[0])
+            if price is not None and price != "":
+                print_message = print_message + f"\n [$] {price}"
+
+            placeholder.markdown(print_message, unsafe_allow_html=True)
+            st.session_state.messages.append(
+                {
+                    "name": self.name,
+                    "avatar": self.avatar,
+                    "content": print_message,
+                }
+            )
+        return assistant_param
+
     def before_thinking(self, memory: ChatMemory, tools=[]) -> bool:
         return True
 
@@ -184,10 +213,14 @@ class StreamlitChat(IChat):
         return observation
 
     # deprecated: observation should like thinking with spinner
-    def observation(self, obs) -> str:
+    def observation(self, obs, thinking=False) -> str:
         """
         Must return the change obs
         """
+        if thinking:
+            with st.chat_message(self.name, avatar=self.avatar):
+                st.markdown("\n".join(f"- {msg}" for msg in obs))
+            return None
         # print(obs)
         print_message = f"""<div style="
           color: gray; 
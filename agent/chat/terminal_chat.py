@@ -1,5 +1,4 @@
 import sys
-import re
 from typing import List, Tuple
 from openai.types.chat import (
     ChatCompletionMessageParam,
@@ -23,7 +22,8 @@ import time
 
 from agent.interface.chat import IChat
 from agent.interface.agent import IAgent
-from .streamlit_chat import assistant_message_to_param
+from .common import assistant_message_to_param, run_async
+from tool.capture import forward_output
 
 chat_console = rich.get_console()
 
@@ -91,12 +91,63 @@ class TerminalChat(IChat):
         assistant_message = assistant_message_to_param(message)
         return assistant_message
 
+    def assistant_streaming(
+        self, stream_func: Callable[..., Any], *args: Any
+    ) -> ChatCompletionMessageParam:
+        chat_console.print()
+        start_time = time.time()
+        first_token_time = None
+        stream = stream_func(*args)
+        for token in stream:
+            if first_token_time is None:
+                first_token_time = time.time() - start_time
+            chat_console.print(token, end="", style="dim", markup=False)
+        message, price = stream.complete()
+        elapsed_time = time.time() - start_time
+        if first_token_time is not None:
+            chat_console.print()
+            chat_console.print()
+            chat_console.print(
+                f"[dim][+] {self.name} Thinking {elapsed_time:.2f}s (first token {first_token_time:.2f}s)"
+            )
+        else:
+            chat_console.print(f"[dim][+] {self.name} Thinking {elapsed_time:.2f}s")
+        if price is not None and price != "":
+            chat_console.print(f"[dim][$] {price}")
+        chat_console.print()
+        return assistant_message_to_param(message)
+
+    async def async_assistant_thinking(
+        self, task_func: Callable[..., Any], *args: Any
+    ) -> ChatCompletionMessageParam:
+        # no spinner thread here, many sessions may be thinking on the same event loop
+        start_time = time.time()
+        message, price = await run_async(task_func, *args)
+        elapsed_time = time.time() - start_time
+        chat_console.print()
+        chat_console.print(f"[dim][+] {self.name} Thinking {elapsed_time:.2f}s")
+        if price is not None and price != "":
+            chat_console.print(f"[dim][$] {price}")
+        chat_console.print()
+        return assistant_message_to_param(message)
+
     def obs(self, func, args):
-        content = func(**args)
+        streamed = []
 
-        text = Text(f"{content}")
-        text.stylize("dim")
-        chat_console.print(Padding(text, (0, 0, 1, 3)))  # Top, Right, Bottom, Left
+        def print_line(line):
+            streamed.append(line)
+            chat_console.print(Padding(Text(line, style="dim"), (0, 0, 0, 3)))
+
+        # the lines of a long running command are printed as they arrive, instead of once it's done
+        with forward_output(print_line):
+            content = func(**args)
+
+        if streamed:
+            chat_console.print()
+        else:
+            text = Text(f"{content}")
+            text.stylize("dim")
+            chat_console.print(Padding(text, (0, 0, 1, 3)))  # Top, Right, Bottom, Left
         # chat_console.print(text, padding=(0, 0, 0, 2))
         # chat_console.print(f"{message}", style="italic dim")
         obs_str = content
@@ -109,11 +160,11 @@ class TerminalChat(IChat):
         """
         Must return the change obs or thinking
         """
-        # if thinking:
-        #     for msg in obs:
-        #         chat_console.print(f"    {msg}", style="cyan")
-        #     chat_console.print()
-        #     return None
+        if thinking:
+            for msg in obs_param:
+                chat_console.print(f"    {msg}", style="cyan")
+            chat_console.print()
+            return None
 
         # obs = deduplicate_log(obs)
         message = obs_param.get("content")
@@ -134,7 +185,7 @@ class TerminalChat(IChat):
         except EOFError:
             input = ""
         if input in ["s", "short", "y", "yes", "okay", "ok"]:
-            self.memory.get(None)[-1][
+            self.memory.last()[
                 "content"
             ] = "Observation too large to display, but successful—continue to the next step!"
             clear_previous_lines(n=2)
@@ -225,8 +276,8 @@ class TerminalChat(IChat):
     #     return self._ask_input(memory, tools=tools, skip_inputs=["", "yes", "approve"])
 
     def next_message(self, memory: ChatMemory, tools=[]):
-        if len(memory.get(None)) > 0:
-            lastChatMessage: ChatCompletionMessageParam = memory.get(None)[-1]
+        lastChatMessage: ChatCompletionMessageParam | None = memory.last()
+        if lastChatMessage is not None:
             result = lastChatMessage.get("content")
             chat_console.print(f"✨ {result} \n", style="bold green")
         return self._ask_input(memory, tools=tools, name="user")
@@ -310,37 +361,6 @@ def clear_previous_lines(n=1):
     sys.stdout.flush()
 
 
-def deduplicate_log(log: str, size=3000) -> str:
-    """
-    Deduplicate logs and only keep the latest log entries.
-
-    Args:
-        log (str): The log string containing multiple log entries.
-        size (int): The maximum size of the log to process.
-
-    Returns:
-        str: Deduplicated logs with only the latest entries.
-    """
-    # Limit log size
-    if len(log) > size:
-        log = log[-size:]
-
-    lines = log.splitlines()
-    latest_logs = {}
-
-    for line in lines:
-        # Remove timestamp (common formats: YYYY-MM-DD, HH:MM:SS, or ISO8601)
-        cleaned_line = re.sub(
-            r"\d{4}-\d{2}-\d{2}[T ]?\d{2}:\d{2}:\d{2}(?:\.\d+Z)?", "", line
-        ).strip()
-
-        # Update the latest occurrence of each log message
-        latest_logs[cleaned_line] = line  # Overwrite with the latest line
-
-    # Return the latest entries in the order they appeared
-    return "\n".join(latest_logs.values())
-
-
 def spinner(stop_event: threading.Event) -> None:
     """
     Displays a simple spinner in the terminal until the stop_event is set.
@@ -15,6 +15,7 @@ from tool import (
     tool_name,
 )
 from memory import ChatMemory
+from agent.chat.common import run_async
 
 
 class IAgent(ABC):
@@ -35,6 +36,13 @@ class IAgent(ABC):
     ) -> ChatCompletionAssistantMessageParam | None:
         pass
 
+    async def arun(
+        self,
+        message: Union[ChatCompletionMessageParam, str],
+    ) -> ChatCompletionAssistantMessageParam | None:
+        # agents without a native async loop run the blocking one in the default executor
+        return await run_async(self.run, message)
+
     @abstractmethod
     def messages(self) -> List[ChatCompletionMessageParam]:
         pass
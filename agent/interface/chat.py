@@ -13,6 +13,7 @@ from openai.types.chat import (
 )
 from memory import ChatMemory
 from typing import Callable, Any
+from agent.chat.common import run_async
 
 
 class IChat(ABC):
@@ -47,6 +48,20 @@ class IChat(ABC):
     ) -> ChatCompletionMessageParam:
         pass
 
+    def assistant_streaming(
+        self, stream_func: Callable[..., Any], *args: Any
+    ) -> ChatCompletionMessageParam:
+        # stream_func returns a client.ChatStream, the consoles override it to render the tokens as they arrive
+        stream = stream_func(*args)
+        return self.assistant_thinking(lambda *_: stream.complete(), *args)
+
+    async def async_assistant_thinking(
+        self, task_func: Callable[..., Any], *args: Any
+    ) -> ChatCompletionMessageParam:
+        # await the completion, then render it with the blocking assistant_thinking
+        message, price = await run_async(task_func, *args)
+        return self.assistant_thinking(lambda *_: (message, price), *args)
+
     def next_message(self, memory: ChatMemory, tools=[]) -> str:
         pass
 
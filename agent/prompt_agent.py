@@ -1,8 +1,9 @@
 import os
 import sys
 import json
+import asyncio
 import importlib
-from typing import Union, Tuple, List
+from typing import Any, Union, Tuple, List
 from pydantic import ValidationError
 from openai.types.chat import (
     ChatCompletionMessage,
@@ -15,9 +16,14 @@ from openai.types.chat import (
 )
 from type import ChatMessage, StatusCode, ChatMessage
 from tool import func_metadata, build_from_template
-from .agent import Agent
+from tool.capture import submit_relayed, relayed_result
+from .agent import Agent, default_blob_store
+from .interface.agent import IAgent
+from .chat.common import run_async
+from .action_stream import ActionStreamParser
 import traceback
 from memory.chat_buffer_memory import ChatBufferMemory
+import tracing
 
 
 current_dir = os.path.dirname(os.path.realpath(__file__))
@@ -26,8 +32,23 @@ current_dir = os.path.dirname(os.path.realpath(__file__))
 class PromptAgent(Agent):
 
     def __init__(
-        self, client, name, system, tools=[], max_iter=6, memory=None, debug=True
+        self,
+        client,
+        name,
+        system,
+        tools=[],
+        max_iter=6,
+        memory=None,
+        debug=True,
+        stream=False,
+        tool_cache=None,
+        max_obs=None,
+        compactor=None,
+        blob_store=None,
     ):
+        blob_store = default_blob_store(max_obs, compactor, blob_store)
+        if blob_store is not None:
+            tools = [*tools, blob_store.read_observation]
         system = build_from_template(
             os.path.join(current_dir, "..", "prompt", "prompt_agent.md"),
             {
@@ -44,10 +65,17 @@ class PromptAgent(Agent):
             max_iter=max_iter,
             memory=memory,
             response_model=ChatMessage,
+            stream=stream,
+            tool_cache=tool_cache,
+            max_obs=max_obs,
+            compactor=compactor,
+            blob_store=blob_store,
         )
         self._debug = debug
         # registered the tools for the agent to be invoked
         self._functions = self.register_actions(tools)
+        # the action started while the response was streaming: (ChatAction, Future | None if it's forbidden)
+        self._early_action = None
 
     def _tool_markdown(self, tools) -> str:
         system_tool_content = ["## Available Tools:\n"]
@@ -69,11 +97,61 @@ class PromptAgent(Agent):
     # https://github.com/openai/openai-python/blob/main/src/openai/types/chat/chat_completion_tool_param.py
     # https://platform.openai.com/docs/guides/function-calling
 
-    def _acting(self) -> Tuple[StatusCode, str]:
-        chat_message = self._memory.get(None)[-1]
+    # start the tool once the streamed action object closes, so the tool latency overlaps with the remaining response
+    def _open_stream(self, *args):
+        stream = super()._open_stream(*args)
+        self._early_action = None
+        parser = ActionStreamParser()
+
+        def dispatch(token):
+            action = parser.feed(token)
+            # the action modifying the environment waits for the validated response, and the malformed one is
+            # reported to the model by the _action once the response is complete
+            if (
+                action is None
+                or action.edit != 0
+                or not action.name in self._functions
+                or not isinstance(action.args, dict)
+            ):
+                return
+            if not self._before_action(action.name, action.args, action.edit):
+                self._early_action = (action, None)
+                return
+            future = submit_relayed(
+                self._tool_pool(), self._tool(action.name, action.edit), **action.args
+            )
+            self._early_action = (action, future)
+
+        stream.add_listener(dispatch)
+        return stream
+
+    def _tool_acting(self) -> Tuple[StatusCode, str]:
+        status, result = self._action()
+        if status != StatusCode.ACTION:
+            return status, result
+        func_name, func_args, func_edit, future = result
+        return self._action_observation(
+            *self._observation(func_name, func_args, func_edit, future=future),
+            func_name,
+        )
+
+    async def _tool_aacting(self) -> Tuple[StatusCode, str]:
+        # the permission of the action is asked on a thread, the other sessions keep running meanwhile
+        status, result = await run_async(self._action)
+        if status != StatusCode.ACTION:
+            return status, result
+        func_name, func_args, func_edit, future = result
+        return self._action_observation(
+            *await self._aobservation(func_name, func_args, func_edit, future=future),
+            func_name,
+        )
+
+    # parse the structured response, return the approved (func_name, func_args, func_edit, future) with StatusCode.ACTION
+    def _action(self) -> Tuple[StatusCode, str | Tuple[str, dict, int, Any]]:
+        chat_message = self._memory.last()
+        content = chat_message.get("content")
         try:
             # decoder = json.JSONDecoder()
-            content = chat_message.content
             # json_content, _ = decoder.raw_decode(content.strip())
             # chat_message: ChatMessage = ChatMessage.model_validate(json_content)
             chat_message: ChatMessage = ChatMessage.model_validate_json(content)
@@ -91,35 +169,25 @@ class PromptAgent(Agent):
                         f"The function [yellow]{func_name}[/yellow] isn't registered!",
                     )
 
-                # validate the permission
-                if not self.chat_console.before_action(
-                    self._action_permission,
-                    func_name,
-                    func_args,
-                    func_edit=func_edit,
-                    functions=self._functions,
+                # the action was approved and started while the response was streaming
+                if (
+                    self._early_action is not None
+                    and self._early_action[0] == chat_message.action
                 ):
-                    return StatusCode.ACTION_FORBIDDEN, "Action cancelled by the user."
+                    _, future = self._early_action
+                    self._early_action = None
+                    if future is None:
+                        return (
+                            StatusCode.ACTION_FORBIDDEN,
+                            "Action cancelled by the user.",
+                        )
+                    return StatusCode.ACTION, (func_name, func_args, func_edit, future)
 
-                status, observation = self._observation(func_name, func_args)
-                if status == StatusCode.ERROR:
-                    return StatusCode.ERROR, observation
-
-                if observation == "":
-                    observation = "no result found the action"
+                # validate the permission
+                if not self._before_action(func_name, func_args, func_edit):
+                    return StatusCode.ACTION_FORBIDDEN, "Action cancelled by the user."
 
-                self._memory.add(
-                    ChatCompletionUserMessageParam(
-                        role="user", content=f"{observation}"
-                    )
-                    # self._console.after_action(
-                    #     ChatCompletionUserMessageParam(
-                    #         role="user", content=f"{observation}"
-                    #     ),
-                    #     self._max_obs,
-                    # )
-                )
-                return StatusCode.OBSERVATION, f"{observation}"
+                return StatusCode.ACTION, (func_name, func_args, func_edit, None)
             elif chat_message.answer:
                 return StatusCode.ANSWER, chat_message.answer
             elif chat_message.thought:
@@ -164,3 +232,89 @@ class PromptAgent(Agent):
                 StatusCode.ERROR,
                 f"{content}\n An structured error occurred: {e}",
             )
+
+    # save the observation into the memory as the user message
+    def _action_observation(
+        self, status, observation, func_name=None
+    ) -> Tuple[StatusCode, str]:
+        if status == StatusCode.ERROR:
+            return StatusCode.ERROR, observation
+
+        if observation == "":
+            observation = "no result found the action"
+
+        self._memory.add(
+            ChatCompletionUserMessageParam(
+                role="user", content=self._compact(f"{observation}", func_name)
+            )
+        )
+        return StatusCode.OBSERVATION, f"{observation}"
+
+    def _observation(
+        self, func_name, func_args, func_edit=0, future=None
+    ) -> Tuple[StatusCode, str]:
+        func = self._tool(func_name, func_edit)
+        if future is not None:  # the tool is already running on the tool executor
+            func = lambda **kwargs: relayed_result(future)
+        try:
+            with tracing.span("agent.observe", agent=self.name, tool=func_name):
+                observation = self.chat_console.obs(func, func_args)
+                if isinstance(observation, IAgent):
+                    with tracing.span(
+                        "agent.handoff", agent=self.name, to=observation.name
+                    ):
+                        agent_observation = observation.run(
+                            self._handoff_message(func_args)
+                        )
+                    return self._handoff_result(
+                        observation, func_args, agent_observation
+                    )
+        except Exception as e:
+            traceback.print_exc()
+            return StatusCode.ERROR, f"{func_name}: {func_args} \n {e}"
+        return StatusCode.OBSERVATION, observation
+
+    async def _aobservation(
+        self, func_name, func_args, func_edit=0, future=None
+    ) -> Tuple[StatusCode, str]:
+        try:
+            with tracing.span("agent.observe", agent=self.name, tool=func_name):
+                if future is not None:
+                    await asyncio.wrap_future(future)
+                    func = lambda **kwargs: relayed_result(future)
+                else:
+                    result = await run_async(
+                        self._tool(func_name, func_edit), **func_args
+                    )
+                    func = lambda **kwargs: result
+                observation = await run_async(self.chat_console.obs, func, func_args)
+                if isinstance(observation, IAgent):
+                    with tracing.span(
+                        "agent.handoff", agent=self.name, to=observation.name
+                    ):
+                        agent_observation = await observation.arun(
+                            self._handoff_message(func_args)
+                        )
+                    return self._handoff_result(
+                        observation, func_args, agent_observation
+                    )
+        except Exception as e:
+            traceback.print_exc()
+            return StatusCode.ERROR, f"{func_name}: {func_args} \n {e}"
+        return StatusCode.OBSERVATION, observation
+
+    def _handoff_message(self, func_args) -> ChatCompletionUserMessageParam:
+        return ChatCompletionUserMessageParam(
+            role="user", content=func_args["message"], name=self.name
+        )
+
+    # the answer of the handoff agent is the observation of the action
+    def _handoff_result(
+        self, agent: IAgent, func_args, agent_observation
+    ) -> Tuple[StatusCode, str]:
+        if not agent_observation:
+            return (
+                StatusCode.ERROR,
+                f"Agent({agent.name}) failed to handle the task: {func_args['message']}",
+            )
+        return StatusCode.OBSERVATION, agent_observation.get("content")
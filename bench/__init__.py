@@ -0,0 +1,10 @@
+from .scripted_client import (
+    ScriptedClient,
+    tool_call_message,
+    prompt_action,
+    prompt_answer,
+)
+from .quiet_chat import QuietChat
+from .benchmarks import measure, run_benchmarks
+
+__all__ = [name for name in globals() if not name.startswith("_")]
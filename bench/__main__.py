@@ -0,0 +1,87 @@
+import argparse
+import json
+import platform
+import sys
+import time
+
+from .benchmarks import BENCHMARKS, LOOP_BENCHMARKS, run_benchmarks
+
+
+# python -m bench --output bench.json
+# python -m bench --compare baseline.json --threshold 0.2
+# python -m bench startup --rounds 10  # the cold start imports measured by python -X importtime
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="bench", description="Benchmark the agent loop offline"
+    )
+    parser.add_argument(
+        "names",
+        nargs="*",
+        help=f"the benchmarks to run, default all: {', '.join([*LOOP_BENCHMARKS, *BENCHMARKS])}",
+    )
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=5, help="tool turns per run")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="simulated seconds per request"
+    )
+    parser.add_argument("--output", help="write the json result to the file")
+    parser.add_argument("--compare", help="the json result of the baseline run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="fail when a timing is slower than the baseline by this ratio",
+    )
+    args = parser.parse_args(argv)
+    for name in args.names:
+        if name not in LOOP_BENCHMARKS and name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"rounds": args.rounds, "turns": args.turns, "latency": args.latency},
+        "results": run_benchmarks(
+            args.names, rounds=args.rounds, turns=args.turns, latency=args.latency
+        ),
+    }
+    content = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(content)
+    print(content)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline["results"], report["results"], args.threshold)
+        for path, before, after in regressions:
+            print(f"regression {path}: {before:.4g} -> {after:.4g}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+# the timings are lower is better, the throughputs (per_s) are higher is better
+def compare(baseline, current, threshold, path=""):
+    regressions = []
+    for key, value in current.items():
+        before = baseline.get(key) if isinstance(baseline, dict) else None
+        if before is None:
+            continue
+        key_path = f"{path}.{key}" if path else key
+        if isinstance(value, dict):
+            regressions += compare(before, value, threshold, key_path)
+        elif key.endswith("_per_s"):
+            if value < before * (1 - threshold):
+                regressions.append((key_path, before, value))
+        elif key.endswith("_ms") or key.endswith("_us"):
+            if key.startswith("max") or before <= 0:
+                continue  # the max is too noisy to gate on
+            if value > before * (1 + threshold):
+                regressions.append((key_path, before, value))
+    return regressions
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+import contextlib
+import functools
+import io
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from openai.types.chat import ChatCompletionMessage
+
+from agent import Agent, PromptAgent
+from agent.action_stream import ActionStreamParser
+from memory import ChatBufferMemory, ChatTokenMemory
+from memory.token_counter import message_tokens
+from tool.metadata import chat_tool
+from type import ActionPermission, ChatMessage
+from .quiet_chat import QuietChat
+from .startup import bench_startup
+from .scripted_client import (
+    ScriptedClient,
+    tool_call_message,
+    prompt_action,
+    prompt_answer,
+)
+
+
+def kubectl_get(resource: str, namespace: str = "default", timeout: int = 30) -> str:
+    """Get the kubernetes resources in the namespace."""
+    return f"NAME READY STATUS\npod-0 1/1 Running\n# {resource} -n {namespace}"
+
+
+def search(keyword: str, limit: int = 5, exact: bool = False, score: float = 0.5) -> str:
+    """Search the runbooks for the keyword."""
+    return f"found {limit} runbooks for {keyword}"
+
+
+def measure(func: Callable[[], Any], rounds: int, warmup: int = 1) -> Dict[str, float]:
+    """Run the function warmup + rounds times, returns the statistics of the measured rounds in milliseconds."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "rounds": rounds,
+        "mean_ms": statistics.fmean(samples),
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+    }
+
+
+def _loop_result(stats, turns, latency) -> Dict[str, float]:
+    # the model requests are the tool turns plus the final answer, the simulated latency isn't the loop overhead
+    requests = turns + 1
+    stats["requests"] = requests
+    stats["overhead_per_iteration_ms"] = stats["median_ms"] / requests - latency * 1000
+    return stats
+
+
+def _quiet_agent(agent):
+    agent._user_input = False
+    agent._action_permission = ActionPermission.NONE
+    return agent
+
+
+def bench_agent_loop(rounds, turns=5, latency=0.0, terminal=False) -> Dict[str, float]:
+    script = [tool_call_message("kubectl_get", {"resource": "pods"})] * turns + [
+        ChatCompletionMessage(role="assistant", content="ANSWER: all pods are running")
+    ]
+
+    def run():
+        agent = Agent(
+            "bench",
+            "You are a kubernetes engineer.",
+            ScriptedClient(script, latency=latency),
+            tools=[kubectl_get],
+            chat_console=None if terminal else QuietChat(),
+            max_iter=turns + 1,
+            memory=ChatBufferMemory(size=4 * turns),
+        )
+        agent.chat_console.validate_obs = False
+        _quiet_agent(agent).run({"role": "user", "content": "check the pods"})
+
+    if terminal:
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = measure(run, rounds)
+    else:
+        stats = measure(run, rounds)
+    return _loop_result(stats, turns, latency)
+
+
+def bench_prompt_agent_loop(rounds, turns=5, latency=0.0) -> Dict[str, float]:
+    script = [prompt_action("kubectl_get", {"resource": "pods"})] * turns + [
+        prompt_answer("all pods are running")
+    ]
+
+    def run():
+        agent = PromptAgent(
+            ScriptedClient(script, latency=latency),
+            "bench",
+            "You are a kubernetes engineer.",
+            tools=[kubectl_get],
+            max_iter=turns + 1,
+            memory=ChatBufferMemory(size=4 * turns),
+            debug=False,
+        )
+        agent.chat_console = QuietChat()
+        _quiet_agent(agent).run({"role": "user", "content": "check the pods"})
+
+    return _loop_result(measure(run, rounds), turns, latency)
+
+
+def bench_dspy_agent_loop(rounds, turns=5, latency=0.0) -> Dict[str, Any]:
+    # the dspy DummyLM answers at once, the latency isn't simulated
+    try:
+        import dspy
+        from dspy.utils import DummyLM
+        from dspyagent import Agent as DspyAgent, ChatConsole
+    except ImportError as e:
+        return {"skipped": f"{e}"}
+
+    class QuietConsole(ChatConsole):
+        def next_speaker(self, to_agent, message):
+            pass
+
+        def thinking(self, messages):
+            pass
+
+        def before_tool(self, *args, **kwargs) -> bool:
+            return True
+
+        def observation(self, obs) -> str:
+            return obs
+
+        def after_tool(self, obs: str, max_size):
+            return obs
+
+        def answer(self, **input_args):
+            pass
+
+        def thought(self, **input_args):
+            pass
+
+    answers = [
+        {
+            "next_thought": "check the pods",
+            "next_tool_name": "kubectl_get",
+            "next_tool_args": {"resource": "pods"},
+        }
+    ] * turns + [
+        {"next_thought": "done", "next_tool_name": "finish", "next_tool_args": {}},
+        {"reasoning": "the pods are running", "answer": "all pods are running"},
+    ]
+
+    def run():
+        dspy.settings.configure(lm=DummyLM(answers))
+        agent = DspyAgent(
+            "bench",
+            "question -> answer",
+            tools=[kubectl_get],
+            max_iters=turns + 1,
+            chat=QuietConsole(),
+        )
+        agent(question="check the pods")
+
+    try:
+        return _loop_result(measure(run, rounds), turns, 0.0)
+    except Exception as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+
+
+def _history(size: int) -> List[Dict[str, Any]]:
+    messages = []
+    for i in range(size // 3 + 1):
+        call = tool_call_message("kubectl_get", {"resource": f"pods-{i}"}, f"call_{i}")
+        messages.append({"role": "assistant", "tool_calls": call.tool_calls})
+        messages.append(
+            {"role": "tool", "tool_call_id": f"call_{i}", "content": "pod-0 1/1 Running\n" * 20}
+        )
+        messages.append({"role": "user", "content": f"and the namespace {i}?"})
+    return messages[:size]
+
+
+def bench_memory(rounds, sizes=(10, 100, 1000), ops=200) -> Dict[str, Any]:
+    """The microseconds of one add and one get(system), with the history already holding `size` messages."""
+    # both memories are bounded to the prefilled history, so it keeps the size while the messages are added
+    memories = {
+        "ChatBufferMemory": lambda history: ChatBufferMemory(size=len(history)),
+        "ChatTokenMemory": lambda history: ChatTokenMemory(
+            max_tokens=sum(message_tokens(message) for message in history) + 1024 + 64,
+            reserved_tokens=1024,
+        ),
+    }
+    results = {}
+    for memory_name, new_memory in memories.items():
+        for size in sizes:
+            history = _history(size)
+            memory = new_memory(history)
+            for message in history:
+                memory.add(message)
+
+            def add():
+                for message in history[:ops]:
+                    memory.add(message)
+
+            def get():
+                for _ in range(ops):
+                    memory.get("You are a kubernetes engineer.")
+
+            count = min(ops, len(history))
+            results[f"{memory_name}[{size}]"] = {
+                "add_us": measure(add, rounds)["median_ms"] * 1000 / count,
+                "get_us": measure(get, rounds)["median_ms"] * 1000 / ops,
+            }
+    return results
+
+
+def bench_chat_tool(rounds, calls=1000) -> Dict[str, Any]:
+    """The microseconds to generate the tool schema sent to the model."""
+    results = {}
+    for func in (kubectl_get, search):
+
+        def generate():
+            for _ in range(calls):
+                chat_tool(func)
+
+        results[func.__name__] = {
+            "schema_us": measure(generate, rounds)["median_ms"] * 1000 / calls
+        }
+    return results
+
+
+def bench_prompt_parsing(rounds, messages=2000) -> Dict[str, Any]:
+    """The throughput of validating the PromptAgent responses, whole and streamed token by token."""
+    contents = [
+        prompt_action("kubectl_get", {"resource": "pods", "namespace": f"ns-{i}"}, thought="x" * 200)
+        for i in range(messages // 2)
+    ] + [prompt_answer(f"answer {i}", thought="y" * 200) for i in range(messages // 2)]
+    total_bytes = sum(len(content) for content in contents)
+
+    def validate():
+        for content in contents:
+            ChatMessage.model_validate_json(content)
+
+    def stream():
+        for content in contents:
+            parser = ActionStreamParser()
+            for i in range(0, len(content), 4):
+                parser.feed(content[i : i + 4])
+
+    results = {}
+    for name, func in (("validate_json", validate), ("action_stream", stream)):
+        seconds = measure(func, rounds)["median_ms"] / 1000
+        results[name] = {
+            "messages_per_s": len(contents) / seconds,
+            "mb_per_s": total_bytes / seconds / 1e6,
+        }
+    return results
+
+
+# the benchmarks driving an agent through the scripted turns, with the simulated latency of each request
+LOOP_BENCHMARKS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "agent_loop": bench_agent_loop,
+    "agent_loop_terminal": functools.partial(bench_agent_loop, terminal=True),
+    "prompt_agent_loop": bench_prompt_agent_loop,
+    "dspy_agent_loop": bench_dspy_agent_loop,
+}
+
+BENCHMARKS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "memory": bench_memory,
+    "chat_tool": bench_chat_tool,
+    "prompt_parsing": bench_prompt_parsing,
+    "startup": bench_startup,
+}
+
+
+def run_benchmarks(names=None, rounds=5, turns=5, latency=0.0) -> Dict[str, Any]:
+    results = {}
+    for name in names or [*LOOP_BENCHMARKS, *BENCHMARKS]:
+        if name in LOOP_BENCHMARKS:
+            results[name] = LOOP_BENCHMARKS[name](rounds, turns=turns, latency=latency)
+        else:
+            results[name] = BENCHMARKS[name](rounds)
+    return results
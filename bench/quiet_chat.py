@@ -0,0 +1,33 @@
+from typing import Any, Callable
+from openai.types.chat import ChatCompletionMessageParam
+
+from agent.interface.chat import IChat
+from agent.chat.common import assistant_message_to_param
+
+
+# QuietChat approves every action and renders nothing, so the benchmark measures the agent loop without the console
+class QuietChat(IChat):
+
+    @property
+    def avatar(self):
+        return "🤖"
+
+    def before_action(
+        self, permission, func_name, func_args, func_edit=0, functions={}
+    ) -> bool:
+        return True
+
+    def obs(self, func, args):
+        return func(**args)
+
+    def observation(self, obs_param, thinking=False) -> str:
+        return None if thinking else obs_param
+
+    def assistant_thinking(
+        self, task_func: Callable[..., Any], *args: Any
+    ) -> ChatCompletionMessageParam:
+        message, _ = task_func(*args)
+        return assistant_message_to_param(message)
+
+    def next_message(self, memory, tools=[]) -> str:
+        return None
@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+from typing import Any, Dict, Iterable, List
+from pydantic import BaseModel
+from openai.types.chat import (
+    ChatCompletionMessage,
+    ChatCompletionMessageParam,
+    ChatCompletionMessageToolCall,
+    ChatCompletionToolParam,
+)
+from openai.types.chat.chat_completion_message_tool_call import Function
+
+
+# ScriptedClient replays the canned assistant messages in order, so the agent loop can be driven offline and
+# deterministically. The latency simulates the model response time, the script wraps around once it's exhausted.
+class ScriptedClient:
+    def __init__(self, script: List[ChatCompletionMessage | str], latency: float = 0.0):
+        """
+        Args:
+            script (List[ChatCompletionMessage | str]): The assistant messages, a string is the content of the message.
+            latency (float): The seconds each request sleeps before it returns.
+        """
+        self.model_id = "scripted"
+        self._script = [
+            (
+                ChatCompletionMessage(role="assistant", content=message)
+                if isinstance(message, str)
+                else message
+            )
+            for message in script
+        ]
+        self._latency = latency
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.total_price = 0
+        self.last_usage = None
+
+    def __call__(
+        self,
+        messages: Iterable[ChatCompletionMessageParam],
+        tools: Iterable[ChatCompletionToolParam],
+        response_model: BaseModel = None,
+    ):
+        with self._lock:
+            message = self._script[self.calls % len(self._script)]
+            self.calls += 1
+        if self._latency > 0:
+            time.sleep(self._latency)
+        return message, self.total_price
+
+    # the ChatBinaryClient contract
+    def request(
+        self,
+        messages: Iterable[ChatCompletionMessageParam],
+        tools: Iterable[ChatCompletionToolParam],
+    ) -> ChatCompletionMessage:
+        message, _ = self(messages, tools)
+        return message
+
+    def stream(
+        self,
+        messages: Iterable[ChatCompletionMessageParam],
+        tools: Iterable[ChatCompletionToolParam],
+        response_model: BaseModel = None,
+    ):
+        from client.stream import ChatStream, message_deltas
+
+        message, _ = self(messages, tools, response_model)
+        return ChatStream(message_deltas(message))
+
+
+def tool_call_message(func_name: str, func_args: Dict[str, Any], call_id: str = "call_0"):
+    return ChatCompletionMessage(
+        role="assistant",
+        content=None,
+        tool_calls=[
+            ChatCompletionMessageToolCall(
+                id=call_id,
+                type="function",
+                function=Function(name=func_name, arguments=json.dumps(func_args)),
+            )
+        ],
+    )
+
+
+# the structured responses of the PromptAgent
+def prompt_action(func_name: str, func_args: Dict[str, Any], thought="call the tool") -> str:
+    return json.dumps(
+        {"thought": [thought], "action": {"name": func_name, "edit": 0, "args": func_args}}
+    )
+
+
+def prompt_answer(answer: str, thought="the task is done") -> str:
+    return json.dumps({"thought": [thought], "answer": answer})
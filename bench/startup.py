@@ -0,0 +1,79 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# the import statements timed in a fresh interpreter, e.g. the cold start of `python sample/acm/planner.py`
+STARTUP_TARGETS = {
+    "agent": "from agent import Agent, PromptAgent, FINAL_ANSWER",
+    "memory": "from memory import ChatBufferMemory",
+    "tool": "from tool import code_executor",
+    "client": "from client import ClientConfig",
+    "planner": "; ".join(
+        [
+            "from agent import Agent, PromptAgent, FINAL_ANSWER",
+            "from client import GroqClient, BedRockClient, ClientConfig",
+            "from tool import code_executor",
+            "from memory import ChatBufferMemory",
+        ]
+    ),
+}
+
+# import time:  self [us] | cumulative | imported package
+IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_times(statement: str) -> Tuple[float, List[Tuple[str, int, int]]]:
+    """
+    Run the statement with `python -X importtime` in a fresh interpreter.
+
+    Returns:
+        Tuple[float, List[Tuple[str, int, int]]]: The total milliseconds of the imports, and the (module, self us,
+        cumulative us) of each imported module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    modules = []
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        modules.append((module, int(self_us), int(cumulative_us)))
+        # the top level imports are the ones not nested in another, their cumulative times add up to the total
+        if len(indent) == 1:
+            total_us += int(cumulative_us)
+    return total_us / 1000, modules
+
+
+def bench_startup(rounds, targets=None, top=5) -> Dict[str, Any]:
+    """The median import milliseconds of each target, with the slowest modules of the last round by self time."""
+    results = {}
+    for name, statement in (targets or STARTUP_TARGETS).items():
+        try:
+            samples = []
+            for _ in range(rounds):
+                total_ms, modules = import_times(statement)
+                samples.append(total_ms)
+        except RuntimeError as e:
+            results[name] = {"skipped": f"{e}"}
+            continue
+        slowest = sorted(modules, key=lambda module: -module[1])[:top]
+        results[name] = {
+            "import_ms": statistics.median(samples),
+            "modules": len(modules),
+            "slowest": {module: self_us for module, self_us, _ in slowest},
+        }
+    return results
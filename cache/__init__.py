@@ -0,0 +1,6 @@
+from .lru_cache import LRUCache
+from .embedding_cache import EmbeddingCache
+from .sqlite_store import SQLiteStore
+from .tool_cache import ToolCache, cache_key
+
+__all__ = [name for name in globals() if not name.startswith("_")]
@@ -0,0 +1,135 @@
+import hashlib
+import struct
+import threading
+from typing import Callable, Dict, List, Sequence
+
+from .lru_cache import LRUCache
+from .sqlite_store import SQLiteStore
+
+EmbedBatch = Callable[[List[str]], Sequence[Sequence[float]]]
+
+
+class EmbeddingCache:
+    """
+    Memoize the embeddings of the texts embedded again and again, like the repeated prompts, the re-indexed runbooks
+    and the messages persisted by each turn. The embeddings are keyed by the model and the hash of the text with its
+    whitespace normalized, and kept as float16, two bytes a dimension, in an in-process LRU tier first, then in an
+    optional SQLite tier shared between the processes. Only the missed texts reach the model, in one batch.
+
+    Example:
+        cache = EmbeddingCache("BAAI/bge-small-en", path="./cache/embeddings.db")
+        embed = cache.wrap(model.get_text_embedding_batch)
+        memory = ChatIndexMemory(embed, NumpyVectorIndex(dim=384))
+        ...
+        print(cache.stats)
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_entries: int = 4096,
+        max_bytes: int = 16 * 1024 * 1024,
+        path: str = None,
+        disk_max_bytes: int = 256 * 1024 * 1024,
+    ):
+        """
+        Args:
+            model (str): The name of the embedding model, the embeddings of different models never mix.
+            max_entries (int): The maximum number of embeddings in the memory tier.
+            max_bytes (int): The maximum total size of the embeddings in the memory tier.
+            path (str): The SQLite file of the disk tier, None to keep the embeddings in memory only.
+            disk_max_bytes (int): The maximum total size of the embeddings in the disk tier.
+        """
+        self.model = model
+        self._memory = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+        self._disk = SQLiteStore(path, max_bytes=disk_max_bytes) if path else None
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def key(self, text: str, kind: str = "text") -> str:
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{self.model}\0{kind}\0{normalized}".encode()).hexdigest()
+
+    def embed(self, texts: Sequence[str], embed_batch: EmbedBatch, kind: str = "text") -> List[List[float]]:
+        """
+        Args:
+            texts (Sequence[str]): The texts to embed.
+            embed_batch (Callable[[List[str]], Sequence[Sequence[float]]]): Embed the texts missed by the cache.
+            kind (str): The kind of the texts, e.g. the queries some models embed apart from the documents.
+
+        Returns:
+            List[List[float]]: The embeddings of the texts, rounded to float16 whether they're cached or not.
+
+        Raises:
+            ValueError: The embed_batch didn't return one embedding for each missed text.
+        """
+        keys = [self.key(text, kind) for text in texts]
+        found: Dict[str, bytes] = {}
+        missed: Dict[str, str] = {}  # the first text of each missed key
+        for key, text in zip(keys, texts):
+            if key in found or key in missed:
+                continue
+            value = self._lookup(key)
+            if value is None:
+                missed[key] = text
+            else:
+                found[key] = value
+
+        if missed:
+            embeddings = embed_batch(list(missed.values()))
+            if len(embeddings) != len(missed):
+                raise ValueError(
+                    f"the embed_batch returned {len(embeddings)} embeddings for {len(missed)} texts of the model {self.model}"
+                )
+            for key, embedding in zip(missed, embeddings):
+                value = _pack(embedding)
+                found[key] = value
+                self._memory.put(key, value, size=len(value))
+                if self._disk is not None:
+                    self._disk.put(key, value)
+        return [_unpack(found[key]) for key in keys]
+
+    def wrap(self, embed_batch: EmbedBatch) -> EmbedBatch:
+        """The embed_batch function served by the cache."""
+        return lambda texts: self.embed(texts, embed_batch)
+
+    def clear(self):
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """The hit and miss counters of the texts, the texts repeated in one call are counted once."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["memory_entries"] = len(self._memory)
+        stats["memory_bytes"] = self._memory.size
+        return stats
+
+    def _lookup(self, key: str) -> bytes | None:
+        found, value = self._memory.get(key)
+        if found:
+            self._count("memory_hits")
+            return value
+        if self._disk is not None:
+            value = self._disk.get(key)
+            if value is not None:
+                self._count("disk_hits")
+                self._memory.put(key, value, size=len(value))
+                return value
+        self._count("misses")
+        return None
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+
+def _pack(embedding: Sequence[float]) -> bytes:
+    embedding = [float(value) for value in embedding]
+    return struct.pack(f"<{len(embedding)}e", *embedding)
+
+
+def _unpack(value: bytes) -> List[float]:
+    return list(struct.unpack(f"<{len(value) // 2}e", value))
@@ -0,0 +1,255 @@
+import hashlib
+import inspect
+import json
+import shlex
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+from type import ToolError
+from .lru_cache import LRUCache
+from .sqlite_store import SQLiteStore
+
+ReadOnly = Callable[[Dict[str, Any]], bool]
+
+# the kubectl verbs that never modify the cluster
+KUBECTL_READ_VERBS = {
+    "get",
+    "describe",
+    "logs",
+    "explain",
+    "api-resources",
+    "api-versions",
+    "version",
+    "top",
+    "events",
+    "cluster-info",
+}
+# the global flags written before the verb that take the next word as their value
+KUBECTL_VALUE_FLAGS = {"-n", "--namespace", "--context", "--kubeconfig", "--cluster", "--user", "-s", "--server"}
+# the commands the read-only output can be piped into
+PIPE_FILTERS = {"grep", "egrep", "head", "tail", "wc", "sort", "uniq", "cut", "awk", "jq", "yq", "column"}
+
+
+class ToolCache:
+    """
+    Memoize the results of the idempotent tool calls, like `kubectl get` issued again and again in a troubleshooting
+    session. The results are keyed by the tool name and the canonicalized arguments, and looked up in an in-process
+    LRU tier first, then in an optional SQLite tier shared between the processes.
+
+    Only the tools with a positive TTL are cached, and never an action flagged `edit=1`. The tools with a read_only
+    predicate, kubectl_cmd and kubectl_fanout by default, are cached only for the calls it accepts, e.g. a `get` but
+    not an `apply`, and the other calls of them clear the cache since they may change what the reads return. The
+    results typed ToolError are never cached. The key includes the `cache_scope` of the tool's executor, e.g. the
+    kubeconfigs and contexts of the KubectlExecutor, so the processes sharing the SQLite tier never serve the results
+    of another cluster.
+
+    Example:
+        cache = ToolCache(tool_ttls={"kubectl_cmd": 30}, path="./cache/tools.db")
+        agent = Agent(..., tools=[executor.kubectl_cmd], tool_cache=cache)
+        ...
+        print(cache.stats)
+    """
+
+    def __init__(
+        self,
+        ttl: float = 0,
+        tool_ttls: Dict[str, float] = None,
+        max_entries: int = 256,
+        max_bytes: int = 16 * 1024 * 1024,
+        path: str = None,
+        disk_max_bytes: int = 256 * 1024 * 1024,
+        read_only: Dict[str, ReadOnly] = None,
+        scope: str = "",
+    ):
+        """
+        Args:
+            ttl (float): The default seconds a result stays valid, 0 means the tools not in tool_ttls are not cached.
+            tool_ttls (Dict[str, float]): The seconds a result stays valid for each tool name.
+            read_only (Dict[str, Callable[[Dict[str, Any]], bool]]): Whether a call of the tool is read-only by its
+                arguments, for each tool name, added to the predicates of kubectl_cmd and kubectl_fanout.
+            scope (str): The identity of the environment the tools reach, for the tools whose executor has no
+                cache_scope.
+            max_entries (int): The maximum number of results in the memory tier.
+            max_bytes (int): The maximum total size of the results in the memory tier.
+            path (str): The SQLite file of the disk tier, None to keep the results in memory only.
+            disk_max_bytes (int): The maximum total size of the results in the disk tier.
+        """
+        self._ttl = ttl
+        self._tool_ttls = tool_ttls or {}
+        self._read_only = {
+            "kubectl_cmd": kubectl_read_only,
+            "kubectl_fanout": kubectl_read_only,
+            **(read_only or {}),
+        }
+        self._scope = scope
+        self._memory = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+        self._disk = SQLiteStore(path, max_bytes=disk_max_bytes) if path else None
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "skips": 0, "invalidations": 0}
+
+    def ttl(self, func_name: str) -> float:
+        return self._tool_ttls.get(func_name, self._ttl)
+
+    def cacheable(self, func_name: str, func_edit: int = 0) -> bool:
+        return func_edit == 0 and self.ttl(func_name) > 0
+
+    def read_only(self, func_name: str, func_args: Dict[str, Any]) -> bool:
+        """Whether the call is read-only, the tools without a predicate are trusted by their TTL."""
+        predicate = self._read_only.get(func_name)
+        return predicate is None or predicate(func_args)
+
+    def get(self, func_name: str, func_args: Dict[str, Any], scope: str = None) -> Tuple[bool, str]:
+        """
+        Returns:
+            Tuple[bool, str]: Whether the result is cached, and the cached result.
+        """
+        key = cache_key(func_name, func_args, self._scope if scope is None else scope)
+        found, value = self._memory.get(key)
+        if found:
+            self._count("memory_hits")
+            return True, value
+        if self._disk is not None:
+            data = self._disk.get(key)
+            if data is not None:
+                value = data.decode()
+                # promote the result to the memory tier
+                self._memory.put(key, value, len(data), ttl=self.ttl(func_name))
+                self._count("disk_hits")
+                return True, value
+        self._count("misses")
+        return False, None
+
+    def put(self, func_name: str, func_args: Dict[str, Any], result: str, scope: str = None):
+        key = cache_key(func_name, func_args, self._scope if scope is None else scope)
+        data = result.encode()
+        ttl = self.ttl(func_name)
+        self._memory.put(key, result, len(data), ttl=ttl)
+        if self._disk is not None:
+            self._disk.put(key, data, ttl=ttl)
+
+    def wrap(
+        self, func_name: str, func: Callable[..., Any], func_edit: int = 0
+    ) -> Callable[..., Any]:
+        """
+        Wrap the tool function, so the call is served from the cache and the result of a miss is saved.
+        The coroutine functions and the tools that aren't cacheable are returned as they are.
+        """
+        if inspect.iscoroutinefunction(func):
+            return func
+        if not self.cacheable(func_name, func_edit):
+            self._count("skips")
+            return func
+        # e.g. the bound kubectl_cmd of a KubectlExecutor
+        scope = getattr(getattr(func, "__self__", None), "cache_scope", None)
+        if scope is None:
+            scope = self._scope
+
+        def cached_func(**func_args):
+            if not self.read_only(func_name, func_args):
+                self._count("skips")
+                try:
+                    return func(**func_args)
+                finally:
+                    # the write may change any result read before it
+                    self._count("invalidations")
+                    self.clear()
+
+            found, value = self.get(func_name, func_args, scope)
+            if found:
+                return value
+            result = func(**func_args)
+            # only the plain text result can be replayed, e.g. a handoff agent can't, and a failure is retried
+            if isinstance(result, str) and not isinstance(result, ToolError):
+                self.put(func_name, func_args, result, scope)
+            return result
+
+        return cached_func
+
+    def invalidate(self, func_name: str, func_args: Dict[str, Any], scope: str = None):
+        key = cache_key(func_name, func_args, self._scope if scope is None else scope)
+        self._memory.delete(key)
+        if self._disk is not None:
+            self._disk.delete(key)
+
+    def clear(self):
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        The hit and miss counters, `skips` counts the calls of the tools that aren't cacheable and the calls that
+        aren't read-only, `invalidations` counts the calls that cleared the cache.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["memory_entries"] = len(self._memory)
+        stats["memory_bytes"] = self._memory.size
+        return stats
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+
+def canonicalize_args(func_args: Dict[str, Any]) -> str:
+    # the same call written with the other key order or surrounding spaces hits the same entry
+    def normalize(value):
+        if isinstance(value, str):
+            return value.strip()
+        if isinstance(value, dict):
+            return {k: normalize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        return value
+
+    return json.dumps(
+        normalize(func_args or {}),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+
+
+def cache_key(func_name: str, func_args: Dict[str, Any], scope: str = "") -> str:
+    content = f"{scope}\n{func_name}\n{canonicalize_args(func_args)}"
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def kubectl_read_only(func_args: Dict[str, Any]) -> bool:
+    """
+    Whether the kubectl command of the call only reads the cluster, e.g. `kubectl get pods -n default | grep nginx`,
+    but not an apply, a watch, a followed log or a command chained after it.
+    """
+    command = (func_args or {}).get("command")
+    if not isinstance(command, str) or any(token in command for token in (";", "&", ">", "<", "`", "$(")):
+        return False
+    try:
+        segments = [shlex.split(segment) for segment in command.split("|")]
+    except ValueError:
+        return False
+    if any(not words or words[0] not in PIPE_FILTERS for words in segments[1:]):
+        return False
+
+    words = segments[0]
+    if words and words[0] == "kubectl":
+        words = words[1:]
+    verb, skip_value = None, False
+    for word in words:
+        if skip_value:
+            skip_value = False
+        elif word.startswith("-"):
+            skip_value = verb is None and word in KUBECTL_VALUE_FLAGS
+        else:
+            verb = word
+            break
+    if verb not in KUBECTL_READ_VERBS:
+        return False
+    # the streaming commands never finish with a result to replay
+    return not any(
+        word in ("-w", "--watch", "--watch-only", "--follow") or word.startswith(("--watch=", "--follow="))
+        or (verb == "logs" and word == "-f")
+        for word in words
+    )
@@ -1,4 +1,35 @@
 # tools/__init__.py
-from .groq_client import GroqClient
-from .aws_bedrock import BedRockClient
-from .config import ClientConfig
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .groq_client import GroqClient, AsyncGroqClient
+    from .aws_bedrock import BedRockClient, AsyncBedRockClient
+    from .config import ClientConfig
+    from .stream import ChatStream
+    from .cached_client import CachedClient
+
+# the groq and boto3 sdks are loaded only by the client using them
+_exports = {
+    "GroqClient": ".groq_client",
+    "AsyncGroqClient": ".groq_client",
+    "BedRockClient": ".aws_bedrock",
+    "AsyncBedRockClient": ".aws_bedrock",
+    "ClientConfig": ".config",
+    "ChatStream": ".stream",
+    "CachedClient": ".cached_client",
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_exports])
@@ -1,4 +1,6 @@
+import asyncio
 import boto3
+import contextlib
 from botocore.exceptions import ClientError
 import instructor
 import os
@@ -10,8 +12,13 @@ from openai.types.chat import (
     ChatCompletionMessageToolCall,
     ChatCompletionToolMessageParam,
 )
-from openai.types import FunctionDefinition, FunctionParameters
+from openai.types import FunctionDefinition, FunctionParameters, CompletionUsage
 from openai.types.chat.chat_completion_message_tool_call import Function
+from openai.types.chat.chat_completion_chunk import (
+    ChoiceDelta,
+    ChoiceDeltaToolCall,
+    ChoiceDeltaToolCallFunction,
+)
 from typing import Iterable, List
 import rich
 import json
@@ -19,6 +26,7 @@ import json
 from dotenv import load_dotenv
 import rich.json
 from client.config import ClientConfig
+from client.stream import ChatStream
 
 load_dotenv()
 
@@ -35,6 +43,7 @@ class BedRockClient:
         self.price_per_1000_input = config.price_1k_token_in
         self.price_per_1000_output = config.price_1k_token_out
         self.total_price = 0
+        self.last_usage: CompletionUsage | None = None  # the token usage of the last request
 
         session = boto3.Session()
         self._boto3_client = session.client(
@@ -52,67 +61,9 @@ class BedRockClient:
     ):
 
         # rich.get_console().print(messages)
-        message_list = []
-        for msg in messages:
-            if isinstance(msg, ChatCompletionMessage):
-                content = [{"text": msg.content}]
-                if msg.role == "system":
-                    system_message = content
-                else:
-                    message_list.append({"role": msg.role, "content": content})
-            else:
-                if "tool_calls" in msg:
-                    tool_calls = msg["tool_calls"]
-                    tool_call: ChatCompletionMessageToolCall = tool_calls[0]
-                    tool_content = {
-                        "toolUse": {
-                            "toolUseId": tool_call.id,
-                            "name": tool_call.function.name,
-                            "input": json.loads(tool_call.function.arguments),
-                        }
-                    }
-                    message_list.append(
-                        {"role": msg["role"], "content": [tool_content]}
-                    )
-                elif "tool_call_id" in msg:
-                    tool_result_content = {
-                        "toolResult": {
-                            "toolUseId": msg["tool_call_id"],
-                            "content": [{"json": {"result": msg["content"]}}],
-                        }
-                    }
-                    # Member must satisfy enum value set: [user, assistant]
-                    message_list.append(
-                        {
-                            "role": "user",
-                            "content": [tool_result_content],
-                        }
-                    )
-
-                else:
-                    content = [{"text": msg["content"]}]
-                    if msg["role"] == "system":
-                        system_message = content
-                    else:
-                        message_list.append({"role": msg["role"], "content": content})
-
-        while len(message_list) > 0 and message_list[0]["role"] != "user":
-            message_list.pop(0)
-
-        # rich.get_console().print(message_list)
-
-        tool_list = convert_to_tool_list(tools)
-        # Prepare the arguments for the converse call
-
-        converse_args = {
-            "modelId": self.model_id,
-            "messages": message_list,
-            "system": system_message,
-            "inferenceConfig": self.inference_config,
-        }
-        # Add toolConfig if tool_list is not empty
-        if tool_list:
-            converse_args["toolConfig"] = {"tools": tool_list}
+        converse_args = build_converse_args(
+            self.model_id, self.inference_config, messages, tools
+        )
 
         # Call the converse method with the prepared arguments
         response = self._boto3_client.converse(**converse_args)
@@ -135,6 +86,7 @@ class BedRockClient:
 
         # price
         usage = response["usage"]
+        self.last_usage = converse_usage(usage)
         cost = calculate_llm_price(
             usage["inputTokens"],
             usage["outputTokens"],
@@ -147,6 +99,233 @@ class BedRockClient:
             self.total_price,
         )
 
+    def stream(
+        self,
+        messages: Iterable[ChatCompletionMessageParam],
+        tools: Iterable[ChatCompletionToolParam],
+        response_model=None,
+    ) -> ChatStream:
+        converse_args = build_converse_args(
+            self.model_id, self.inference_config, messages, tools
+        )
+        response = self._boto3_client.converse_stream(**converse_args)
+        return ChatStream(converse_stream_deltas(response), on_usage=self._add_price)
+
+    def _add_price(self, usage: CompletionUsage):
+        self.total_price += calculate_llm_price(
+            usage.prompt_tokens,
+            usage.completion_tokens,
+            self.price_per_1000_input,
+            self.price_per_1000_output,
+        )
+        return self.total_price
+
+
+# AsyncBedRockClient is the awaitable counterpart of the BedRockClient. The boto3 client is blocking, so the
+# converse call goes through the aiobotocore transport, which is imported only when the async client is used.
+# The response isn't streamed, the agents awaiting it reject stream=True.
+class AsyncBedRockClient:
+    def __init__(self, config: ClientConfig):
+        from aiobotocore.session import get_session
+
+        self.model_id = config.model
+        self.inference_config = config.ext["inference_config"]
+        self.price_per_1000_input = config.price_1k_token_in
+        self.price_per_1000_output = config.price_1k_token_out
+        self.total_price = 0
+        self.last_usage: CompletionUsage | None = None  # the token usage of the last request
+
+        self._session = get_session()
+        self._exit_stack = None
+        self._bedrock_client = None
+        self._client_lock = asyncio.Lock()
+        self._requests = 0  # the requests in flight on the client
+        self._close_pending = False  # close the client once the requests in flight are done
+
+    async def _client(self):
+        # the client keeps the connection pool, create it once on the running loop and reuse it for the later requests
+        async with self._client_lock:
+            if self._bedrock_client is None:
+                self._exit_stack = contextlib.AsyncExitStack()
+                self._bedrock_client = await self._exit_stack.enter_async_context(
+                    self._session.create_client(
+                        "bedrock-runtime",
+                        region_name=os.getenv("AWS_REGION_NAME"),
+                        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+                        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+                    )
+                )
+            self._requests += 1
+            self._close_pending = False
+        return self._bedrock_client
+
+    async def _release(self):
+        async with self._client_lock:
+            self._requests -= 1
+            if self._requests == 0 and self._close_pending:
+                await self._close()
+
+    async def close(self):
+        """
+        Close the connection pool, e.g. by the Agent.arun once it's done. The requests of the other sessions sharing
+        the client finish first, and the next request opens a new pool on its running loop.
+        """
+        async with self._client_lock:
+            if self._requests > 0:
+                self._close_pending = True
+            else:
+                await self._close()
+
+    async def _close(self):
+        self._close_pending = False
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+        self._exit_stack = None
+        self._bedrock_client = None
+
+    async def __call__(
+        self,
+        messages: Iterable[ChatCompletionMessageParam],
+        tools: Iterable[ChatCompletionToolParam],
+        response_model=None,
+    ):
+        converse_args = build_converse_args(
+            self.model_id, self.inference_config, messages, tools
+        )
+        bedrock_client = await self._client()
+        try:
+            response = await bedrock_client.converse(**converse_args)
+        finally:
+            await self._release()
+
+        usage = response["usage"]
+        self.last_usage = converse_usage(usage)
+        cost = calculate_llm_price(
+            usage["inputTokens"],
+            usage["outputTokens"],
+            self.price_per_1000_input,
+            self.price_per_1000_output,
+        )
+        self.total_price += cost
+        return (
+            response_to_message_chat(response=response),
+            self.total_price,
+        )
+
+
+def converse_usage(usage) -> CompletionUsage:
+    return CompletionUsage(
+        prompt_tokens=usage["inputTokens"],
+        completion_tokens=usage["outputTokens"],
+        total_tokens=usage["totalTokens"],
+    )
+
+
+def build_converse_args(
+    model_id,
+    inference_config,
+    messages: Iterable[ChatCompletionMessageParam],
+    tools: Iterable[ChatCompletionToolParam],
+) -> dict:
+    message_list = []
+    for msg in messages:
+        if isinstance(msg, ChatCompletionMessage):
+            content = [{"text": msg.content}]
+            if msg.role == "system":
+                system_message = content
+            else:
+                message_list.append({"role": msg.role, "content": content})
+        else:
+            if "tool_calls" in msg:
+                tool_calls = msg["tool_calls"]
+                tool_call: ChatCompletionMessageToolCall = tool_calls[0]
+                tool_content = {
+                    "toolUse": {
+                        "toolUseId": tool_call.id,
+                        "name": tool_call.function.name,
+                        "input": json.loads(tool_call.function.arguments),
+                    }
+                }
+                message_list.append({"role": msg["role"], "content": [tool_content]})
+            elif "tool_call_id" in msg:
+                tool_result_content = {
+                    "toolResult": {
+                        "toolUseId": msg["tool_call_id"],
+                        "content": [{"json": {"result": msg["content"]}}],
+                    }
+                }
+                # Member must satisfy enum value set: [user, assistant]
+                message_list.append(
+                    {
+                        "role": "user",
+                        "content": [tool_result_content],
+                    }
+                )
+
+            else:
+                content = [{"text": msg["content"]}]
+                if msg["role"] == "system":
+                    system_message = content
+                else:
+                    message_list.append({"role": msg["role"], "content": content})
+
+    while len(message_list) > 0 and message_list[0]["role"] != "user":
+        message_list.pop(0)
+
+    # rich.get_console().print(message_list)
+
+    tool_list = convert_to_tool_list(tools)
+    # Prepare the arguments for the converse call
+
+    converse_args = {
+        "modelId": model_id,
+        "messages": message_list,
+        "system": system_message,
+        "inferenceConfig": inference_config,
+    }
+    # Add toolConfig if tool_list is not empty
+    if tool_list:
+        converse_args["toolConfig"] = {"tools": tool_list}
+    return converse_args
+
+
+# convert the converse_stream events into the choice deltas of the openai chunks
+def converse_stream_deltas(response):
+    for event in response["stream"]:
+        if "contentBlockStart" in event:
+            block = event["contentBlockStart"]
+            tool_use = block["start"].get("toolUse")
+            if tool_use:
+                yield ChoiceDelta(
+                    tool_calls=[
+                        ChoiceDeltaToolCall(
+                            index=block["contentBlockIndex"],
+                            id=tool_use["toolUseId"],
+                            function=ChoiceDeltaToolCallFunction(
+                                name=tool_use["name"], arguments=""
+                            ),
+                        )
+                    ]
+                )
+        elif "contentBlockDelta" in event:
+            block = event["contentBlockDelta"]
+            delta = block["delta"]
+            if "text" in delta:
+                yield ChoiceDelta(content=delta["text"])
+            elif "toolUse" in delta:
+                yield ChoiceDelta(
+                    tool_calls=[
+                        ChoiceDeltaToolCall(
+                            index=block["contentBlockIndex"],
+                            function=ChoiceDeltaToolCallFunction(
+                                arguments=delta["toolUse"]["input"]
+                            ),
+                        )
+                    ]
+                )
+        elif "metadata" in event:
+            yield converse_usage(event["metadata"]["usage"])
+
 
 def response_to_message_chat(response) -> ChatCompletionMessage:
     chat_message = ChatCompletionMessage(
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import threading
+from typing import Iterable
+from pydantic import BaseModel
+from openai.types.chat import (
+    ChatCompletionMessage,
+    ChatCompletionMessageParam,
+    ChatCompletionToolParam,
+)
+
+from cache import LRUCache, SQLiteStore
+from client.stream import ChatStream, message_deltas
+
+
+# CachedClient wraps any client of the agent (GroqClient, BedRockClient, ...) and serves the repeated requests from a
+# store instead of the model, e.g. replaying the same planner prompts while developing the runbooks. The lookup is an
+# exact match of the whole request, there is no prefix matching: a replayed session hits until its first request
+# that differs, e.g. by one message, and every request from there on goes to the model.
+class CachedClient:
+    def __init__(
+        self,
+        client,
+        path: str = None,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        bypass_temperature: float | None = None,
+    ):
+        """
+        Args:
+            client: The wrapped client, called with (messages, tools, response_model) and returning (message, price).
+            path (str): The SQLite file persisting the responses, None to keep them in memory only.
+            max_entries (int): The maximum number of stored responses, in the SQLite file or in memory.
+            max_bytes (int): The maximum total size of the stored responses, in the SQLite file or in memory.
+            bypass_temperature (float): Bypass the cache when the client samples above this temperature.
+        """
+        self._client = client
+        self.model_id = getattr(client, "model_id", type(client).__name__)
+        self._store = (
+            SQLiteStore(path, max_bytes=max_bytes, max_entries=max_entries)
+            if path
+            else None
+        )
+        self._memory = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+        self._bypass_temperature = bypass_temperature
+        self.bypass = False  # switch the cache off at runtime, the requests go to the client
+        self.last_usage = None  # the token usage of the last request, None if it was served from the store
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "bypasses": 0}
+
+    def __call__(
+        self,
+        messages: Iterable[ChatCompletionMessageParam],
+        tools: Iterable[ChatCompletionToolParam],
+        response_model: BaseModel = None,
+    ):
+        self.last_usage = None
+        if self._bypassed():
+            return self._call(messages, tools, response_model)
+
+        key = self.cache_key(messages, tools, response_model)
+        message = self._load(key)
+        if message is not None:
+            return message, self.total_price
+
+        message, price = self._call(messages, tools, response_model)
+        self._save(key, message)
+        return message, price
+
+    def stream(
+        self,
+        messages: Iterable[ChatCompletionMessageParam],
+        tools: Iterable[ChatCompletionToolParam],
+        response_model: BaseModel = None,
+    ) -> ChatStream:
+        if self._bypassed():
+            return self._client.stream(messages, tools, response_model)
+
+        key = self.cache_key(messages, tools, response_model)
+        message = self._load(key)
+        if message is not None:
+            stream = ChatStream(message_deltas(message))
+            stream.price = self.total_price
+            return stream
+
+        stream = self._client.stream(messages, tools, response_model)
+        stream.add_done_callback(lambda message: self._save(key, message))
+        return stream
+
+    @property
+    def total_price(self):
+        return getattr(self._client, "total_price", "")
+
+    @property
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def cache_key(
+        self,
+        messages: Iterable[ChatCompletionMessageParam],
+        tools: Iterable[ChatCompletionToolParam],
+        response_model: BaseModel = None,
+    ) -> str:
+        request = {
+            "model": self.model_id,
+            "messages": [normalize(message) for message in messages],
+            "tools": [normalize(tool) for tool in tools or []],
+            "response_model": (
+                response_model.model_json_schema() if response_model else None
+            ),
+        }
+        content = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def _call(self, messages, tools, response_model):
+        message, price = self._client(messages, tools, response_model)
+        self.last_usage = getattr(self._client, "last_usage", None)
+        return message, price
+
+    def _bypassed(self) -> bool:
+        bypassed = self.bypass or (
+            self._bypass_temperature is not None
+            and client_temperature(self._client) > self._bypass_temperature
+        )
+        if bypassed:
+            self._count("bypasses")
+        return bypassed
+
+    def _load(self, key: str) -> ChatCompletionMessage | None:
+        if self._store is not None:
+            data = self._store.get(key)
+        else:
+            _, data = self._memory.get(key)
+        if data is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return ChatCompletionMessage.model_validate_json(data)
+
+    def _save(self, key: str, message: ChatCompletionMessage):
+        data = message.model_dump_json(exclude_none=True).encode()
+        if self._store is not None:
+            self._store.put(key, data)
+        else:
+            self._memory.put(key, data, len(data))
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+
+def normalize(value):
+    # the messages mix the param dicts with the pydantic objects, e.g. the tool calls of the assistant message
+    if isinstance(value, BaseModel):
+        return normalize(value.model_dump(exclude_none=True))
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def client_temperature(client) -> float:
+    temperature = getattr(client, "model_temperature", None)
+    if temperature is None:
+        inference_config = getattr(client, "inference_config", None) or {}
+        temperature = inference_config.get("temperature", 0)
+    return temperature or 0
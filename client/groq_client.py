@@ -1,12 +1,12 @@
 import os
-from groq import Groq
+from groq import Groq, AsyncGroq
 from openai.types.chat import (
     ChatCompletionMessage,
     ChatCompletionMessageParam,
     ChatCompletionToolParam,
 )
 import instructor
-from openai.types import FunctionDefinition, FunctionParameters
+from openai.types import FunctionDefinition, FunctionParameters, CompletionUsage
 from openai import NotGiven
 from typing import Iterable
 from pydantic import BaseModel
@@ -14,6 +14,7 @@ import rich
 
 from dotenv import load_dotenv
 from client.config import ClientConfig
+from client.stream import ChatStream
 
 load_dotenv()
 
@@ -21,37 +22,57 @@ load_dotenv()
 NOT_GIVEN = NotGiven()
 
 
-class GroqClient:
+# the request and response shared by the GroqClient and the AsyncGroqClient, only the awaiting differs
+class _GroqCompletions:
+    _groq_class = Groq
+
     def __init__(self, config: ClientConfig):
 
         self.model_id = config.model
         self.model_temperature = config.temperature
-        self._grop_client = Groq(
+        self._grop_client = self._groq_class(
             api_key=config.api_key,
         )
         self._mode = config.mode
+        self.last_usage: CompletionUsage | None = None  # the token usage of the last request
         if self._mode == instructor.Mode.JSON:
             self._client = instructor.from_groq(
                 self._grop_client, mode=instructor.Mode.JSON
             )
 
-    def __call__(
+    def _structured(self, response_model: BaseModel) -> bool:
+        return bool(response_model) and self._mode == instructor.Mode.JSON
+
+    # the completions API and the arguments of the request
+    def _request(
         self,
         messages: Iterable[ChatCompletionMessageParam],
         tools: Iterable[ChatCompletionToolParam],
         response_model: BaseModel = None,
-    ) -> ChatCompletionMessage:
+    ):
         # https://github.com/openai/openai-python/blob/main/src/openai/types/chat/completion_create_params.py
-        if response_model and self._mode == instructor.Mode.JSON:
-            chat_completion: BaseModel = self._client.chat.completions.create(
+        if self._structured(response_model):
+            return self._client.chat.completions, dict(
                 stream=False,
                 model=self.model_id,
                 temperature=self.model_temperature,
-                messages=messages,
+                messages=list(messages),  # instructor appends the reasks to the messages
                 tools=tools,
                 response_model=response_model,
                 # response_format=ResponseFormat, #TODO: the llama api current doesn't support structured output
             )
+        return self._grop_client.chat.completions, dict(
+            stream=False,
+            model=self.model_id,
+            temperature=self.model_temperature,
+            messages=messages,
+            tools=tools,
+            # response_format=ResponseFormat, #TODO: the llama api current doesn't support structured output
+        )
+
+    def _response(self, chat_completion, response_model: BaseModel = None):
+        if self._structured(response_model):
+            self.last_usage = raw_usage(chat_completion)
             return (
                 ChatCompletionMessage(
                     content=response_model.model_dump_json(chat_completion),
@@ -59,13 +80,71 @@ class GroqClient:
                 ),
                 "",
             )
+        self.last_usage = chat_completion.usage
+        return chat_completion.choices[0].message, ""
 
-        chat_completion = self._grop_client.chat.completions.create(
-            stream=False,
+
+class GroqClient(_GroqCompletions):
+
+    def __call__(
+        self,
+        messages: Iterable[ChatCompletionMessageParam],
+        tools: Iterable[ChatCompletionToolParam],
+        response_model: BaseModel = None,
+    ) -> ChatCompletionMessage:
+        completions, request = self._request(messages, tools, response_model)
+        return self._response(completions.create(**request), response_model)
+
+    def stream(
+        self,
+        messages: Iterable[ChatCompletionMessageParam],
+        tools: Iterable[ChatCompletionToolParam],
+        response_model: BaseModel = None,
+    ) -> ChatStream:
+        request = dict(
+            stream=True,
             model=self.model_id,
             temperature=self.model_temperature,
             messages=messages,
             tools=tools,
-            # response_format=ResponseFormat, #TODO: the llama api current doesn't support structured output
         )
-        return chat_completion.choices[0].message, ""
+        # the structured response is streamed as the raw json content, and validated by the agent once it's complete.
+        # the groq sdk doesn't strip the NotGiven of openai, so the format is only set with the response model
+        if response_model:
+            request["response_format"] = {"type": "json_object"}
+        chunks = self._grop_client.chat.completions.create(**request)
+        return ChatStream(groq_deltas(chunks))
+
+
+def groq_deltas(chunks):
+    for chunk in chunks:
+        if chunk.choices:
+            yield chunk.choices[0].delta
+        # groq reports the usage with the last chunk
+        if chunk.x_groq is not None and chunk.x_groq.usage is not None:
+            usage = chunk.x_groq.usage
+            yield CompletionUsage(
+                prompt_tokens=usage.prompt_tokens,
+                completion_tokens=usage.completion_tokens,
+                total_tokens=usage.total_tokens,
+            )
+
+
+# instructor keeps the raw completion of the structured response
+def raw_usage(structured_completion: BaseModel) -> CompletionUsage | None:
+    raw_response = getattr(structured_completion, "_raw_response", None)
+    return getattr(raw_response, "usage", None)
+
+
+# AsyncGroqClient is the awaitable counterpart of the GroqClient, many sessions can share one event loop with it
+class AsyncGroqClient(_GroqCompletions):
+    _groq_class = AsyncGroq
+
+    async def __call__(
+        self,
+        messages: Iterable[ChatCompletionMessageParam],
+        tools: Iterable[ChatCompletionToolParam],
+        response_model: BaseModel = None,
+    ) -> ChatCompletionMessage:
+        completions, request = self._request(messages, tools, response_model)
+        return self._response(await completions.create(**request), response_model)
@@ -0,0 +1,124 @@
+from typing import Any, Callable, Dict, Iterator, List
+from openai.types import CompletionUsage
+from openai.types.chat import (
+    ChatCompletionMessage,
+    ChatCompletionMessageToolCall,
+)
+from openai.types.chat.chat_completion_chunk import (
+    ChoiceDelta,
+    ChoiceDeltaToolCall,
+    ChoiceDeltaToolCallFunction,
+)
+from openai.types.chat.chat_completion_message_tool_call import Function
+
+
+# ChatStream wraps the chunks of a streamed completion. Iterating it yields the text tokens as they arrive, while the
+# tool call deltas are reassembled by their index, so the message is the same ChatCompletionMessage the blocking
+# request returns.
+class ChatStream:
+    def __init__(
+        self,
+        deltas: Iterator[ChoiceDelta | CompletionUsage],
+        on_usage: Callable[[CompletionUsage], Any] = None,
+    ):
+        """
+        Args:
+            deltas: The choice deltas of the completion chunks, the client may yield the usage once it's reported.
+            on_usage: Turns the usage into the price returned along with the message, like the blocking request.
+        """
+        self._deltas = deltas
+        self._on_usage = on_usage
+        self._listeners: List[Callable[[str], Any]] = []
+        self._done_callbacks: List[Callable[[ChatCompletionMessage], Any]] = []
+        self._content: List[str] = []
+        self._tool_calls: Dict[int, Dict[str, str]] = {}
+        self.usage: CompletionUsage | None = None
+        self.price = ""
+        self.message: ChatCompletionMessage | None = None
+
+    def __iter__(self) -> Iterator[str]:
+        if self.message is not None:
+            return
+        for delta in self._deltas:
+            if isinstance(delta, CompletionUsage):
+                self.usage = delta
+                if self._on_usage is not None:
+                    self.price = self._on_usage(delta)
+                continue
+            for tool_call in delta.tool_calls or []:
+                self._add_tool_call(tool_call)
+            if delta.content:
+                self._content.append(delta.content)
+                for listener in self._listeners:
+                    listener(delta.content)
+                yield delta.content
+        self.message = self._build_message()
+        for callback in self._done_callbacks:
+            callback(self.message)
+
+    def add_listener(self, listener: Callable[[str], Any]):
+        """Call the listener with each text token before it's yielded to the consumer."""
+        self._listeners.append(listener)
+
+    def add_done_callback(self, callback: Callable[[ChatCompletionMessage], Any]):
+        """Call the callback with the reassembled message once the stream is consumed."""
+        self._done_callbacks.append(callback)
+
+    def complete(self):
+        """Consume the remaining tokens, return the message and price like the blocking client call."""
+        for _ in self:
+            pass
+        return self.message, self.price
+
+    @property
+    def content(self) -> str:
+        return "".join(self._content)
+
+    def _add_tool_call(self, tool_call):
+        # the id and name arrive with the first delta of the call, then the arguments arrive in pieces
+        entry = self._tool_calls.setdefault(
+            tool_call.index, {"id": "", "name": "", "arguments": ""}
+        )
+        if tool_call.id:
+            entry["id"] = tool_call.id
+        if tool_call.function is not None:
+            if tool_call.function.name:
+                entry["name"] += tool_call.function.name
+            if tool_call.function.arguments:
+                entry["arguments"] += tool_call.function.arguments
+
+    def _build_message(self) -> ChatCompletionMessage:
+        chat_message = ChatCompletionMessage(role="assistant")
+        if self._content:
+            chat_message.content = self.content
+        if self._tool_calls:
+            chat_message.tool_calls = [
+                ChatCompletionMessageToolCall(
+                    id=entry["id"],
+                    type="function",
+                    function=Function(
+                        name=entry["name"], arguments=entry["arguments"] or "{}"
+                    ),
+                )
+                for _, entry in sorted(self._tool_calls.items())
+            ]
+        return chat_message
+
+
+def message_deltas(message: ChatCompletionMessage) -> Iterator[ChoiceDelta]:
+    """Replay a complete message as the deltas of a ChatStream."""
+    if message.content:
+        yield ChoiceDelta(content=message.content)
+    for index, tool_call in enumerate(message.tool_calls or []):
+        yield ChoiceDelta(
+            tool_calls=[
+                ChoiceDeltaToolCall(
+                    index=index,
+                    id=tool_call.id,
+                    function=ChoiceDeltaToolCallFunction(
+                        name=tool_call.function.name,
+                        arguments=tool_call.function.arguments,
+                    ),
+                )
+            ]
+        )
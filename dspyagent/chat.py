@@ -1,6 +1,5 @@
 from dspy.primitives.program import Module
 import sys
-import re
 from typing import List, Tuple
 from openai.types.chat import (
     ChatCompletionMessageParam,
@@ -423,34 +422,3 @@ def clear_previous_lines(n=1):
         sys.stdout.write("\033[F")  # Move the cursor up one line
         sys.stdout.write("\033[K")  # Clear the line
     sys.stdout.flush()
-
-
-def deduplicate_log(log: str, size=3000) -> str:
-    """
-    Deduplicate logs and only keep the latest log entries.
-
-    Args:
-        log (str): The log string containing multiple log entries.
-        size (int): The maximum size of the log to process.
-
-    Returns:
-        str: Deduplicated logs with only the latest entries.
-    """
-    # Limit log size
-    if len(log) > size:
-        log = log[-size:]
-
-    lines = log.splitlines()
-    latest_logs = {}
-
-    for line in lines:
-        # Remove timestamp (common formats: YYYY-MM-DD, HH:MM:SS, or ISO8601)
-        cleaned_line = re.sub(
-            r"\d{4}-\d{2}-\d{2}[T ]?\d{2}:\d{2}:\d{2}(?:\.\d+Z)?", "", line
-        ).strip()
-
-        # Update the latest occurrence of each log message
-        latest_logs[cleaned_line] = line  # Overwrite with the latest line
-
-    # Return the latest entries in the order they appeared
-    return "\n".join(latest_logs.values())
@@ -1,3 +1,36 @@
-from .chat_memory import ChatMemory
-from .chat_buffer_memory import ChatBufferMemory
-from .chat_vector_memory import ChatVectorMemory
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .chat_memory import ChatMemory
+    from .chat_buffer_memory import ChatBufferMemory
+    from .chat_vector_memory import ChatVectorMemory, CachedEmbedding
+    from .chat_token_memory import ChatTokenMemory
+    from .chat_index_memory import ChatIndexMemory
+    from .numpy_index import NumpyVectorIndex
+
+# the memories are imported on the first access, e.g. llama_index is loaded only with the ChatVectorMemory, and numpy
+# only with the ChatIndexMemory
+_exports = {
+    "ChatMemory": ".chat_memory",
+    "ChatBufferMemory": ".chat_buffer_memory",
+    "ChatVectorMemory": ".chat_vector_memory",
+    "CachedEmbedding": ".chat_vector_memory",
+    "ChatTokenMemory": ".chat_token_memory",
+    "ChatIndexMemory": ".chat_index_memory",
+    "NumpyVectorIndex": ".numpy_index",
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_exports])
@@ -1,4 +1,6 @@
-from typing import List, Any
+from collections import deque
+from collections.abc import Sequence
+from typing import Deque
 from openai.types.chat import (
     ChatCompletionMessageParam,
     ChatCompletionSystemMessageParam,
@@ -7,12 +9,55 @@ from openai.types.chat import (
 from .chat_memory import ChatMemory
 
 
+class MessagesView(Sequence):
+    """
+    A read-only view of the memory messages led by the system message, so get doesn't copy the history on each turn.
+    It follows the memory as the messages are added, copy it by list() to keep the messages of a turn.
+    """
+
+    __slots__ = ("_system", "_messages")
+
+    def __init__(self, system: ChatCompletionSystemMessageParam | None, messages: Deque[ChatCompletionMessageParam]):
+        self._system = system
+        self._messages = messages
+
+    def __len__(self) -> int:
+        return len(self._messages) + (self._system is not None)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("messages index out of range")
+        if self._system is not None:
+            if index == 0:
+                return self._system
+            index -= 1
+        return self._messages[index]
+
+    def __iter__(self):
+        if self._system is not None:
+            yield self._system
+        yield from self._messages
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, (list, tuple, MessagesView)) and list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
 # ChatBufferMemory is a short-term memory implementation designed to retrieve the most recent message along with the current session context.
+# The messages are kept in a bounded deque, so adding to a full memory evicts the oldest message without copying the rest.
 class ChatBufferMemory(ChatMemory):
     def __init__(self, memory_id="", size=3):
         self._memory_id = memory_id
-        self._messages: List[ChatCompletionMessageParam] = []
+        self._messages: Deque[ChatCompletionMessageParam] = deque(maxlen=size)
         self._size = size
+        # the system message is built again only when its text changes
+        self._system_message: ChatCompletionSystemMessageParam | None = None
 
     @property
     def id(self) -> str:
@@ -20,26 +65,29 @@ class ChatBufferMemory(ChatMemory):
 
     def add(self, message: ChatCompletionMessageParam, persistent=False):
         self._messages.append(message)
-        if len(self._messages) > self._size:
-            self._messages = self._messages[-self._size :]
         if self._messages[0]["role"] == "tool":
-            self._messages = self._messages[1:]
+            self._messages.popleft()
 
     def pop(self, index=-1) -> ChatCompletionMessageParam:
-        return self._messages.pop(index)
-
-    def get(self, system) -> List[ChatCompletionMessageParam]:
-        new_messages = []
-        if system:
-            new_messages.append(
-                ChatCompletionSystemMessageParam(
-                    role="system",
-                    content=system,
-                )
+        if index == -1:
+            return self._messages.pop()
+        message = self._messages[index]
+        del self._messages[index]
+        return message
+
+    def last(self) -> ChatCompletionMessageParam | None:
+        return self._messages[-1] if self._messages else None
+
+    def get(self, system) -> MessagesView:
+        if not system:
+            return MessagesView(None, self._messages)
+        # a client may have appended to the content in place, e.g. the json schema of instructor
+        if self._system_message is None or self._system_message["content"] != system:
+            self._system_message = ChatCompletionSystemMessageParam(
+                role="system",
+                content=system,
             )
-        for message in self._messages:
-            new_messages.append(message)
-        return new_messages
+        return MessagesView(self._system_message, self._messages)
 
     def clear(self) -> None:
-        self._messages = []
+        self._messages.clear()
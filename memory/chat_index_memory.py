@@ -0,0 +1,110 @@
+import datetime
+from typing import Callable, List, Sequence, Tuple
+from openai.types.chat import (
+    ChatCompletionMessage,
+    ChatCompletionMessageParam,
+    ChatCompletionSystemMessageParam,
+)
+
+from .chat_memory import ChatMemory, memory_context
+from .numpy_index import NumpyVectorIndex
+
+Embed = Callable[[List[str]], Sequence[Sequence[float]]]
+
+
+# The ChatIndexMemory is a long-term memory like the ChatVectorMemory, without LlamaIndex or a vector database: the
+# persistent messages are embedded by the given batch function and kept in a NumpyVectorIndex, e.g. memory-mapped
+# from a local directory, so the memory of an agent opens by mapping a file instead of connecting a client.
+class ChatIndexMemory(ChatMemory):
+    def __init__(
+        self,
+        embed: Embed,
+        index: NumpyVectorIndex,
+        memory_id="",
+        buffer_size=6,
+        top_k=3,
+    ):
+        """
+        Args:
+            embed (Callable[[List[str]], Sequence[Sequence[float]]]): Embed a batch of texts, e.g. the
+                get_text_embedding_batch of a LlamaIndex embedding or the encode of a SentenceTransformer.
+            index (NumpyVectorIndex): The index of the persistent messages.
+            memory_id (str): The id of the memory.
+            buffer_size (int): The recent messages sent with each request.
+            top_k (int): The messages retrieved from the index by the last user or assistant message.
+        """
+        self._memory_id = memory_id
+        self._messages: List[ChatCompletionMessageParam] = []
+        self._size = buffer_size
+        self._embed = embed
+        self._index = index
+        self._top_k = top_k
+        self._generation = 0  # bumped by each add to the index
+        self._retrieved: Tuple[str, int, str | None] | None = None  # the query, generation and context of the last get
+        self._system_message: ChatCompletionSystemMessageParam | None = None
+
+    @property
+    def id(self) -> str:
+        return self._memory_id
+
+    @property
+    def index(self) -> NumpyVectorIndex:
+        return self._index
+
+    def add(
+        self,
+        message: ChatCompletionMessageParam | ChatCompletionMessage,
+        persistent=False,
+    ):
+        if message.get("content"):
+            self._messages.append(message)
+        if persistent is True:
+            time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            if message.get("content"):
+                targets = [message]
+            else:
+                targets = [msg for msg in self._messages if self._target_vector_message(msg)]
+            if targets:
+                contents = [f"update at {time} with content: {msg.get('content')}" for msg in targets]
+                self._index.add(
+                    self._embed(contents),
+                    [{"role": msg.get("role"), "content": content} for msg, content in zip(targets, contents)],
+                )
+                self._generation += 1
+
+        if len(self._messages) > self._size:
+            self._messages = self._messages[-self._size :]
+
+    def get(self, system) -> List[ChatCompletionMessageParam]:
+        new_system = system
+        # add context to system by the index
+        last_message = self._messages[-1]
+        if self._target_vector_message(last_message):
+            context = self._retrieve(f"{last_message.get('content')}")
+            if context:
+                new_system = f"SYSTEM: {system} \n {context}"
+
+        if self._system_message is None or self._system_message["content"] != new_system:
+            self._system_message = ChatCompletionSystemMessageParam(
+                role="system",
+                content=new_system,
+            )
+        return [self._system_message, *self._messages]
+
+    def clear(self) -> None:
+        self._messages = []
+
+    def pop(self, index=-1) -> ChatCompletionMessageParam:
+        return self._messages.pop(index)
+
+    def _retrieve(self, query: str) -> str | None:
+        # the tool iterations of a turn query by the same last message
+        if self._retrieved is not None and self._retrieved[:2] == (query, self._generation):
+            return self._retrieved[2]
+        hits = self._index.search(self._embed([query])[0], self._top_k)
+        context = memory_context((payload["role"], payload["content"]) for _, _, payload in hits) if hits else None
+        self._retrieved = (query, self._generation, context)
+        return context
+
+    def _target_vector_message(self, message: ChatCompletionMessageParam | ChatCompletionMessage) -> bool:
+        return message.get("role") == "user" or message.get("role") == "assistant"
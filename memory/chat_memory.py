@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterable, List, Tuple
 
 from openai.types.chat import (
     ChatCompletionMessageParam,
@@ -21,12 +21,35 @@ class ChatMemory(ABC):
 
     @abstractmethod
     def get(self, system) -> List[ChatCompletionMessageParam]:
+        """
+        The messages of the next request, led by the system message when it's given. The result may be a live view of
+        the memory, e.g. the MessagesView of ChatBufferMemory: it shows the messages added later, and iterating it
+        while the memory is changed raises RuntimeError. Copy it by list() to keep it past the request.
+        """
         pass
 
     @abstractmethod
     def pop(self) -> ChatCompletionMessageParam:
         pass
 
+    def last(self) -> ChatCompletionMessageParam | None:
+        """The latest message, None when the memory is empty."""
+        messages = self.get(None)
+        return messages[-1] if messages else None
+
     @abstractmethod
     def clear(self) -> None:
         pass
+
+
+def memory_context(messages: Iterable[Tuple[str, str]]) -> str:
+    """The block of the (role, content) messages retrieved from the long-term memory, appended to the system prompt."""
+    # refer: https://docs.llamaindex.ai/en/stable/examples/agent/memory/composable_memory/
+    memories = [
+        "Below are a set of relevant dialogues retrieved from memory:",
+        "=====Relevant messages from memory=====",
+    ]
+    for role, content in messages:
+        memories.append(f"  {role}: {content}")
+    memories.append("=====End of relevant messages from memory======")
+    return "\n".join(memories)
@@ -0,0 +1,116 @@
+from typing import List
+from openai.types.chat import (
+    ChatCompletionMessageParam,
+    ChatCompletionSystemMessageParam,
+)
+
+from .chat_memory import ChatMemory
+from .token_counter import estimate_tokens, message_tokens
+
+TRUNCATED_MARKER = "\n...[truncated]...\n"
+
+
+# ChatTokenMemory is a short-term memory bounded by the estimated tokens instead of the message count, so one huge
+# observation evicts more history than ten short turns. The system prompt is counted apart from the messages, and the
+# assistant message with tool_calls is evicted together with its tool results, so no tool result is left orphaned.
+class ChatTokenMemory(ChatMemory):
+    def __init__(self, memory_id="", max_tokens=8192, reserved_tokens=1024):
+        """
+        Args:
+            memory_id (str): The id of the memory.
+            max_tokens (int): The context window of the model.
+            reserved_tokens (int): The tokens kept free for the tool schemas and the completion.
+        """
+        if max_tokens <= reserved_tokens:
+            raise ValueError(
+                f"max_tokens({max_tokens}) should be greater than reserved_tokens({reserved_tokens})"
+            )
+        self._memory_id = memory_id
+        self._messages: List[ChatCompletionMessageParam] = []
+        self._tokens: List[int] = []  # the estimated tokens of each message
+        self._max_tokens = max_tokens
+        self._reserved_tokens = reserved_tokens
+        self._system_tokens = 0  # the tokens of the last system prompt
+
+    @property
+    def id(self) -> str:
+        return self._memory_id
+
+    @property
+    def budget(self) -> int:
+        return self._max_tokens - self._reserved_tokens
+
+    @property
+    def tokens(self) -> int:
+        """The estimated tokens of the messages, without the system prompt."""
+        return sum(self._tokens)
+
+    def add(self, message: ChatCompletionMessageParam, persistent=False):
+        self._messages.append(message)
+        self._tokens.append(message_tokens(message))
+        self._evict()
+
+    def pop(self, index=-1) -> ChatCompletionMessageParam:
+        self._tokens.pop(index)
+        return self._messages.pop(index)
+
+    def get(self, system) -> List[ChatCompletionMessageParam]:
+        new_messages = []
+        if system:
+            self._system_tokens = message_tokens({"role": "system", "content": system})
+            new_messages.append(
+                ChatCompletionSystemMessageParam(
+                    role="system",
+                    content=system,
+                )
+            )
+            # the console may rewrite the last observation in place, e.g. with the user input
+            if self._messages:
+                self._tokens[-1] = message_tokens(self._messages[-1])
+            self._evict()
+        for message in self._messages:
+            new_messages.append(message)
+        return new_messages
+
+    def clear(self) -> None:
+        self._messages = []
+        self._tokens = []
+
+    def _evict(self):
+        budget = self.budget - self._system_tokens
+        # evict the oldest turns but always keep the latest one, which holds the current request
+        while sum(self._tokens) > budget:
+            end = self._turn_end(0)
+            if end >= len(self._messages):
+                break
+            del self._messages[:end]
+            del self._tokens[:end]
+        if sum(self._tokens) > budget:
+            self._truncate(budget)
+
+    def _turn_end(self, start) -> int:
+        # the assistant message with tool_calls can't be sent without the following tool results, and vice versa
+        end = start + 1
+        if self._messages[start].get("tool_calls") or self._messages[start]["role"] == "tool":
+            while end < len(self._messages) and self._messages[end]["role"] == "tool":
+                end += 1
+        return end
+
+    def _truncate(self, budget):
+        # the latest turn alone exceeds the budget: keep the head and tail of its largest contents
+        for index in sorted(range(len(self._messages)), key=lambda i: -self._tokens[i]):
+            excess = sum(self._tokens) - budget
+            if excess <= 0:
+                break
+            content = self._messages[index].get("content")
+            if not isinstance(content, str) or not content:
+                continue
+            content_tokens = estimate_tokens(content)
+            # the tokens aren't spread evenly over the characters, keep a margin
+            keep = max(int((content_tokens - excess) * 0.9) - estimate_tokens(TRUNCATED_MARKER), 0)
+            chars = len(content) * keep // content_tokens
+            self._messages[index] = {
+                **self._messages[index],
+                "content": content[: chars // 2] + TRUNCATED_MARKER + content[len(content) - chars // 2 :],
+            }
+            self._tokens[index] = message_tokens(self._messages[index])
@@ -1,6 +1,14 @@
-from typing import List, Any
+import atexit
+import queue
+import threading
+import time
+import uuid
+from typing import Dict, List, Any
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr
 from llama_index.core.memory import VectorMemory
-from llama_index.core.base.llms.types import ChatMessage
+from llama_index.core.base.llms.types import ChatMessage, MessageRole
+from llama_index.core.schema import TextNode
 from openai.types.chat import (
     ChatCompletionMessage,
     ChatCompletionMessageParam,
@@ -13,16 +21,49 @@ from openai.types.chat import (
 )
 import datetime
 
-from .chat_memory import ChatMemory
+from cache import EmbeddingCache, LRUCache
+from .chat_memory import ChatMemory, memory_context
 
 
 # The ChatVectorMemory is a default implementation for long-term memory, based on the LlamaIndex vector memory. For more information, visit the documentation: LlamaIndex Vector Memory.
+# The persistent messages are written behind: they're queued, and a worker thread embeds each batch in one call and
+# inserts it into the vector store at once. The get waits for the queue, so the retrieval sees every added message,
+# and the worker is closed at the exit of the interpreter, so the queued messages aren't lost with the daemon thread.
+# The retrieved context is cached by the query and the generation of the store, so the tool iterations of a turn,
+# which query by the same last message, reuse it until a new message is written.
 class ChatVectorMemory(ChatMemory):
-    def __init__(self, memory_id="", buffer_size=6, vector_memory: VectorMemory = None):
+    def __init__(
+        self,
+        memory_id="",
+        buffer_size=6,
+        vector_memory: VectorMemory = None,
+        write_behind=True,  # persist the messages on the worker thread, False to persist them in the add
+        batch_size=64,  # the messages embedded and inserted together
+        retrieval_cache_size=32,  # the retrieved contexts kept by their query
+    ):
         self._memory_id = memory_id
         self._messages: List[ChatCompletionMessageParam] = []
         self._size = buffer_size
         self._vector_memory = vector_memory
+        self._write_behind = write_behind
+        self._batch_size = batch_size
+        self._queue: "queue.Queue[ChatMessage | None]" = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._error: Exception | None = None  # the last failure of the worker, raised by the next flush
+        self._batch_node: TextNode | None = None  # the stored node of the last user message, its replies join it
+        self._stats = {
+            "batches": 0,
+            "messages": 0,
+            "errors": 0,
+            "total_batch_ms": 0.0,
+            "max_batch_ms": 0.0,
+            "retrieval_hits": 0,
+            "retrieval_misses": 0,
+        }
+        self._generation = 0  # bumped by each write, the cached retrievals of the older generations are stale
+        self._retrievals = LRUCache(max_entries=retrieval_cache_size)
+        self._system_message: ChatCompletionSystemMessageParam | None = None
 
     @property
     def id(self) -> str:
@@ -38,23 +79,18 @@ class ChatVectorMemory(ChatMemory):
         time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         if persistent is True:
             if message.get("content"):
-                content = message.get("content")
-                self._vector_memory.put(
+                targets = [message]
+            else:
+                targets = [msg for msg in self._messages if self._target_vector_message(msg)]
+            self._persist(
+                [
                     ChatMessage(
-                        role=message.get("role"),
-                        content=f"update at {time} with content: {content}",
+                        role=msg.get("role"),
+                        content=f"update at {time} with content: {msg.get('content')}",
                     )
-                )
-            else:
-                for msg in self._messages:
-                    if self._target_vector_message(msg):
-                        content = msg.get("content")
-                        self._vector_memory.put(
-                            ChatMessage(
-                                role=message.get("role"),
-                                content=f"update at {time} with content: {content}",
-                            )
-                        )
+                    for msg in targets
+                ]
+            )
             # self._vector_memory.set()
 
         if len(self._messages) > self._size:
@@ -65,27 +101,18 @@ class ChatVectorMemory(ChatMemory):
         # add context to system by the vector memory
         last_message = self._messages[-1]
         if self._target_vector_message(last_message):
-            chat_msgs: List[ChatMessage] = self._vector_memory.get(
-                last_message.get("content")
-            )
-            if len(chat_msgs) > 0:
-                # refer: https://docs.llamaindex.ai/en/stable/examples/agent/memory/composable_memory/
-                memories = [
-                    "Below are a set of relevant dialogues retrieved from memory:",
-                    "=====Relevant messages from memory=====",
-                ]
-                for msg in chat_msgs:
-                    memories.append(f"  {msg.role}: {msg.content}")
-                memories.append("=====End of relevant messages from memory======")
-                context = "\n".join(memories)
+            self.flush()
+            context = self._retrieve(last_message.get("content"))
+            if context:
                 new_system = f"SYSTEM: {system} \n {context}"
 
-        new_messages = [
-            ChatCompletionSystemMessageParam(
+        # the system message is built again only when the system or the context changes
+        if self._system_message is None or self._system_message["content"] != new_system:
+            self._system_message = ChatCompletionSystemMessageParam(
                 role="system",
                 content=new_system,
             )
-        ]
+        new_messages = [self._system_message]
         for message in self._messages:
             new_messages.append(message)
         return new_messages
@@ -93,9 +120,131 @@ class ChatVectorMemory(ChatMemory):
     def clear(self) -> None:
         self._messages = []
 
+    def flush(self):
+        """Wait until the queued messages are in the vector store, and raise the last failure of the worker."""
+        self._queue.join()
+        with self._lock:
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        """Flush the queued messages, and stop the worker."""
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            atexit.unregister(self.close)
+            self._queue.put(None)
+            worker.join()
+        self.flush()
+
+    def stats(self) -> Dict[str, float]:
+        """The depth of the queue, the count and latency of the batches written, and the hits of the retrieval cache."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.unfinished_tasks
+        stats["mean_batch_ms"] = stats["total_batch_ms"] / stats["batches"] if stats["batches"] else 0
+        return stats
+
     def pop(self, index=-1) -> ChatCompletionMessageParam:
         return self._messages.pop(index)
 
+    def _retrieve(self, query) -> str | None:
+        """The context block of the messages relevant to the query, None when nothing is relevant."""
+        with self._lock:
+            generation = self._generation
+        key = f"{query}"
+        found, cached = self._retrievals.get(key)
+        if found and cached[0] == generation:
+            with self._lock:
+                self._stats["retrieval_hits"] += 1
+            return cached[1]
+
+        with self._lock:
+            self._stats["retrieval_misses"] += 1
+        chat_msgs: List[ChatMessage] = self._vector_memory.get(query)
+        context = None
+        if len(chat_msgs) > 0:
+            context = memory_context((msg.role, msg.content) for msg in chat_msgs)
+        self._retrievals.put(key, (generation, context), size=len(key) + len(context or ""))
+        return context
+
+    def _persist(self, messages: List[ChatMessage]):
+        if not messages:
+            return
+        if not self._write_behind:
+            self._write(messages)
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name=f"vector-memory-{self._memory_id}", daemon=True
+                )
+                self._worker.start()
+                atexit.register(self.close)
+        for message in messages:
+            self._queue.put(message)
+
+    def _run(self):
+        stopped = False
+        while not stopped:
+            batch = [self._queue.get()]
+            # the messages queued meanwhile join the batch, the worker doesn't wait for more
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            messages = [message for message in batch if message is not None]
+            stopped = len(messages) < len(batch)
+            try:
+                if messages:
+                    self._write(messages)
+            except Exception as e:
+                with self._lock:
+                    self._error = e
+                    self._stats["errors"] += 1
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, messages: List[ChatMessage]):
+        started = time.perf_counter()
+        vector_memory = self._vector_memory
+        if not isinstance(vector_memory, VectorMemory):
+            vector_memory.put_messages(messages)
+        else:
+            # group the messages into the nodes read by VectorMemory.get, a user message with its replies, and insert
+            # them by the public index API, which embeds the batch in one call
+            node = self._batch_node
+            nodes = []
+            for message in messages:
+                if node is None or not vector_memory.batch_by_user_message or message.role in (
+                    MessageRole.USER,
+                    MessageRole.SYSTEM,
+                ):
+                    node = _batch_node()
+                sub_dict = _message_dict(message)
+                content = sub_dict["content"] or ""
+                node.text = f"{node.text} {content}" if node.text else content
+                node.metadata["sub_dicts"].append(sub_dict)
+                node.embedding = None  # embedded again with the replies
+                if not nodes or nodes[-1] is not node:
+                    nodes.append(node)
+            # the node of the last user message is already in the store, it's replaced by the one with the replies
+            if self._batch_node is not None and self._batch_node.text and nodes[0] is self._batch_node:
+                vector_memory.vector_index.delete_nodes([nodes[0].id_])
+            self._batch_node = node
+            vector_memory.vector_index.insert_nodes([node for node in nodes if node.text])
+        batch_ms = (time.perf_counter() - started) * 1000
+        self._retrievals.clear()
+        with self._lock:
+            self._generation += 1
+            self._stats["batches"] += 1
+            self._stats["messages"] += len(messages)
+            self._stats["total_batch_ms"] += batch_ms
+            self._stats["max_batch_ms"] = max(self._stats["max_batch_ms"], batch_ms)
+
     def _target_vector_message(
         self, message: ChatCompletionMessageParam | ChatCompletionMessage
     ) -> bool:
@@ -105,3 +254,70 @@ class ChatVectorMemory(ChatMemory):
             return True
 
         return False
+
+
+# the node of a user message and its replies, and the dict of a message in its metadata, as VectorMemory.get reads them
+def _batch_node() -> TextNode:
+    return TextNode(
+        id_=str(uuid.uuid4()),
+        text="",
+        metadata={"sub_dicts": []},
+        excluded_embed_metadata_keys=["sub_dicts"],
+        excluded_llm_metadata_keys=["sub_dicts"],
+    )
+
+
+def _message_dict(message: ChatMessage) -> Dict[str, Any]:
+    message_dict = message.model_dump()
+    message_dict["additional_kwargs"] = _stringify(message_dict["additional_kwargs"])
+    message_dict["content"] = message.content
+    return message_dict
+
+
+def _stringify(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_stringify(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _stringify(item) for key, item in value.items()}
+    return str(value)
+
+
+# CachedEmbedding serves a LlamaIndex embedding by an EmbeddingCache, so the messages and queries embedded again, e.g.
+# by each persistent add, cost a lookup instead of a forward pass of the model.
+class CachedEmbedding(BaseEmbedding):
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, cache: EmbeddingCache = None, **kwargs: Any):
+        """
+        Args:
+            embed_model (BaseEmbedding): The embedding served on the cache misses, e.g. a HuggingFaceEmbedding.
+            cache (EmbeddingCache): The cache, in memory by the model name of the embed_model by default.
+        """
+        super().__init__(
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            **kwargs,
+        )
+        self._embed_model = embed_model
+        self._cache = cache if cache is not None else EmbeddingCache(embed_model.model_name)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._cache.embed(texts, self._embed_model.get_text_embedding_batch)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._cache.embed(
+            [query],
+            lambda queries: [self._embed_model.get_query_embedding(query) for query in queries],
+            kind="query",
+        )[0]
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return self._get_query_embedding(query)
@@ -0,0 +1,213 @@
+import json
+import os
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+VECTORS_FILE = "vectors.npy"
+LIVE_FILE = "live.npy"
+PAYLOADS_FILE = "payloads.jsonl"
+QUANTIZE_SCALE = 127  # the int8 value of a unit component
+MIN_CAPACITY = 16
+
+
+class NumpyVectorIndex:
+    """
+    A cosine index of the embeddings in one contiguous matrix, for the few thousand memories of an agent. The vectors
+    are normalized on add, optionally quantized to int8, and searched by a single matrix product with argpartition
+    for the top k. With a path the matrix is a memory-mapped .npy file, so opening the index maps the file instead of
+    loading it, and the payloads are appended to a jsonl file next to it. The matrix doubles its capacity when full,
+    the deletes only mark the rows dead, and the dead rows are compacted away once they're as many as the live ones.
+
+    Example:
+        index = NumpyVectorIndex(dim=384, path="./cache/chef-memory")
+        ids = index.add(vectors, [{"role": "user", "content": "Bob likes burgers."}])
+        for id, score, payload in index.search(query_vector, k=3):
+            ...
+    """
+
+    def __init__(self, dim: int, path: str = None, quantize: bool = False, capacity: int = 1024):
+        """
+        Args:
+            dim (int): The dimension of the embeddings.
+            path (str): The directory of the index files, None to keep the index in memory.
+            quantize (bool): Keep the vectors as int8, a quarter of the float32 size, for a slightly coarser score.
+            capacity (int): The rows allocated at first.
+        """
+        self.dim = dim
+        self.path = path
+        self._dtype = np.int8 if quantize else np.float32
+        self._payloads: List[Dict[str, Any]] = []  # by the row, each with its stable id
+        self._rows: Dict[int, int] = {}  # the row of each live id
+        self._next_id = 0
+        if path is not None and os.path.exists(os.path.join(path, VECTORS_FILE)):
+            self._open()
+        else:
+            if path is not None:
+                os.makedirs(path, exist_ok=True)
+            self._vectors = self._allocate(VECTORS_FILE, (capacity, dim), self._dtype)
+            self._live = self._allocate(LIVE_FILE, (capacity,), np.bool_)
+            self._live[:] = False
+        self._payload_file = (
+            open(os.path.join(path, PAYLOADS_FILE), "a", encoding="utf-8") if path is not None else None
+        )
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def count(self) -> int:
+        """The rows in use, the dead ones included."""
+        return len(self._payloads)
+
+    def add(self, vectors: Sequence[Sequence[float]], payloads: Sequence[Dict[str, Any]]) -> List[int]:
+        """Add the vectors with their payloads, and return their ids."""
+        vectors = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        if len(vectors) != len(payloads):
+            raise ValueError(f"{len(vectors)} vectors were given for {len(payloads)} payloads")
+        start, end = self.count, self.count + len(vectors)
+        if end > len(self._vectors):
+            self._grow(end)
+        if self._dtype == np.int8:
+            vectors = np.round(vectors * QUANTIZE_SCALE)
+        self._vectors[start:end] = vectors
+        self._live[start:end] = True
+
+        ids = []
+        for row, payload in enumerate(payloads, start):
+            record = {**payload, "id": self._next_id}
+            self._next_id += 1
+            self._payloads.append(record)
+            self._rows[record["id"]] = row
+            ids.append(record["id"])
+            if self._payload_file is not None:
+                # written after the vector, the rows without a payload line are dropped on open
+                self._payload_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.flush()
+        return ids
+
+    def search(self, vector: Sequence[float], k: int = 3) -> List[Tuple[int, float, Dict[str, Any]]]:
+        """The ids, cosine scores and payloads of the k nearest live vectors, the nearest first."""
+        count = self.count
+        if count == 0 or k <= 0:
+            return []
+        query = self._normalize(np.asarray(vector, dtype=np.float32).reshape(1, self.dim))[0]
+        scores = self._vectors[:count] @ query
+        if self._dtype == np.int8:
+            scores = scores / QUANTIZE_SCALE
+        scores = np.where(self._live[:count], scores, -np.inf)
+        if k < count:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(count)
+        top = top[np.argsort(-scores[top])]
+        return [
+            (self._payloads[row]["id"], float(scores[row]), self._payloads[row])
+            for row in top
+            if scores[row] != -np.inf
+        ]
+
+    def delete(self, ids: Sequence[int]):
+        """Mark the vectors dead, they're compacted away once they're as many as the live ones."""
+        for id in ids:
+            row = self._rows.pop(id, None)
+            if row is not None:
+                self._live[row] = False
+        if self.count - len(self) > len(self):
+            self.compact()
+        else:
+            self.flush()
+
+    def compact(self):
+        """Rewrite the index with the live vectors only, the ids are kept."""
+        rows = [row for row in range(self.count) if self._live[row]]
+        capacity = max(len(rows) * 2, MIN_CAPACITY)
+        vectors = self._allocate(VECTORS_FILE, (capacity, self.dim), self._dtype, temporary=True)
+        live = self._allocate(LIVE_FILE, (capacity,), np.bool_, temporary=True)
+        vectors[: len(rows)] = self._vectors[rows]
+        live[:] = False
+        live[: len(rows)] = True
+        self._payloads = [self._payloads[row] for row in rows]
+        self._rows = {payload["id"]: row for row, payload in enumerate(self._payloads)}
+        self._replace(vectors, live)
+        if self._payload_file is not None:
+            self._payload_file.close()
+            payloads_path = os.path.join(self.path, PAYLOADS_FILE)
+            with open(payloads_path + ".tmp", "w", encoding="utf-8") as f:
+                for payload in self._payloads:
+                    f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+            os.replace(payloads_path + ".tmp", payloads_path)
+            self._payload_file = open(payloads_path, "a", encoding="utf-8")
+
+    def clear(self):
+        for id in list(self._rows):
+            self._live[self._rows.pop(id)] = False
+        self.compact()
+
+    def flush(self):
+        if self.path is None:
+            return
+        self._vectors.flush()
+        self._live.flush()
+        if self._payload_file is not None:
+            self._payload_file.flush()
+
+    def close(self):
+        self.flush()
+        if self._payload_file is not None:
+            self._payload_file.close()
+            self._payload_file = None
+
+    def _open(self):
+        self._vectors = np.load(os.path.join(self.path, VECTORS_FILE), mmap_mode="r+")
+        self._live = np.load(os.path.join(self.path, LIVE_FILE), mmap_mode="r+")
+        if self._vectors.shape[1] != self.dim:
+            raise ValueError(f"the index at {self.path} has the dimension {self._vectors.shape[1]}, not {self.dim}")
+        self._dtype = self._vectors.dtype.type
+        payloads_path = os.path.join(self.path, PAYLOADS_FILE)
+        valid_bytes = 0
+        with open(payloads_path, "rb") as f:
+            for line in f:
+                if len(self._payloads) == len(self._vectors) or not line.endswith(b"\n"):
+                    break  # a payload line cut by a crash
+                record = json.loads(line)
+                if self._live[len(self._payloads)]:
+                    self._rows[record["id"]] = len(self._payloads)
+                self._payloads.append(record)
+                self._next_id = max(self._next_id, record["id"] + 1)
+                valid_bytes += len(line)
+        if valid_bytes < os.path.getsize(payloads_path):
+            os.truncate(payloads_path, valid_bytes)
+        # the rows written without their payload are reused
+        self._live[len(self._payloads) :] = False
+
+    def _grow(self, needed: int):
+        capacity = len(self._vectors)
+        while capacity < needed:
+            capacity *= 2
+        vectors = self._allocate(VECTORS_FILE, (capacity, self.dim), self._dtype, temporary=True)
+        live = self._allocate(LIVE_FILE, (capacity,), np.bool_, temporary=True)
+        vectors[: self.count] = self._vectors[: self.count]
+        live[:] = False
+        live[: self.count] = self._live[: self.count]
+        self._replace(vectors, live)
+
+    def _allocate(self, name: str, shape: Tuple[int, ...], dtype, temporary: bool = False) -> np.ndarray:
+        if self.path is None:
+            return np.zeros(shape, dtype=dtype)
+        file = os.path.join(self.path, name + (".tmp" if temporary else ""))
+        return np.lib.format.open_memmap(file, mode="w+", dtype=dtype, shape=shape)
+
+    def _replace(self, vectors: np.ndarray, live: np.ndarray):
+        if self.path is not None:
+            vectors.flush()
+            live.flush()
+            for name in (VECTORS_FILE, LIVE_FILE):
+                path = os.path.join(self.path, name)
+                os.replace(path + ".tmp", path)
+        self._vectors, self._live = vectors, live
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
@@ -0,0 +1,50 @@
+import math
+import re
+from typing import Any
+
+from openai.types.chat import ChatCompletionMessageParam
+
+# letters, digit groups (the llama tokenizers split numbers into 1-3 digits) and single symbols
+TOKEN_PATTERN = re.compile(r"[^\W\d_]+|\d{1,3}|[^\w\s]|_")
+
+# the role and the separators added around each message by the chat template
+MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate the number of BPE tokens of the text without loading a tokenizer: a short word is one token and a
+    long word is split into pieces of about 5 characters, each digit group and symbol counts as one. It tends to
+    overestimate a little, which is the safe side for a context budget.
+    """
+    if not text:
+        return 0
+    count = 0
+    for piece in TOKEN_PATTERN.findall(text):
+        count += math.ceil(len(piece) / 5) if piece[0].isalpha() else 1
+    return count
+
+
+def message_tokens(message: ChatCompletionMessageParam) -> int:
+    """Approximate the tokens of a chat message, including its tool calls."""
+    count = MESSAGE_OVERHEAD + estimate_tokens(_text(message.get("content")))
+    for tool_call in message.get("tool_calls") or []:
+        function = _field(tool_call, "function")
+        count += estimate_tokens(_field(function, "name") or "")
+        count += estimate_tokens(_field(function, "arguments") or "")
+    return count
+
+
+def _text(content: Any) -> str:
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    # the content parts of a multi-modal message
+    return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+
+
+def _field(value: Any, name: str) -> Any:
+    if isinstance(value, dict):
+        return value.get(name)
+    return getattr(value, name, None)
@@ -0,0 +1,12 @@
+from .compactor import ObservationCompactor, CompactionReport
+from .blob_store import BlobStore
+from .kube import kube_minimizer, NOISE_PATHS
+from .templates import LogTemplateMiner, LogTemplate, log_templates
+from .steps import (
+    deduplicate_log,
+    fold_blank_lines,
+    fold_repeated_lines,
+    truncate_tokens,
+)
+
+__all__ = [name for name in globals() if not name.startswith("_")]
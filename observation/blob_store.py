@@ -0,0 +1,129 @@
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+HANDLE_LENGTH = 16  # the hex digits of the sha256 naming a blob
+READ_LENGTH = 4000
+MAX_MATCHES = 50
+MAX_OPEN_BLOBS = 16
+
+
+class BlobStore:
+    """
+    Keep the full tool outputs in local files named by the hash of their content, so the memory holds only a preview
+    and the handle, and the agent reads the rest on demand by the read_observation tool. The same output is stored
+    once, and the blobs are read through memory maps, so paging and searching a large output doesn't load it.
+
+    Example:
+        blobs = BlobStore()
+        agent = Agent(..., blob_store=blobs)  # the agent registers blobs.read_observation as a tool
+    """
+
+    def __init__(self, root: str = None):
+        """
+        Args:
+            root (str): The directory of the blobs, observation-blobs in the system temp directory by default.
+        """
+        self.root = root or os.path.join(tempfile.gettempdir(), "observation-blobs")
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._maps: "OrderedDict[str, mmap.mmap]" = OrderedDict()
+
+    def put(self, text: str) -> str:
+        """Store the text, and return its handle."""
+        data = text.encode()
+        handle = hashlib.sha256(data).hexdigest()[:HANDLE_LENGTH]
+        path = self._path(handle)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # written aside and renamed, so a concurrent reader never maps a partial blob
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return handle
+
+    def size(self, handle: str) -> int:
+        return os.path.getsize(self._path(handle))
+
+    def read_observation(self, handle: str, offset: int = 0, length: int = READ_LENGTH, grep: str = None) -> str:
+        """
+        Read the part of a large observation stored by its handle, or search it. Use it when an observation ends with a
+        read_observation handle, instead of running the command again.
+
+        Args:
+            handle (str): The handle of the observation.
+            offset (int): The byte offset to read from, or to search from when grep is given.
+            length (int): The bytes to read, up to 4000 is a good page.
+            grep (str): A regular expression, the matching lines are returned with their byte offsets instead.
+
+        Returns:
+            str: The text of the observation from the offset, or the matching lines.
+        """
+        offset = max(int(offset), 0)
+        # the map is used under the lock, so it isn't closed by the eviction meanwhile
+        with self._lock:
+            try:
+                blob = self._map(handle)
+            except (FileNotFoundError, ValueError):
+                return f"No observation is stored by the handle {handle}."
+            if blob is None:
+                return ""
+            if grep:
+                return self._grep(blob, grep, offset)
+            end = min(offset + max(int(length), 0), len(blob))
+            text = blob[offset:end].decode(errors="replace")
+            if end < len(blob):
+                text += f"\n[{len(blob) - end} more bytes, continue from offset {end}]"
+            return text
+
+    def close(self):
+        with self._lock:
+            for blob in self._maps.values():
+                blob.close()
+            self._maps.clear()
+
+    def _grep(self, blob: mmap.mmap, grep: str, offset: int) -> str:
+        try:
+            pattern = re.compile(grep.encode(), re.MULTILINE)
+        except re.error:
+            pattern = re.compile(re.escape(grep.encode()))
+        lines = []
+        position = offset
+        while len(lines) < MAX_MATCHES:
+            match = pattern.search(blob, position)
+            if match is None:
+                break
+            start = blob.rfind(b"\n", 0, match.start()) + 1
+            end = blob.find(b"\n", match.end())
+            end = len(blob) if end == -1 else end
+            lines.append(f"@{start}: {blob[start:end].decode(errors='replace')}")
+            position = end + 1
+        if not lines:
+            return f"No line matches {grep}."
+        if len(lines) == MAX_MATCHES:
+            lines.append(f"[more matches may follow, search again from offset {position}]")
+        return "\n".join(lines)
+
+    def _map(self, handle: str) -> mmap.mmap | None:
+        if not re.fullmatch(r"[0-9a-f]{2,}", handle):
+            raise ValueError(handle)
+        if handle in self._maps:
+            self._maps.move_to_end(handle)
+            return self._maps[handle]
+        with open(self._path(handle), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None  # an empty file can't be mapped
+            blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[handle] = blob
+        if len(self._maps) > MAX_OPEN_BLOBS:
+            _, evicted = self._maps.popitem(last=False)
+            evicted.close()
+        return blob
+
+    def _path(self, handle: str) -> str:
+        return os.path.join(self.root, handle[:2], handle[2:])
@@ -0,0 +1,129 @@
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from memory.token_counter import estimate_tokens
+from .blob_store import BlobStore
+from .kube import kube_minimizer
+from .templates import log_templates
+from .steps import (
+    deduplicate_log,
+    fold_blank_lines,
+    fold_repeated_lines,
+    truncate_tokens,
+)
+
+
+@dataclass
+class CompactionReport:
+    step: str
+    bytes_saved: int
+    tokens_saved: int
+
+
+class ObservationCompactor:
+    """
+    Compact the tool observation before it's saved into the memory, so every following turn sends fewer tokens. The
+    steps run in order and each one is a function from the text to the compacted text. By default, the repeated and
+    blank lines are folded, which loses nothing. With a blob_store keeping the full text, the default steps also
+    minimize the kubernetes objects, mine the long logs into templates and deduplicate the log lines regardless of
+    their timestamps, and max_tokens truncates the remaining text to the head and tail within it, so no rows are lost
+    for good.
+
+    Example:
+        compactor = ObservationCompactor(max_tokens=2000, blob_store=BlobStore())
+        content, reports = compactor.compact(observation)
+        print(compactor.stats)
+    """
+
+    def __init__(
+        self,
+        max_tokens: int | None = None,
+        steps: Iterable[Callable[[str], str]] = None,
+        blob_store: BlobStore | None = None,
+    ):
+        """
+        Args:
+            max_tokens (int): The estimated tokens an observation is truncated to, it needs the blob_store. None to
+                keep the whole length.
+            steps (Iterable[Callable[[str], str]]): The steps replacing the default ones, the truncation still runs last.
+            blob_store (BlobStore): Keep the full observation whenever the steps dropped any of its content, the
+                compacted text ends with its handle for the read_observation tool. The lossy default steps need it.
+        """
+        if max_tokens is not None and blob_store is None:
+            raise ValueError("the truncation to max_tokens needs a blob_store keeping the full observations")
+        self._steps: List[Callable[[str], str]] | None = list(steps) if steps is not None else None
+        # the default steps dropping content, run only while a blob store keeps the original
+        self._lossy_steps: List[Callable[[str], str]] = [
+            kube_minimizer(),
+            log_templates(),
+            deduplicate_log,
+        ]
+        self._truncate = truncate_tokens(max_tokens) if max_tokens is not None else None
+        self._blob_store = blob_store
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def compact(self, text: str) -> Tuple[str, List[CompactionReport]]:
+        """
+        Returns:
+            Tuple[str, List[CompactionReport]]: The compacted text, and the bytes and tokens saved by each step.
+        """
+        reports = []
+        original = text
+        tokens = estimate_tokens(text)
+        for step in self.steps:
+            compacted = step(text)
+            compacted_tokens = estimate_tokens(compacted)
+            report = CompactionReport(
+                step=step.__name__,
+                bytes_saved=len(text.encode()) - len(compacted.encode()),
+                tokens_saved=tokens - compacted_tokens,
+            )
+            reports.append(report)
+            self._record(report)
+            text, tokens = compacted, compacted_tokens
+
+        # the folded blank lines and trailing spaces alone don't need the full output
+        if self._blob_store is not None and text.split() != original.split():
+            handle = self._blob_store.put(original)
+            size = len(original.encode())
+            text += f'\n[the full output is {size} bytes, page or search it by read_observation(handle="{handle}")]'
+        return text, reports
+
+    @property
+    def steps(self) -> List[Callable[[str], str]]:
+        """The steps run by compact, in order."""
+        if self._steps is not None:
+            steps = list(self._steps)
+        elif self._blob_store is not None:
+            steps = [*self._lossy_steps, fold_repeated_lines, fold_blank_lines]
+        else:
+            steps = [fold_repeated_lines, fold_blank_lines]
+        if self._truncate is not None:
+            steps.append(self._truncate)
+        return steps
+
+    @property
+    def blob_store(self) -> BlobStore | None:
+        return self._blob_store
+
+    def attach(self, blob_store: BlobStore):
+        """Keep the full observations in the blob_store, e.g. the one whose read_observation tool the agent has."""
+        if self._blob_store is not None and self._blob_store is not blob_store:
+            raise ValueError("the compactor already keeps the observations in another blob store")
+        self._blob_store = blob_store
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """The total bytes and tokens saved by each step."""
+        with self._lock:
+            return {step: dict(saved) for step, saved in self._stats.items()}
+
+    def _record(self, report: CompactionReport):
+        with self._lock:
+            saved = self._stats.setdefault(
+                report.step, {"bytes_saved": 0, "tokens_saved": 0}
+            )
+            saved["bytes_saved"] += report.bytes_saved
+            saved["tokens_saved"] += report.tokens_saved
@@ -0,0 +1,155 @@
+import json
+import re
+from typing import Any, Callable, Iterable, List, Tuple
+
+# the fields of an object the model never needs, relative to each object of the output, e.g. the items of a list or
+# the manifests of a ManifestWork. "*" matches every key or item
+NOISE_PATHS: List[Tuple[str, ...]] = [
+    ("metadata", "managedFields"),
+    ("metadata", "annotations", "kubectl.kubernetes.io/last-applied-configuration"),
+    ("metadata", "resourceVersion"),
+    ("metadata", "uid"),
+    ("metadata", "generation"),
+    ("metadata", "selfLink"),
+    ("metadata", "ownerReferences", "*", "uid"),
+    ("status", "conditions", "*", "lastHeartbeatTime"),
+    ("status", "conditions", "*", "lastProbeTime"),
+    ("status", "conditions", "*", "observedGeneration"),
+]
+MAX_CONDITIONS = 5  # the latest conditions kept, by their lastTransitionTime
+
+# the start of a yaml or json object printed by kubectl, the lines before it are kept, e.g. the failed command
+DOCUMENT_START_PATTERN = re.compile(r"^(?:apiVersion:|kind:|\{)", re.MULTILINE)
+# the notes after the document, e.g. the freshness stamp of the watch cache
+TRAILING_NOTE_PATTERN = re.compile(r"(?:\n\[[^\n]*\])+\s*$")
+
+
+def kube_minimizer(
+    noise_paths: Iterable[Tuple[str, ...]] = None,
+    max_conditions: int = MAX_CONDITIONS,
+    max_items: int | None = None,
+) -> Callable[[str], str]:
+    """
+    Returns a step minimizing the yaml or json objects printed by kubectl: the noise paths are dropped, the status
+    conditions are cut to the latest ones, the runs of identical list items are collapsed, and the objects are
+    printed again as compact yaml. Any other text is returned as it is.
+
+    Args:
+        noise_paths (Iterable[Tuple[str, ...]]): The paths dropped from each object, NOISE_PATHS by default.
+        max_conditions (int): The latest status conditions kept.
+        max_items (int): The items kept of the lists but the items of a List, None to keep them all. The items cut
+            are lost unless the compactor keeps the full output in a blob store.
+    """
+    noise_paths = list(NOISE_PATHS if noise_paths is None else noise_paths)
+
+    def minimize(text: str) -> str:
+        match = DOCUMENT_START_PATTERN.search(text)
+        if match is None:
+            return text
+        prefix, document = text[: match.start()], text[match.start() :]
+        note = TRAILING_NOTE_PATTERN.search(document)
+        suffix = ""
+        if note is not None:
+            document, suffix = document[: note.start()], document[note.start() :]
+        content = _load(document)
+        if not isinstance(content, (dict, list)):
+            return text
+
+        content = _minimize(content, noise_paths, max_conditions, max_items)
+        minimized = _dump(content).rstrip("\n")
+        return f"{prefix}{minimized}{suffix}"
+
+    minimize.__name__ = "kube_minimizer"
+    return minimize
+
+
+def _load(document: str) -> Any:
+    import yaml
+
+    try:
+        if document.lstrip().startswith("{"):
+            return json.loads(document)
+        documents = [content for content in yaml.safe_load_all(document) if content is not None]
+    except (ValueError, yaml.YAMLError):
+        return None
+    return documents[0] if len(documents) == 1 else documents
+
+
+def _dump(content: Any) -> str:
+    import yaml
+
+    if isinstance(content, list) and all(isinstance(item, dict) and "kind" in item for item in content):
+        return yaml.safe_dump_all(content, default_flow_style=False, sort_keys=False, width=1000)
+    return yaml.safe_dump(content, default_flow_style=False, sort_keys=False, width=1000)
+
+
+def _minimize(node: Any, noise_paths, max_conditions: int, max_items: int, key: str = None) -> Any:
+    if isinstance(node, dict):
+        if isinstance(node.get("metadata"), dict):
+            # an object, e.g. the document, an item of a List or a manifest of a ManifestWork
+            for path in noise_paths:
+                _drop(node, path)
+            _cut_conditions(node, max_conditions)
+        return {
+            child_key: _minimize(child, noise_paths, max_conditions, max_items, child_key)
+            for child_key, child in node.items()
+        }
+    if isinstance(node, list):
+        items = [_minimize(item, noise_paths, max_conditions, max_items) for item in node]
+        items = _collapse_repeats(items)
+        if max_items is not None and key != "items" and len(items) > max_items:
+            items = items[:max_items] + [f"... [{len(items) - max_items} more items]"]
+        return items
+    return node
+
+
+def _drop(node: Any, path: Tuple[str, ...]):
+    if not path:
+        return
+    head, rest = path[0], path[1:]
+    if isinstance(node, list):
+        if head == "*" and rest:
+            for item in node:
+                _drop(item, rest)
+        return
+    if not isinstance(node, dict):
+        return
+    keys = list(node) if head == "*" else [head]
+    for key in keys:
+        if key not in node:
+            continue
+        if rest:
+            _drop(node[key], rest)
+        else:
+            del node[key]
+    # the parents left empty by the drop, e.g. the annotations holding only the last applied configuration
+    for key in keys:
+        if rest and node.get(key) in ({}, []):
+            del node[key]
+
+
+def _cut_conditions(node: dict, max_conditions: int):
+    conditions = (node.get("status") or {}).get("conditions")
+    if not isinstance(conditions, list) or len(conditions) <= max_conditions:
+        return
+    latest = sorted(
+        conditions,
+        key=lambda condition: f"{condition.get('lastTransitionTime', '')}" if isinstance(condition, dict) else "",
+    )[-max_conditions:]
+    node["status"]["conditions"] = [condition for condition in conditions if condition in latest]
+
+
+def _collapse_repeats(items: List[Any]) -> List[Any]:
+    collapsed: List[Any] = []
+    index = 0
+    while index < len(items):
+        end = index + 1
+        while end < len(items) and items[end] == items[index]:
+            end += 1
+        collapsed.append(items[index])
+        if end - index > 2:
+            collapsed.append(f"... [repeated {end - index - 1} more times]")
+        elif end - index == 2:
+            collapsed.append(items[index])
+        index = end
+    return collapsed
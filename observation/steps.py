@@ -0,0 +1,97 @@
+import re
+from typing import Callable, List
+
+from memory.token_counter import estimate_tokens
+
+# ISO 8601/RFC 3339, the klog header (I0102 15:04:05.000000) and the bare clock time
+TIMESTAMP_PATTERN = re.compile(
+    r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"
+    r"|\b[IWEF]\d{4} \d{2}:\d{2}:\d{2}(?:\.\d+)?"
+    r"|\b\d{2}:\d{2}:\d{2}(?:\.\d+)?\b"
+)
+BLANK_LINES_PATTERN = re.compile(r"\n(?:[ \t]*\n){2,}")
+TRAILING_SPACES_PATTERN = re.compile(r"[ \t]+$", re.MULTILINE)
+
+TRUNCATED_MARKER = "... [{} lines truncated] ..."
+
+
+def deduplicate_log(text: str) -> str:
+    """
+    Keep only the latest occurrence of each log line, comparing the lines without their timestamps. The lines without
+    a timestamp, like the rows of a table or a yaml document, are kept as they are.
+    """
+    lines = text.splitlines()
+    keys = [
+        TIMESTAMP_PATTERN.sub("", line).strip() if TIMESTAMP_PATTERN.search(line) else None
+        for line in lines
+    ]
+    latest = {key: index for index, key in enumerate(keys) if key is not None}
+    return "\n".join(
+        line
+        for index, (line, key) in enumerate(zip(lines, keys))
+        if key is None or latest[key] == index
+    )
+
+
+def fold_blank_lines(text: str) -> str:
+    """Strip the trailing spaces and fold the runs of blank lines into one."""
+    text = TRAILING_SPACES_PATTERN.sub("", text)
+    return BLANK_LINES_PATTERN.sub("\n\n", text).strip("\n")
+
+
+def fold_repeated_lines(text: str) -> str:
+    """Fold the consecutive identical lines into one line with the repeat count."""
+    folded: List[str] = []
+    previous, count = None, 0
+    for line in text.splitlines() + [None]:
+        if line == previous:
+            count += 1
+            continue
+        if previous is not None:
+            suffix = f" [repeated {count} times]"
+            # a short line repeated twice is cheaper than the suffix
+            if count > 1 and len(previous) * (count - 1) > len(suffix):
+                folded.append(previous + suffix)
+            else:
+                folded.extend([previous] * count)
+        previous, count = line, 1
+    return "\n".join(folded)
+
+
+def truncate_tokens(max_tokens: int) -> Callable[[str], str]:
+    """
+    Returns a step keeping the head and the tail lines of the text within max_tokens, the middle lines are replaced
+    by a marker. The tail gets the larger share, since the latest lines of a log tell the most.
+    """
+
+    def truncate(text: str) -> str:
+        if estimate_tokens(text) <= max_tokens:
+            return text
+        lines = text.splitlines()
+        if len(lines) == 1:
+            return _truncate_chars(text, max_tokens)
+        budget = max_tokens - estimate_tokens(TRUNCATED_MARKER)
+        head, head_tokens = _take_lines(lines, budget // 3)
+        tail, _ = _take_lines(reversed(lines[len(head) :]), budget - head_tokens)
+        truncated = len(lines) - len(head) - len(tail)
+        return "\n".join(head + [TRUNCATED_MARKER.format(truncated)] + tail[::-1])
+
+    truncate.__name__ = "truncate_tokens"
+    return truncate
+
+
+def _take_lines(lines, budget):
+    taken, tokens = [], 0
+    for line in lines:
+        line_tokens = estimate_tokens(line) + 1  # the newline
+        if tokens + line_tokens > budget:
+            break
+        taken.append(line)
+        tokens += line_tokens
+    return taken, tokens
+
+
+def _truncate_chars(text: str, max_tokens: int) -> str:
+    # a single long line, e.g. the minified json, is cut by the characters proportional to the tokens
+    chars = len(text) * max_tokens // max(estimate_tokens(text), 1)
+    return text[: chars // 3] + " ... " + text[len(text) - chars * 2 // 3 :]
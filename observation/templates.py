@@ -0,0 +1,211 @@
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from .steps import TIMESTAMP_PATTERN
+
+WILDCARD = "<*>"
+# the tokens that are variables on their own, e.g. counts, durations, hex ids, uuids and addresses
+VARIABLE_PATTERN = re.compile(
+    r"^(?:[-+]?\d+(?:\.\d+)?(?:[a-zA-Zµ%]{0,3})"
+    r"|0x[0-9a-fA-F]+"
+    r"|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+    r"|[0-9a-f]{12,}"
+    r"|\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?)[,;:)\]]?$"
+)
+DIGIT_PATTERN = re.compile(r"\d")
+
+
+@dataclass
+class LogTemplate:
+    tokens: List[str]
+    count: int = 0
+    first_index: int = 0  # the line of the first occurrence, the templates print in this order
+    first_seen: str = ""  # the timestamps of the first and the last occurrences, if the lines have any
+    last_seen: str = ""
+    line: str = ""  # the last line, printed as it is when the template matched a single line
+    samples: List[List[str]] = field(default_factory=list)  # the tokens of the first distinct lines
+
+    def parameters(self) -> List[str]:
+        """The parameters of the sample lines, the ones equal in all the samples are left out, e.g. a thread id."""
+        positions = [index for index, token in enumerate(self.tokens) if token == WILDCARD]
+        if len(self.samples) > 1:
+            positions = [
+                index for index in positions if len({sample[index] for sample in self.samples}) > 1
+            ]
+        return [", ".join(sample[index] for index in positions) for sample in self.samples if positions]
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+
+class LogTemplateMiner:
+    """
+    Cluster the log lines into templates in one pass, like Drain: the lines of a template have the same number of
+    tokens, share the first tokens, and most of their other tokens. The tokens differing between the lines become
+    the parameters (<*>) of the template. The timestamps are stripped before the clustering and kept as the first and
+    last occurrences of each template. The memory is bounded by max_templates, the least recently matched template is
+    evicted first.
+
+    Example:
+        miner = LogTemplateMiner()
+        for line in lines:
+            miner.add(line)
+        print(miner.render())
+    """
+
+    def __init__(
+        self,
+        similarity: float = 0.5,
+        depth: int = 2,
+        max_templates: int = 256,
+        max_children: int = 64,
+        max_samples: int = 3,
+    ):
+        """
+        Args:
+            similarity (float): The ratio of the equal tokens above which a line joins a template.
+            depth (int): The leading tokens the lines of a template share.
+            max_templates (int): The templates kept in the memory.
+            max_children (int): The distinct tokens at each level of the tree, the others share the <*> branch.
+            max_samples (int): The sample parameters kept of each template.
+        """
+        self._similarity = similarity
+        self._depth = depth
+        self._max_templates = max_templates
+        self._max_children = max_children
+        self._max_samples = max_samples
+        self._tree: Dict[int, dict] = {}
+        self._templates: "OrderedDict[int, LogTemplate]" = OrderedDict()  # by the id, the least recent first
+        self._leaf_of: Dict[int, List[int]] = {}  # the leaf holding the template id
+        self._next_id = 0
+        self.lines = 0
+        self.evicted = 0
+
+    def add(self, line: str) -> Optional[LogTemplate]:
+        """Add the log line to its template, None for a blank line."""
+        timestamp = TIMESTAMP_PATTERN.search(line)
+        message = TIMESTAMP_PATTERN.sub("", line, count=1) if timestamp else line
+        tokens = [WILDCARD if VARIABLE_PATTERN.match(token) else token for token in message.split()]
+        if not tokens:
+            return None
+        index, self.lines = self.lines, self.lines + 1
+
+        leaf = self._leaf(tokens)
+        template = self._match(leaf, tokens)
+        if template is None:
+            template = LogTemplate(tokens=tokens, first_index=index)
+            template_id = self._next_id
+            self._next_id += 1
+            self._templates[template_id] = template
+            leaf.append(template_id)
+            self._leaf_of[template_id] = leaf
+            if timestamp:
+                template.first_seen = timestamp.group()
+            self._evict()
+        else:
+            template.tokens = [
+                token if token == other else WILDCARD for token, other in zip(template.tokens, tokens)
+            ]
+
+        template.count += 1
+        template.line = line
+        if timestamp:
+            template.last_seen = timestamp.group()
+        self._sample(template, message.split())
+        return template
+
+    def templates(self) -> List[LogTemplate]:
+        """The templates in the order of their first lines."""
+        return sorted(self._templates.values(), key=lambda template: template.first_index)
+
+    def render(self) -> str:
+        """
+        The templates as text, each line is the count, the first and last timestamps and the template, followed by
+        its sample parameters. A template matching a single line prints the line.
+        """
+        rendered = [f"[{self.lines} lines, {len(self._templates)} templates]"]
+        for template in self.templates():
+            if template.count == 1:
+                rendered.append(template.line)
+                continue
+            seen = f" {template.first_seen} .. {template.last_seen}" if template.first_seen else ""
+            rendered.append(f"[{template.count}x{seen}] {template.template}")
+            parameters = template.parameters()
+            if parameters:
+                rendered.append(f"    e.g. {' ; '.join(parameters)}")
+        if self.evicted:
+            rendered.append(f"[{self.evicted} rare templates evicted]")
+        return "\n".join(rendered)
+
+    def _leaf(self, tokens: List[str]) -> list:
+        # the tree is keyed by the token count, then by the first tokens, the tokens with digits share the <*> branch
+        node = self._tree.setdefault(len(tokens), {})
+        for token in tokens[: self._depth]:
+            key = WILDCARD if DIGIT_PATTERN.search(token) else token
+            if key not in node and len(node) >= self._max_children:
+                key = WILDCARD
+            node = node.setdefault(key, {})
+        return node.setdefault(None, [])
+
+    def _match(self, leaf: List[int], tokens: List[str]) -> Optional[LogTemplate]:
+        best, best_similarity = None, -1.0
+        for template_id in leaf:
+            template = self._templates[template_id]
+            equal = sum(token == other for token, other in zip(template.tokens, tokens) if token != WILDCARD)
+            similarity = equal / len(tokens)
+            if similarity > best_similarity:
+                best, best_similarity = template_id, similarity
+        if best is None or best_similarity < self._similarity:
+            return None
+        self._templates.move_to_end(best)
+        return self._templates[best]
+
+    def _sample(self, template: LogTemplate, raw_tokens: List[str]):
+        if len(template.samples) >= self._max_samples or len(raw_tokens) != len(template.tokens):
+            return
+        if raw_tokens not in template.samples:
+            template.samples.append(raw_tokens)
+
+    def _evict(self):
+        while len(self._templates) > self._max_templates:
+            template_id, _ = self._templates.popitem(last=False)
+            self._leaf_of.pop(template_id).remove(template_id)
+            self.evicted += 1
+
+
+def log_templates(
+    min_lines: int = 20,
+    require_timestamps: bool = True,
+    **miner_args,
+) -> Callable[[str], str]:
+    """
+    Returns a step replacing a log with its templates, see LogTemplateMiner. The text is kept when it has fewer than
+    min_lines, when the templates aren't shorter, or, with require_timestamps, when less than half of its lines have
+    a timestamp, since the rows of a table or a yaml document would lose their names. The mined lines are lost unless
+    the raw log is kept elsewhere, so the ObservationCompactor runs it by default only with a blob store.
+
+    Args:
+        min_lines (int): The lines below which the text is kept.
+        require_timestamps (bool): Only the logs are mined, False for any output, e.g. of the code_executor.
+        miner_args: The arguments of the LogTemplateMiner.
+    """
+
+    def mine(text: str) -> str:
+        lines = text.splitlines()
+        if len(lines) < min_lines:
+            return text
+        if require_timestamps:
+            stamped = sum(1 for line in lines if TIMESTAMP_PATTERN.search(line))
+            if stamped * 2 < len(lines):
+                return text
+        miner = LogTemplateMiner(**miner_args)
+        for line in lines:
+            miner.add(line)
+        rendered = miner.render()
+        return rendered if len(rendered) < len(text) else text
+
+    mine.__name__ = "log_templates"
+    return mine
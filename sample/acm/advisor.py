@@ -19,10 +19,12 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".
 
 from agent import IAgent
 from agent.chat import ChatConsole
+from cache import EmbeddingCache
 
 warnings.filterwarnings("ignore")
 
 current_dir = os.path.dirname(os.path.realpath(__file__))
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
 
 # customize an agent can search material from the documents
@@ -35,8 +37,12 @@ class RetrieveAgent(IAgent):
     ):
         self._name = name
         self._console = ChatConsole(name=name)
+        # the runbooks indexed again on each start are embedded once, then read from the cache
+        self._model = None
+        cache = EmbeddingCache(EMBEDDING_MODEL, path="./cache/embeddings.db")
         self.embeddings = Embeddings(
-            path="sentence-transformers/all-MiniLM-L6-v2",
+            method="external",
+            transform=cache.wrap(self._encode),
         )
         self.documents = self._get_documents(index_dir)
 
@@ -47,6 +53,14 @@ class RetrieveAgent(IAgent):
     def name(self):
         return self._name
 
+    # load the model on the first missed text, a start served by the cache never loads it
+    def _encode(self, texts):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
+            self._model = SentenceTransformer(EMBEDDING_MODEL)
+        return self._model.encode(texts)
+
     async def run(
         self, message: Union[ChatCompletionMessageParam, str]
     ) -> ChatCompletionAssistantMessageParam | None:
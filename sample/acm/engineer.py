@@ -88,4 +88,4 @@ Please add '{FINAL_ANSWER}' in the final answer, once the task is complete or no
 
 if __name__ == "__main__":
     prompt = sys.argv[1]
-    asyncio.run(engineer.run(prompt))
+    asyncio.run(engineer.arun(prompt))
@@ -220,4 +220,4 @@ Note: This section helps you understand the background when drafting the plan.
 
 """,
     )
-    asyncio.run(planner.run(task))
+    asyncio.run(planner.arun(task))
@@ -52,4 +52,4 @@ if __name__ == "__main__":
             component_name=component_name,
         ),
     )
-    asyncio.run(global_hub_agent.run(prompt))
+    asyncio.run(global_hub_agent.arun(prompt))
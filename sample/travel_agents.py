@@ -74,4 +74,4 @@ traveller = Agent(
 )
 
 if __name__ == "__main__":
-    asyncio.run(traveller.run("I want to go Xi 'an tomorrow. What should I wear?"))
+    asyncio.run(traveller.arun("I want to go Xi 'an tomorrow. What should I wear?"))
@@ -14,7 +14,8 @@ from llama_index.vector_stores.qdrant import QdrantVectorStore
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from client import BedRockClient, GroqClient
 from agent import Agent, FINAL_ANSWER
-from memory import ChatBufferMemory, ChatVectorMemory
+from memory import ChatBufferMemory, ChatVectorMemory, CachedEmbedding
+from cache import EmbeddingCache
 
 client = qdrant_client.QdrantClient(path="./cache/qdrant_data")
 client.create_collection(
@@ -27,7 +28,11 @@ vector_memory = VectorMemory.from_defaults(
     vector_store=QdrantVectorStore(
         client=client, collection_name="chef", max_retries=3
     ),
-    embed_model=HuggingFaceEmbedding(model_name="BAAI/bge-small-en"),
+    # the repeated messages and queries are embedded once, then read from the cache
+    embed_model=CachedEmbedding(
+        HuggingFaceEmbedding(model_name="BAAI/bge-small-en"),
+        EmbeddingCache("BAAI/bge-small-en", path="./cache/embeddings.db"),
+    ),
     retriever_kwargs={"similarity_top_k": 3},
 )
 
@@ -54,4 +59,4 @@ chef = Agent(
     ),
 )
 
-msg = asyncio.run(chef.run("Which is bob's favorite?"))
+msg = asyncio.run(chef.arun("Which is bob's favorite?"))
@@ -0,0 +1,224 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+POD_RESOURCE = {"name": "pods", "singularName": "pod", "namespaced": True, "kind": "Pod", "shortNames": ["po"]}
+COLUMNS = [
+    {"name": "Name", "type": "string", "format": "name", "priority": 0},
+    {"name": "Status", "type": "string", "format": "", "priority": 0},
+    {"name": "Node", "type": "string", "format": "", "priority": 1},
+]
+
+
+def pod(name, namespace="default", labels=None, status="Running"):
+    return {
+        "metadata": {"name": name, "namespace": namespace, "labels": labels or {}},
+        "status": {"phase": status},
+    }
+
+
+def pod_row(obj):
+    return {"cells": [obj["metadata"]["name"], obj["status"]["phase"], "node-1"], "object": obj}
+
+
+class FakeKubeApi(ThreadingHTTPServer):
+    """
+    A local kube-apiserver serving the pods of one cluster: the discovery, the list and get as a table or json, the
+    logs, the patches and the watch, whose events are pushed by the test. The requests are recorded.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.pods = {}
+        self.resource_version = 1
+        self.requests = []
+        self.log = "line 1\nline 2\n"
+        self.list_status = 200
+        self.watch_status = 200
+        self._watch_events = []
+        self._watch_changed = threading.Condition()
+        self._closed = False
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def add(self, obj):
+        self.pods[(obj["metadata"]["namespace"], obj["metadata"]["name"])] = obj
+
+    def push(self, event_type, obj=None, code=None):
+        """Send a watch event of the pod, or an ERROR event of the status code, to the open watches."""
+        self.resource_version += 1
+        if event_type == "ERROR":
+            event = {"type": "ERROR", "object": {"kind": "Status", "code": code, "message": f"code {code}"}}
+        else:
+            obj["metadata"]["resourceVersion"] = str(self.resource_version)
+            event = {"type": event_type, "object": self._table([obj])}
+        with self._watch_changed:
+            self._watch_events.append(event)
+            self._watch_changed.notify_all()
+
+    def end_watches(self):
+        with self._watch_changed:
+            self._watch_events.append(None)
+            self._watch_changed.notify_all()
+
+    def requested(self, method="GET", path=None, watch=None):
+        return [
+            request
+            for request in self.requests
+            if request["method"] == method
+            and (path is None or request["path"] == path)
+            and (watch is None or (request["query"].get("watch") == ["true"]) == watch)
+        ]
+
+    def shutdown(self):
+        self._closed = True
+        self.end_watches()
+        super().shutdown()
+        self.server_close()
+
+    def _table(self, pods):
+        return {
+            "kind": "Table",
+            "apiVersion": "meta.k8s.io/v1",
+            "metadata": {"resourceVersion": str(self.resource_version)},
+            "columnDefinitions": COLUMNS,
+            "rows": [pod_row(obj) for obj in pods],
+        }
+
+    def _events(self, start):
+        index = start
+        while not self._closed:
+            with self._watch_changed:
+                while index >= len(self._watch_events) and not self._closed:
+                    self._watch_changed.wait(0.1)
+                if index >= len(self._watch_events):
+                    return
+                event = self._watch_events[index]
+            index += 1
+            if event is None:
+                return
+            yield event
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.server.requests.append({"method": "GET", "path": url.path, "query": query, "headers": dict(self.headers)})
+        parts = url.path.strip("/").split("/")
+        if url.path == "/apis":
+            return self._json(200, {"kind": "APIGroupList", "groups": []})
+        if url.path == "/api/v1":
+            log_resource = {**POD_RESOURCE, "name": "pods/log"}
+            return self._json(200, {"kind": "APIResourceList", "resources": [POD_RESOURCE, log_resource]})
+        if parts[-1] == "log":
+            self._send(200, self.server.log.encode(), "text/plain")
+            return
+        namespace = parts[3] if len(parts) > 3 and parts[2] == "namespaces" else None
+        name = parts[5] if namespace and len(parts) > 5 else None
+        if query.get("watch") == ["true"]:
+            return self._watch()
+        if self.server.list_status != 200:
+            return self._status(self.server.list_status, "Forbidden", "pods is forbidden")
+
+        pods = [
+            obj
+            for (pod_namespace, pod_name), obj in sorted(self.server.pods.items())
+            if (namespace is None or pod_namespace == namespace) and (name is None or pod_name == name)
+        ]
+        if name is not None and not pods:
+            return self._status(404, "NotFound", f'pods "{name}" not found')
+        if "as=Table" in self.headers.get("Accept", ""):
+            return self._json(200, self.server._table(pods))
+        if name is not None:
+            return self._json(200, pods[0])
+        return self._json(200, {"kind": "PodList", "metadata": {"resourceVersion": str(self.server.resource_version)}, "items": pods})
+
+    def do_PATCH(self):
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests.append(
+            {
+                "method": "PATCH",
+                "path": url.path,
+                "query": parse_qs(url.query),
+                "headers": dict(self.headers),
+                "body": json.loads(body or b"null"),
+            }
+        )
+        self._json(200, {})
+
+    def _watch(self):
+        if self.server.watch_status != 200:
+            return self._status(self.server.watch_status, "Expired", "too old resource version")
+        start = len(self.server._watch_events)
+        # chunked like the watch of the kube-apiserver, each event in its chunk
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for event in self.server._events(start):
+                data = json.dumps(event).encode() + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _status(self, code, reason, message):
+        self._json(code, {"kind": "Status", "status": "Failure", "reason": reason, "message": message, "code": code})
+
+    def _json(self, code, content):
+        self._send(code, json.dumps(content).encode(), "application/json")
+
+    def _send(self, code, data, content_type):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def kube_api(tmp_path):
+    server = FakeKubeApi()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    kubeconfig = tmp_path / "kubeconfig"
+    kubeconfig.write_text(
+        f"""
+apiVersion: v1
+kind: Config
+clusters:
+- name: fake
+  cluster:
+    server: {server.url}
+users:
+- name: fake
+  user:
+    token: fake-token
+contexts:
+- name: fake
+  context:
+    cluster: fake
+    user: fake
+    namespace: default
+current-context: fake
+"""
+    )
+    server.kubeconfig = str(kubeconfig)
+    yield server
+    server.shutdown()
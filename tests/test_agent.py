@@ -0,0 +1,151 @@
+import asyncio
+import json
+
+import pytest
+from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_tool_call import Function
+
+from agent import Agent
+from bench.quiet_chat import QuietChat
+from bench.scripted_client import ScriptedClient
+from type import ActionPermission
+
+
+def get_pods(namespace: str) -> str:
+    """Get the pods of the namespace."""
+    return f"nginx Running in {namespace}"
+
+
+def get_nodes() -> str:
+    """Get the nodes."""
+    raise RuntimeError("the cluster is unreachable")
+
+
+def tool_calls_message(*calls):
+    return ChatCompletionMessage(
+        role="assistant",
+        content=None,
+        tool_calls=[
+            ChatCompletionMessageToolCall(
+                id=f"call_{index}",
+                type="function",
+                function=Function(name=func_name, arguments=json.dumps(func_args)),
+            )
+            for index, (func_name, func_args) in enumerate(calls)
+        ],
+    )
+
+
+class DenyingChat(QuietChat):
+    """Forbid the actions of the named tool."""
+
+    def __init__(self, denied):
+        self._denied = denied
+
+    def before_action(self, permission, func_name, func_args, func_edit=0, functions={}) -> bool:
+        return func_name != self._denied
+
+
+def agent(script, chat_console=None, max_tool_workers=4):
+    agent = Agent(
+        "test",
+        "You are a kubernetes engineer.",
+        ScriptedClient(script),
+        tools=[get_pods, get_nodes],
+        action_permission=ActionPermission.NONE,
+        chat_console=chat_console or QuietChat(),
+        max_tool_workers=max_tool_workers,
+    )
+    return agent
+
+
+def tool_messages(agent):
+    return {message["tool_call_id"]: message["content"] for message in agent.messages() if message["role"] == "tool"}
+
+
+@pytest.mark.parametrize("max_tool_workers", [1, 4])
+@pytest.mark.parametrize("run_async", [False, True])
+def test_a_failed_tool_is_observed(max_tool_workers, run_async):
+    calls = tool_calls_message(("get_pods", {"namespace": "default"}), ("get_nodes", {}))
+    test_agent = agent([calls, "ANSWER: the nodes are unreachable"], max_tool_workers=max_tool_workers)
+
+    if run_async:
+        answer = asyncio.run(test_agent.arun("check the cluster"))
+    else:
+        answer = test_agent.run("check the cluster")
+
+    assert answer == "the nodes are unreachable"
+    assert tool_messages(test_agent) == {
+        "call_0": "nginx Running in default",
+        "call_1": "The 'get_nodes' failed with RuntimeError: the cluster is unreachable",
+    }
+
+
+@pytest.mark.parametrize("max_tool_workers", [1, 4])
+@pytest.mark.parametrize("run_async", [False, True])
+def test_every_tool_call_gets_its_message_after_a_forbidden_one(max_tool_workers, run_async):
+    calls = tool_calls_message(
+        ("get_pods", {"namespace": "default"}), ("get_nodes", {}), ("get_pods", {"namespace": "kube-system"})
+    )
+    test_agent = agent([calls], chat_console=DenyingChat("get_nodes"), max_tool_workers=max_tool_workers)
+
+    if run_async:
+        asyncio.run(test_agent.arun("check the cluster"))
+    else:
+        test_agent.run("check the cluster")
+
+    assert tool_messages(test_agent) == {
+        "call_0": "nginx Running in default",
+        "call_1": "Action(get_nodes: call_1) are not allowed by the user.",
+        "call_2": "The 'get_pods' was skipped: the action get_nodes was not allowed by the user",
+    }
+
+
+@pytest.mark.parametrize("max_tool_workers", [1, 4])
+def test_every_tool_call_gets_its_message_after_an_unregistered_one(max_tool_workers):
+    calls = tool_calls_message(("get_pods", {"namespace": "default"}), ("get_services", {}))
+    test_agent = agent([calls], max_tool_workers=max_tool_workers)
+
+    test_agent.run("check the cluster")
+
+    messages = tool_messages(test_agent)
+    assert set(messages) == {"call_0", "call_1"}
+    assert messages["call_1"] == "The 'get_services' was skipped: The 'get_services' isn't registered!"
+
+
+class AsyncScriptedClient(ScriptedClient):
+    """Await the scripted messages, and record the close of the connection pool."""
+
+    def __init__(self, script, error=None):
+        super().__init__(script)
+        self._error = error
+        self.closed = 0
+
+    async def __call__(self, messages, tools, response_model=None):
+        if self._error is not None:
+            raise self._error
+        return ScriptedClient.__call__(self, messages, tools, response_model)
+
+    async def close(self):
+        self.closed += 1
+
+    stream = None  # the responses are awaited whole
+
+
+def test_stream_is_rejected_for_a_client_without_stream():
+    with pytest.raises(ValueError):
+        Agent("test", "You are a kubernetes engineer.", AsyncScriptedClient([]), stream=True)
+
+
+@pytest.mark.parametrize("error", [None, ConnectionError("the endpoint is unreachable")])
+def test_arun_closes_the_async_client(error):
+    client = AsyncScriptedClient(["ANSWER: the pods are running"], error)
+    test_agent = Agent("test", "You are a kubernetes engineer.", client, chat_console=QuietChat())
+
+    if error is None:
+        assert asyncio.run(test_agent.arun("check the pods")) == "the pods are running"
+    else:
+        with pytest.raises(ConnectionError):
+            asyncio.run(test_agent.arun("check the pods"))
+
+    assert client.closed == 1
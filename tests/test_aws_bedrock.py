@@ -0,0 +1,97 @@
+import asyncio
+import contextlib
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("boto3")
+
+from client.aws_bedrock import AsyncBedRockClient
+from client.config import ClientConfig
+
+
+class FakeBedrock:
+    """The bedrock-runtime client, each converse waits for the gate."""
+
+    def __init__(self, gate):
+        self._gate = gate
+        self.closed = False
+
+    async def converse(self, **kwargs):
+        await self._gate.wait()
+        return {
+            "output": {"message": {"role": "assistant", "content": [{"text": "the pods are running"}]}},
+            "usage": {"inputTokens": 10, "outputTokens": 5, "totalTokens": 15},
+        }
+
+
+class FakeSession:
+    """The aiobotocore session, record the bedrock-runtime clients it creates."""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.clients = []
+
+    @contextlib.asynccontextmanager
+    async def create_client(self, service_name, **kwargs):
+        client = FakeBedrock(self.gate)
+        self.clients.append(client)
+        try:
+            yield client
+        finally:
+            client.closed = True
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = FakeSession()
+    module = types.ModuleType("aiobotocore.session")
+    module.get_session = lambda: session
+    monkeypatch.setitem(sys.modules, "aiobotocore", types.ModuleType("aiobotocore"))
+    monkeypatch.setitem(sys.modules, "aiobotocore.session", module)
+    return session
+
+
+MESSAGES = [
+    {"role": "system", "content": "You are a kubernetes engineer."},
+    {"role": "user", "content": "check the pods"},
+]
+
+
+def bedrock_client():
+    return AsyncBedRockClient(
+        ClientConfig(model="anthropic.claude-3", ext={"inference_config": {"maxTokens": 100}})
+    )
+
+
+def test_the_pool_is_reused_and_closed(session):
+    async def run():
+        session.gate.set()
+        client = bedrock_client()
+        message, _ = await client(MESSAGES, [])
+        await client(MESSAGES, [])
+        assert message.content == "the pods are running"
+        assert len(session.clients) == 1
+        await client.close()
+        assert session.clients[0].closed
+        await client(MESSAGES, [])  # a new pool after the close
+        assert len(session.clients) == 2
+        await client.close()
+
+    asyncio.run(run())
+
+
+def test_the_close_waits_for_the_requests_in_flight(session):
+    async def run():
+        client = bedrock_client()
+        request = asyncio.create_task(client(MESSAGES, []))
+        await asyncio.sleep(0)
+        await client.close()  # e.g. another session sharing the client is done
+        assert not session.clients[0].closed
+        session.gate.set()
+        message, _ = await request
+        assert message.content == "the pods are running"
+        assert session.clients[0].closed
+
+    asyncio.run(run())
@@ -0,0 +1,80 @@
+import pytest
+
+from bench.scripted_client import ScriptedClient, tool_call_message
+from client.cached_client import CachedClient
+
+SYSTEM = {"role": "system", "content": "You are a kubernetes engineer."}
+
+
+def request(content):
+    return [SYSTEM, {"role": "user", "content": content}]
+
+
+def test_a_repeated_request_is_served_by_the_cache():
+    scripted = ScriptedClient(["the pods are running", "the nodes are ready"])
+    client = CachedClient(scripted)
+
+    first, _ = client(request("check the pods"), [])
+    second, _ = client(request("  check the pods "), [])
+
+    assert first.content == second.content == "the pods are running"
+    assert scripted.calls == 1
+    assert client.stats == {"hits": 1, "misses": 1, "bypasses": 0}
+
+
+def test_the_request_is_matched_exactly():
+    scripted = ScriptedClient(["the pods are running", "the nodes are ready"])
+    client = CachedClient(scripted)
+
+    client(request("check the pods"), [])
+    message, _ = client(request("check the pods") + [{"role": "user", "content": "and the nodes"}], [])
+
+    assert message.content == "the nodes are ready"
+    assert scripted.calls == 2
+
+
+def test_a_streamed_response_is_replayed():
+    tool_call = tool_call_message("get_pods", {"namespace": "default"})
+    scripted = ScriptedClient([tool_call])
+    client = CachedClient(scripted)
+
+    client.stream(request("check the pods"), []).complete()
+    stream = client.stream(request("check the pods"), [])
+    message, _ = stream.complete()
+
+    assert scripted.calls == 1
+    assert message.tool_calls[0].function.name == "get_pods"
+    assert message.tool_calls[0].function.arguments == tool_call.tool_calls[0].function.arguments
+
+
+def test_the_responses_persist_in_the_store(tmp_path):
+    path = str(tmp_path / "responses.db")
+    CachedClient(ScriptedClient(["the pods are running"]), path=path)(request("check the pods"), [])
+    scripted = ScriptedClient(["never"])
+
+    message, _ = CachedClient(scripted, path=path)(request("check the pods"), [])
+
+    assert message.content == "the pods are running"
+    assert scripted.calls == 0
+
+
+def test_the_store_is_bounded_by_max_entries(tmp_path):
+    scripted = ScriptedClient(["first", "second", "third"])
+    client = CachedClient(scripted, path=str(tmp_path / "responses.db"), max_entries=2)
+
+    for content in ("one", "two", "three", "one"):
+        client(request(content), [])
+
+    assert scripted.calls == 4  # the oldest one was evicted
+
+
+@pytest.mark.parametrize("temperature, calls", [(0.2, 1), (0.9, 2)])
+def test_the_sampled_clients_bypass_the_cache(temperature, calls):
+    scripted = ScriptedClient(["the pods are running"])
+    scripted.model_temperature = temperature
+    client = CachedClient(scripted, bypass_temperature=0.5)
+
+    client(request("check the pods"), [])
+    client(request("check the pods"), [])
+
+    assert scripted.calls == calls
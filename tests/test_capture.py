@@ -0,0 +1,92 @@
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tool.capture import (
+    HeadTailBuffer,
+    forward_output,
+    read_head_tail,
+    relayed_result,
+    run_captured,
+    submit_relayed,
+)
+
+posix_only = pytest.mark.skipif(sys.platform == "win32", reason="the capture selects on the pipes")
+
+
+def test_the_head_and_tail_are_kept():
+    buffer = HeadTailBuffer(head_bytes=4, tail_bytes=4)
+    for chunk in (b"head", b"-the-middle-", b"tail"):
+        buffer.write(chunk)
+
+    assert buffer.truncated
+    assert buffer.text() == "head\n... [12 bytes truncated] ...\ntail"
+
+
+def test_a_short_output_is_kept_whole():
+    buffer = HeadTailBuffer(head_bytes=4, tail_bytes=4)
+    buffer.write(b"get pods")
+
+    assert not buffer.truncated
+    assert buffer.text() == "get pods"
+
+
+def test_the_file_is_read_like_the_buffer():
+    data = bytes(range(256)) * 10
+
+    buffer = HeadTailBuffer(head_bytes=100, tail_bytes=50)
+    buffer.write(data)
+
+    assert read_head_tail(io.BytesIO(data), head_bytes=100, tail_bytes=50) == buffer.text()
+
+
+@posix_only
+def test_the_output_is_bounded():
+    result = run_captured([sys.executable, "-c", "print('x' * 100000); print('end')"], head_bytes=10, tail_bytes=10)
+
+    assert result.exit_code == 0 and result.truncated
+    assert result.stdout.startswith("x" * 10) and result.stdout.endswith("end\n")
+    assert result.total_bytes == 100005
+    assert result.notes() == "[100005 bytes seen, the middle is truncated]"
+
+
+@posix_only
+def test_the_command_is_killed_after_max_bytes():
+    result = run_captured(["yes"], max_bytes=100000)
+
+    assert result.exceeded_bytes and result.exit_code is None
+    assert len(result.stdout) < 100000
+
+
+@posix_only
+def test_the_command_is_killed_after_the_timeout():
+    result = run_captured("echo started; sleep 10", shell=True, timeout=0.5)
+
+    assert result.timed_out and result.exit_code is None
+    assert result.stdout == "started\n"
+
+
+@posix_only
+def test_the_lines_are_forwarded_as_they_arrive():
+    lines = []
+
+    with forward_output(lines.append):
+        run_captured("echo one; echo two >&2; printf three", shell=True, input="")
+
+    assert sorted(lines) == ["one", "three", "two"]
+
+
+@posix_only
+def test_the_lines_of_a_tool_thread_are_held_until_the_console_listens():
+    lines = []
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = submit_relayed(executor, run_captured, "echo one; echo two", shell=True)
+        future.result()
+        with forward_output(lines.append):
+            result = relayed_result(future)
+
+    assert result.stdout == "one\ntwo\n"
+    assert lines == ["one", "two"]
@@ -0,0 +1,74 @@
+import pytest
+
+from memory import ChatBufferMemory
+
+SYSTEM = "You are a kubernetes engineer."
+
+
+def message(role, content):
+    return {"role": role, "content": content}
+
+
+def contents(messages):
+    return [message["content"] for message in messages]
+
+
+def test_the_oldest_messages_are_evicted():
+    memory = ChatBufferMemory(size=3)
+
+    for index in range(5):
+        memory.add(message("user", f"{index}"))
+
+    assert contents(memory.get(SYSTEM)) == [SYSTEM, "2", "3", "4"]
+    assert memory.last()["content"] == "4"
+
+
+def test_no_tool_result_is_left_without_its_tool_call():
+    memory = ChatBufferMemory(size=3)
+    memory.add(message("user", "check the pods"))
+    memory.add({"role": "assistant", "content": None, "tool_calls": [{"id": "call_0"}]})
+    memory.add({"role": "tool", "content": "nginx Running", "tool_call_id": "call_0"})
+
+    memory.add(message("user", "and the nodes"))
+    memory.add(message("assistant", "the nodes are ready"))
+
+    assert [message["role"] for message in memory.get(SYSTEM)] == ["system", "user", "assistant"]
+
+
+def test_get_is_a_live_read_only_view():
+    memory = ChatBufferMemory(size=10)
+    memory.add(message("user", "check the pods"))
+
+    view = memory.get(SYSTEM)
+    turn = list(view)
+    memory.add(message("assistant", "nginx is running"))
+
+    assert len(view) == 3 and len(turn) == 2
+    assert view[-1]["content"] == "nginx is running"
+    assert contents(view[1:]) == ["check the pods", "nginx is running"]
+    assert view == [message("system", SYSTEM), *memory.get(None)]
+    assert not hasattr(view, "append")
+    with pytest.raises(IndexError):
+        view[3]
+
+
+def test_the_system_message_is_reused_until_it_changes():
+    memory = ChatBufferMemory()
+
+    first = memory.get(SYSTEM)[0]
+
+    assert memory.get(SYSTEM)[0] is first
+    assert memory.get("You are a helpful assistant.")[0]["content"] == "You are a helpful assistant."
+    assert len(memory.get("")) == 0
+
+
+def test_pop():
+    memory = ChatBufferMemory(size=5)
+    for index in range(3):
+        memory.add(message("user", f"{index}"))
+
+    assert memory.pop()["content"] == "2"
+    assert memory.pop(0)["content"] == "0"
+    assert contents(memory.get(None)) == ["1"]
+    memory.clear()
+    assert memory.last() is None
@@ -0,0 +1,74 @@
+import pytest
+
+from memory import ChatTokenMemory
+from memory.chat_token_memory import TRUNCATED_MARKER
+from memory.token_counter import estimate_tokens, message_tokens
+
+SYSTEM = "You are a kubernetes engineer."
+
+
+def message(role, content, **fields):
+    return {"role": role, "content": content, **fields}
+
+
+def tool_call(call_id):
+    return {"id": call_id, "type": "function", "function": {"name": "get_pods", "arguments": "{}"}}
+
+
+def words(count, word="pod"):
+    return " ".join([word] * count)
+
+
+def contents(memory):
+    return [message["content"] for message in memory.get(SYSTEM)[1:]]
+
+
+def test_the_estimates():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("get pods") == 2
+    assert estimate_tokens("kubernetes") == 2  # a long word is split
+    assert estimate_tokens("10.0.12345") == 6  # 10 . 0 . 123 45
+    assert message_tokens(message("user", "get pods")) == 2 + 4
+
+
+def test_the_oldest_messages_are_evicted_under_the_budget():
+    memory = ChatTokenMemory(max_tokens=150, reserved_tokens=50)
+
+    for index in range(10):
+        memory.add(message("user", f"{index} {words(20)}"))
+
+    assert len(memory.get(SYSTEM)) > 1
+    assert memory.tokens + message_tokens(message("system", SYSTEM)) <= memory.budget
+    assert contents(memory)[-1].startswith("9 ")
+    assert not any(content.startswith("0 ") for content in contents(memory))
+
+
+def test_the_tool_results_are_evicted_with_their_tool_calls():
+    memory = ChatTokenMemory(max_tokens=150, reserved_tokens=50)
+    memory.add(message("user", "check the pods"))
+    memory.add(message("assistant", None, tool_calls=[tool_call("call_0"), tool_call("call_1")]))
+    memory.add(message("tool", words(20), tool_call_id="call_0"))
+    memory.add(message("tool", words(20), tool_call_id="call_1"))
+    memory.add(message("user", words(60, "node")))
+
+    roles = [message["role"] for message in memory.get(SYSTEM)]
+
+    assert roles[1] != "tool"
+    assert ("tool" in roles) == ("assistant" in roles)
+
+
+def test_the_latest_turn_is_truncated_to_the_budget():
+    memory = ChatTokenMemory(max_tokens=150, reserved_tokens=50)
+    memory.add(message("user", "check the pods"))
+    memory.add(message("user", f"first {words(300)} last"))
+
+    (content,) = contents(memory)
+
+    assert TRUNCATED_MARKER in content
+    assert content.startswith("first") and content.endswith("last")
+    assert memory.tokens + message_tokens(message("system", SYSTEM)) <= memory.budget
+
+
+def test_max_tokens_should_exceed_the_reserved_tokens():
+    with pytest.raises(ValueError):
+        ChatTokenMemory(max_tokens=1024, reserved_tokens=1024)
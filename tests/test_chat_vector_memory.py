@@ -0,0 +1,126 @@
+import threading
+from typing import List
+
+import pytest
+
+pytest.importorskip("llama_index.core")
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.memory import VectorMemory
+
+from memory.chat_vector_memory import ChatVectorMemory
+
+
+class CountingEmbedding(MockEmbedding):
+    """Record the batches of texts embedded, each waits for the gate."""
+
+    _batches: List[List[str]] = PrivateAttr(default_factory=list)
+    _gate: threading.Event = PrivateAttr(default_factory=threading.Event)
+    _waiting: threading.Event = PrivateAttr(default_factory=threading.Event)
+
+    @property
+    def batches(self) -> List[List[str]]:
+        return self._batches
+
+    @property
+    def gate(self) -> threading.Event:
+        return self._gate
+
+    @property
+    def waiting(self) -> threading.Event:
+        return self._waiting
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        self._waiting.set()
+        assert self._gate.wait(5)
+        self._batches.append(list(texts))
+        return super()._get_text_embeddings(texts)
+
+
+@pytest.fixture
+def embed_model():
+    embed_model = CountingEmbedding(embed_dim=8)
+    embed_model.gate.set()
+    return embed_model
+
+
+@pytest.fixture
+def vector_memory(embed_model):
+    return VectorMemory.from_defaults(embed_model=embed_model, retriever_kwargs={"similarity_top_k": 10})
+
+
+def stored_texts(vector_memory):
+    return sorted(node.text for node in vector_memory.vector_index.docstore.docs.values())
+
+
+def contents(text):
+    """The contents of the persisted messages in the text of a node."""
+    return [part.split(" update at ")[0] for part in text.split("with content: ")[1:]]
+
+
+def message(role, content):
+    return {"role": role, "content": content}
+
+
+def test_the_messages_queued_meanwhile_are_written_in_one_batch(vector_memory, embed_model):
+    memory = ChatVectorMemory(vector_memory=vector_memory, buffer_size=10)
+    embed_model.gate.clear()  # the first write waits, while the rest is queued
+
+    memory.add(message("user", "Bob likes burgers"), persistent=True)
+    assert embed_model.waiting.wait(5)
+    memory.add(message("assistant", "noted"), persistent=True)
+    memory.add(message("user", "Alice likes tea"), persistent=True)
+    memory.add(message("assistant", "noted too"), persistent=True)
+    embed_model.gate.set()
+    memory.close()
+
+    assert [len(batch) for batch in embed_model.batches] == [1, 2]
+    assert [contents(text) for text in stored_texts(vector_memory)] == [
+        ["Alice likes tea", "noted too"],
+        ["Bob likes burgers", "noted"],
+    ]
+    assert memory.stats()["batches"] == 2 and memory.stats()["messages"] == 4
+
+
+def test_the_replies_of_a_later_batch_join_the_user_message(vector_memory):
+    memory = ChatVectorMemory(vector_memory=vector_memory, write_behind=False)
+
+    memory.add(message("user", "Bob likes burgers"), persistent=True)
+    memory.add(message("assistant", "noted"), persistent=True)
+
+    (text,) = stored_texts(vector_memory)
+    assert contents(text) == ["Bob likes burgers", "noted"]
+    retrieved = vector_memory.get("burgers")
+    assert [(m.role.value, m.content.rsplit(": ", 1)[1]) for m in retrieved] == [
+        ("user", "Bob likes burgers"),
+        ("assistant", "noted"),
+    ]
+
+
+def test_get_waits_for_the_writes_and_caches_the_retrieval(vector_memory):
+    memory = ChatVectorMemory(vector_memory=vector_memory)
+    memory.add(message("user", "Bob likes burgers"), persistent=True)
+
+    first = memory.get("You are helpful.")
+    second = memory.get("You are helpful.")
+
+    assert "Bob likes burgers" in first[0]["content"]
+    assert second[0] is first[0]
+    assert memory.stats()["retrieval_hits"] == 1
+    memory.add(message("assistant", "noted"), persistent=True)
+    assert "noted" in memory.get("You are helpful.")[0]["content"]
+    memory.close()
+
+
+def test_the_worker_failure_is_raised_by_the_flush(vector_memory):
+    memory = ChatVectorMemory(vector_memory=vector_memory)
+    memory._write = lambda messages: 1 / 0
+
+    memory.add(message("user", "Bob likes burgers"), persistent=True)
+
+    with pytest.raises(ZeroDivisionError):
+        memory.flush()
+    memory.flush()  # raised once
+    memory.close()
+
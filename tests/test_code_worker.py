@@ -0,0 +1,58 @@
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the workers read their pipes by select")
+
+from tool.code_worker import CodeWorkerPool
+
+
+@pytest.fixture
+def workers(tmp_path):
+    with CodeWorkerPool(timeout=5, cwd=str(tmp_path)) as workers:
+        yield workers
+
+
+def test_the_python_session_keeps_its_state(workers):
+    workers.code_executor("python", "import json\npods = ['nginx']")
+
+    assert workers.code_executor("python3", "print(json.dumps(pods))").strip() == '["nginx"]'
+
+
+def test_the_bash_session_keeps_its_variables_and_cwd(workers, tmp_path):
+    (tmp_path / "manifests").mkdir()
+    workers.code_executor("bash", "cd manifests && NAMESPACE=default")
+
+    assert workers.code_executor("bash", "pwd; echo $NAMESPACE").split() == [str(tmp_path / "manifests"), "default"]
+
+
+def test_the_errors_are_returned(workers):
+    assert "ZeroDivisionError" in workers.code_executor("python", "1 / 0")
+    assert "missing-command" in workers.code_executor("bash", "missing-command")
+    assert workers.code_executor("python", "print('still alive')").strip() == "still alive"
+
+
+def test_a_timeout_restarts_the_session(tmp_path):
+    with CodeWorkerPool(timeout=0.5, cwd=str(tmp_path)) as workers:
+        workers.code_executor("python", "pods = ['nginx']")
+
+        assert "timed out" in workers.code_executor("python", "import time; time.sleep(10)")
+        assert "NameError" in workers.code_executor("python", "print(pods)")
+
+
+def test_an_exit_restarts_the_session(workers):
+    workers.code_executor("bash", "NAMESPACE=default")
+
+    output = workers.code_executor("bash", "echo bye; exit 3")
+
+    assert output.startswith("bye")
+    assert "the bash session exited" in output.lower()
+    assert workers.code_executor("bash", "echo ${NAMESPACE:-unset}").strip() == "unset"
+
+
+def test_the_outputs_are_bounded(tmp_path):
+    with CodeWorkerPool(cwd=str(tmp_path), head_bytes=100, tail_bytes=100) as workers:
+        output = workers.code_executor("python", "print('x' * 100000 + 'end')")
+
+    assert len(output) < 1000
+    assert output.rstrip().endswith("end")
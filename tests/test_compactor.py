@@ -0,0 +1,119 @@
+import pytest
+
+from observation import BlobStore, ObservationCompactor
+
+HANDLE_MARKER = "read_observation(handle="
+
+
+@pytest.fixture
+def blob_store(tmp_path):
+    blob_store = BlobStore(str(tmp_path))
+    yield blob_store
+    blob_store.close()
+
+
+def pod_logs(lines=40):
+    return "\n".join(f"2024-05-01T10:00:{i:02d}Z pod web-{i} failed to pull image registry/web:{i}" for i in range(lines))
+
+
+def handle_of(text):
+    return text.rsplit(HANDLE_MARKER + '"', 1)[1].split('"', 1)[0]
+
+
+def test_the_defaults_without_a_blob_store_are_lossless():
+    compactor = ObservationCompactor()
+    logs = pod_logs()
+
+    content, reports = compactor.compact(logs)
+
+    assert content == logs
+    assert [report.step for report in reports] == ["fold_repeated_lines", "fold_blank_lines"]
+
+
+def test_the_defaults_without_a_blob_store_fold_the_repeats_and_blanks():
+    content, _ = ObservationCompactor().compact("a\n\n\n\nb   \n" + "the same long line\n" * 5)
+
+    assert content == "a\n\nb\nthe same long line [repeated 5 times]"
+
+
+def test_the_lossy_defaults_run_with_a_blob_store(blob_store):
+    compactor = ObservationCompactor(blob_store=blob_store)
+
+    content, reports = compactor.compact(pod_logs())
+
+    assert [report.step for report in reports] == [
+        "kube_minimizer",
+        "log_templates",
+        "deduplicate_log",
+        "fold_repeated_lines",
+        "fold_blank_lines",
+    ]
+    assert HANDLE_MARKER in content
+
+
+def test_the_lossy_defaults_run_once_a_blob_store_is_attached(blob_store):
+    compactor = ObservationCompactor()
+    compactor.attach(blob_store)
+
+    assert len(compactor.steps) == 5
+
+
+def test_max_tokens_needs_a_blob_store():
+    with pytest.raises(ValueError):
+        ObservationCompactor(max_tokens=100)
+
+
+def test_the_raw_log_is_read_back_after_templating(blob_store):
+    compactor = ObservationCompactor(blob_store=blob_store)
+    logs = pod_logs()
+
+    content, _ = compactor.compact(logs)
+
+    assert "<*>" in content
+    assert "web-17" not in content.split(HANDLE_MARKER)[0]
+    handle = handle_of(content)
+    assert blob_store.read_observation(handle, length=len(logs)) == logs
+    assert "web-17 failed" in blob_store.read_observation(handle, grep="web-17 ")
+
+
+def test_the_truncated_rows_are_paged_back(blob_store):
+    compactor = ObservationCompactor(max_tokens=100, blob_store=blob_store)
+    table = "NAME     STATUS\n" + "\n".join(f"pod-{i:03d}  Running" for i in range(200))
+
+    content, _ = compactor.compact(table)
+
+    assert "lines truncated" in content
+    assert "pod-100" not in content
+    handle = handle_of(content)
+    assert blob_store.size(handle) == len(table.encode())
+    pages, offset = [], 0
+    while True:
+        page = blob_store.read_observation(handle, offset=offset, length=1000)
+        text, _, more = page.partition("\n[")
+        pages.append(text)
+        if not more:
+            break
+        offset = int(more.rsplit("offset ", 1)[1].rstrip("]"))
+    assert "".join(pages) == table
+    assert blob_store.read_observation(handle, grep="pod-100") == f"@{table.index('pod-100')}: pod-100  Running"
+
+
+def test_the_same_output_is_stored_once(blob_store):
+    compactor = ObservationCompactor(max_tokens=100, blob_store=blob_store)
+    table = "\n".join(f"pod-{i:03d}  Running" for i in range(200))
+
+    first, _ = compactor.compact(table)
+    second, _ = compactor.compact(table)
+
+    assert handle_of(first) == handle_of(second)
+
+
+def test_a_lossless_compaction_keeps_no_blob(blob_store):
+    content, _ = ObservationCompactor(blob_store=blob_store).compact("NAME   STATUS   \nnginx  Running\n\n\n")
+
+    assert content == "NAME   STATUS\nnginx  Running"
+    assert HANDLE_MARKER not in content
+
+
+def test_an_unknown_handle(blob_store):
+    assert blob_store.read_observation("0123456789abcdef") == "No observation is stored by the handle 0123456789abcdef."
@@ -0,0 +1,86 @@
+import struct
+
+import pytest
+
+from cache import EmbeddingCache
+
+
+class CountingModel:
+    """Embed each text by its length, record the batches it's called with."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return [[len(text), 0.1, -1 / 3] for text in texts]
+
+
+def float16(value):
+    return struct.unpack("<e", struct.pack("<e", value))[0]
+
+
+def test_only_the_missed_texts_are_embedded_in_one_batch():
+    cache, model = EmbeddingCache("test-model"), CountingModel()
+
+    cache.embed(["get pods", "get nodes"], model)
+    embeddings = cache.embed(["get  pods", "get services", "get services", "get nodes"], model)
+
+    assert model.batches == [["get pods", "get nodes"], ["get services"]]
+    assert [embedding[0] for embedding in embeddings] == [8, 12, 12, 9]
+    stats = cache.stats
+    assert (stats["memory_hits"], stats["misses"]) == (2, 3)
+
+
+def test_the_embeddings_are_rounded_to_float16():
+    cache, model = EmbeddingCache("test-model"), CountingModel()
+
+    missed = cache.embed(["get pods"], model)
+    hit = cache.embed(["get pods"], model)
+
+    assert missed == hit == [[8.0, float16(0.1), float16(-1 / 3)]]
+    assert cache.stats["memory_bytes"] == 3 * 2
+
+
+def test_the_models_and_kinds_never_mix():
+    model = CountingModel()
+    cache = EmbeddingCache("test-model")
+
+    cache.embed(["get pods"], model)
+    cache.embed(["get pods"], model, kind="query")
+    EmbeddingCache("other-model").embed(["get pods"], model)
+
+    assert len(model.batches) == 3
+
+
+def test_the_disk_tier_is_shared(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    model = CountingModel()
+
+    EmbeddingCache("test-model", path=path).embed(["get pods"], model)
+    cache = EmbeddingCache("test-model", path=path)
+    embeddings = cache.embed(["get pods"], model)
+
+    assert len(model.batches) == 1
+    assert embeddings[0][0] == 8
+    assert cache.stats["disk_hits"] == 1
+
+
+def test_wrap():
+    cache, model = EmbeddingCache("test-model"), CountingModel()
+    embed = cache.wrap(model)
+
+    embed(["get pods"])
+    embed(["get pods"])
+
+    assert len(model.batches) == 1
+
+
+def test_a_short_batch_is_an_error():
+    cache = EmbeddingCache("test-model")
+
+    with pytest.raises(ValueError, match="returned 1 embeddings for 2 texts"):
+        cache.embed(["get pods", "get nodes"], lambda texts: [[1.0]])
+    model = CountingModel()
+    cache.embed(["get pods"], model)
+    assert model.batches == [["get pods"]]  # nothing was cached by the failed call
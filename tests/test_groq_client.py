@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+pytest.importorskip("groq")
+pytest.importorskip("instructor")
+
+import httpx
+from groq import Groq
+from pydantic import BaseModel
+
+from client.config import ClientConfig
+from client.groq_client import GroqClient
+
+
+def sse(*chunks):
+    events = [f"data: {json.dumps(chunk)}\n\n" for chunk in chunks]
+    return "".join(events) + "data: [DONE]\n\n"
+
+
+def chunk(delta, finish_reason=None, usage=None):
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "llama3",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        "x_groq": {"id": "req-1", "usage": usage} if usage else None,
+    }
+
+
+class Answer(BaseModel):
+    answer: str
+
+
+@pytest.fixture
+def requests():
+    return []
+
+
+@pytest.fixture
+def client(requests):
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        body = sse(
+            chunk({"role": "assistant", "content": "Hello"}),
+            chunk({"content": " world"}),
+            chunk({}, "stop", {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}),
+        )
+        return httpx.Response(200, text=body, headers={"Content-Type": "text/event-stream"})
+
+    class MockedGroqClient(GroqClient):
+        _groq_class = staticmethod(
+            lambda api_key: Groq(api_key=api_key, http_client=httpx.Client(transport=httpx.MockTransport(handle)))
+        )
+
+    return MockedGroqClient(ClientConfig(model="llama3", api_key="key"))
+
+
+def test_stream_without_a_response_model(client, requests):
+    stream = client.stream([{"role": "user", "content": "hi"}], None)
+
+    assert list(stream) == ["Hello", " world"]
+    message, _ = stream.complete()
+    assert message.content == "Hello world"
+    assert stream.usage.total_tokens == 5
+    (request,) = requests
+    assert request["stream"] is True
+    assert "response_format" not in request
+
+
+def test_stream_of_a_response_model_asks_for_json(client, requests):
+    client.stream([{"role": "user", "content": "hi"}], None, Answer).complete()
+
+    (request,) = requests
+    assert request["response_format"] == {"type": "json_object"}
@@ -0,0 +1,117 @@
+import time
+
+import pytest
+
+pytest.importorskip("kubernetes")
+
+from conftest import pod
+from tool.kube_api import KubeApiBackend
+
+STAMP = "[from the watch cache"
+PODS = "/api/v1/pods"
+
+
+@pytest.fixture
+def backend():
+    backend = KubeApiBackend(watch=["pods"])
+    yield backend
+    backend.close()
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def start_informer(kube_api, backend):
+    """Run the first get, which starts the informer, and wait for its watch."""
+    backend.run("kubectl get pods", kubeconfig=kube_api.kubeconfig)
+    (cluster,) = backend._clusters.values()
+    (informer,) = cluster.informers.values()
+    wait_until(lambda: informer.connected)
+    return informer
+
+
+def test_the_gets_are_served_from_the_list(kube_api, backend):
+    kube_api.add(pod("nginx"))
+    start_informer(kube_api, backend)
+
+    output, exit_code = backend.run("kubectl get pods", kubeconfig=kube_api.kubeconfig)
+
+    assert exit_code == 0
+    assert output.splitlines()[:2] == ["NAME    STATUS", "nginx   Running"]
+    assert output.splitlines()[-1].startswith(STAMP)
+    assert len(kube_api.requested(path=PODS, watch=False)) == 1
+
+
+def test_the_watch_events_update_the_store(kube_api, backend):
+    kube_api.add(pod("nginx"))
+    informer = start_informer(kube_api, backend)
+
+    kube_api.push("ADDED", pod("redis", status="Pending"))
+    kube_api.push("DELETED", pod("nginx"))
+    wait_until(lambda: [row["cells"][0] for row in informer.rows()] == ["redis"])
+
+    output, _ = backend.run("kubectl get pods -n default", kubeconfig=kube_api.kubeconfig)
+    assert output.splitlines()[:2] == ["NAME    STATUS", "redis   Pending"]
+
+
+def test_the_label_selector_is_served_from_the_index(kube_api, backend):
+    kube_api.add(pod("web-1", labels={"app": "web"}))
+    kube_api.add(pod("web-2", labels={"app": "web", "canary": "true"}))
+    kube_api.add(pod("db", labels={"app": "db"}))
+    start_informer(kube_api, backend)
+
+    output, _ = backend.run("kubectl get pods -l app=web,!canary", kubeconfig=kube_api.kubeconfig)
+    assert output.splitlines()[:2] == ["NAME    STATUS", "web-1   Running"]
+    output, _ = backend.run("kubectl get pod db", kubeconfig=kube_api.kubeconfig)
+    assert output.splitlines()[:2] == ["NAME   STATUS", "db     Running"]
+    assert len(kube_api.requested(path=PODS, watch=False)) == 1
+
+    # the set based selectors go to the server
+    backend.run("kubectl get pods -l 'app in (web)'", kubeconfig=kube_api.kubeconfig)
+    assert len(kube_api.requested(path="/api/v1/namespaces/default/pods", watch=False)) == 2
+
+
+def test_a_gone_watch_lists_again(kube_api, backend):
+    kube_api.add(pod("nginx"))
+    informer = start_informer(kube_api, backend)
+
+    kube_api.add(pod("redis"))  # missed by the watch
+    kube_api.push("ERROR", code=410)
+    wait_until(lambda: len(kube_api.requested(path=PODS, watch=True)) == 2 and informer.connected)
+
+    assert len(kube_api.requested(path=PODS, watch=False)) == 2
+    assert [row["cells"][0] for row in informer.rows()] == ["nginx", "redis"]
+    (_, watch) = kube_api.requested(path=PODS, watch=True)
+    assert watch["query"]["resourceVersion"] == [str(kube_api.resource_version)]
+
+
+def test_a_refused_list_stops_the_informer(kube_api, backend):
+    kube_api.list_status = 403
+
+    output, exit_code = backend.run("kubectl get pods", kubeconfig=kube_api.kubeconfig)
+    (cluster,) = backend._clusters.values()
+    (informer,) = cluster.informers.values()
+    wait_until(lambda: informer.refused is not None)
+    time.sleep(1.5)  # past the first backoff
+
+    assert (output, exit_code) == ("Error from server (Forbidden): pods is forbidden", 1)
+    assert len(kube_api.requested(path=PODS, watch=False)) == 1
+    assert kube_api.requested(path=PODS, watch=True) == []
+
+
+def test_a_refused_watch_falls_back_to_the_server(kube_api, backend):
+    kube_api.add(pod("nginx"))
+    informer = start_informer(kube_api, backend)
+
+    kube_api.push("ERROR", code=403)
+    wait_until(lambda: informer.refused is not None)
+
+    output, exit_code = backend.run("kubectl get pods", kubeconfig=kube_api.kubeconfig)
+    assert exit_code == 0
+    assert STAMP not in output
+    assert informer.rows() is None
+    assert len(kube_api.requested(path=PODS, watch=True)) == 1
@@ -0,0 +1,102 @@
+import pytest
+
+pytest.importorskip("kubernetes")
+
+from conftest import pod
+from tool.kube_api import KubeApiBackend, UnsupportedCommand
+
+
+@pytest.fixture
+def backend():
+    backend = KubeApiBackend()
+    yield backend
+    backend.close()
+
+
+def test_get_prints_the_table(kube_api, backend):
+    kube_api.add(pod("nginx"))
+    kube_api.add(pod("redis", status="Pending"))
+
+    output, exit_code = backend.run("kubectl get pods -n default", kubeconfig=kube_api.kubeconfig)
+
+    assert exit_code == 0
+    assert output.splitlines() == [
+        "NAME    STATUS",
+        "nginx   Running",
+        "redis   Pending",
+    ]
+
+
+def test_get_of_a_missing_pod_is_an_error(kube_api, backend):
+    output, exit_code = backend.run("kubectl get pod nginx", kubeconfig=kube_api.kubeconfig)
+
+    assert exit_code == 1
+    assert output == 'Error from server (NotFound): pods "nginx" not found'
+
+
+@pytest.mark.parametrize("flag", ["-p", "--previous"])
+def test_logs_previous(kube_api, backend, flag):
+    kube_api.add(pod("nginx"))
+
+    output, exit_code = backend.run(f"kubectl logs nginx {flag} --tail 5", kubeconfig=kube_api.kubeconfig)
+
+    assert (output, exit_code) == ("line 1\nline 2\n", 0)
+    (request,) = kube_api.requested(path="/api/v1/namespaces/default/pods/nginx/log")
+    assert request["query"] == {"previous": ["true"], "tailLines": ["5"]}
+
+
+def test_logs_of_all_the_lines(kube_api, backend):
+    output, exit_code = backend.run("kubectl logs nginx --tail=-1", kubeconfig=kube_api.kubeconfig)
+
+    assert (output, exit_code) == ("line 1\nline 2\n", 0)
+    (request,) = kube_api.requested(path="/api/v1/namespaces/default/pods/nginx/log")
+    assert request["query"] == {}
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "kubectl logs nginx -f",  # follow, not a filename
+        "kubectl logs nginx --follow",
+        "kubectl logs nginx --tail=abc",  # the binary reports the invalid values
+        "kubectl logs nginx --tail=-1s",
+        "kubectl logs nginx --since 5d",
+        "kubectl get pods -w",
+        "kubectl get -f pod.yaml",
+        "kubectl describe pod nginx",
+        "kubectl apply -f pod.yaml",
+        "kubectl apply -f -",
+        "kubectl patch -f pod.yaml -p '{}'",
+        "kubectl get pods | grep nginx",
+    ],
+)
+def test_the_binary_runs_the_other_commands(kube_api, backend, command):
+    with pytest.raises(UnsupportedCommand):
+        backend.run(command, kubeconfig=kube_api.kubeconfig)
+    assert kube_api.requested(method="PATCH") == []
+
+
+def test_patch(kube_api, backend):
+    kube_api.add(pod("nginx"))
+
+    output, exit_code = backend.run(
+        "kubectl patch pod nginx --type merge -p '{\"metadata\": {\"labels\": {\"app\": \"web\"}}}'",
+        kubeconfig=kube_api.kubeconfig,
+    )
+
+    assert (output, exit_code) == ("pod/nginx patched", 0)
+    (request,) = kube_api.requested(method="PATCH")
+    assert request["path"] == "/api/v1/namespaces/default/pods/nginx"
+    assert request["headers"]["Content-Type"] == "application/merge-patch+json"
+    assert request["body"] == {"metadata": {"labels": {"app": "web"}}}
+
+
+def test_patch_from_the_input(kube_api, backend):
+    output, exit_code = backend.run(
+        "kubectl patch pod nginx -p", kubeconfig=kube_api.kubeconfig, input='{"spec": {"activeDeadlineSeconds": 5}}'
+    )
+
+    assert (output, exit_code) == ("pod/nginx patched", 0)
+    (request,) = kube_api.requested(method="PATCH")
+    assert request["headers"]["Content-Type"] == "application/strategic-merge-patch+json"
+    assert request["body"] == {"spec": {"activeDeadlineSeconds": 5}}
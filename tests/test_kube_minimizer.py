@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+yaml = pytest.importorskip("yaml")
+
+from observation import kube_minimizer
+
+
+def pod(**status):
+    return {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": {
+            "name": "nginx",
+            "namespace": "default",
+            "uid": "3f1c",
+            "resourceVersion": "123",
+            "managedFields": [{"manager": "kubectl"}],
+            "annotations": {"kubectl.kubernetes.io/last-applied-configuration": "{}"},
+            "ownerReferences": [{"kind": "ReplicaSet", "name": "nginx-5d", "uid": "9a7b"}],
+        },
+        "status": status or {"phase": "Running"},
+    }
+
+
+def test_the_noise_is_dropped():
+    minimized = yaml.safe_load(kube_minimizer()(yaml.safe_dump(pod())))
+
+    assert minimized["metadata"] == {
+        "name": "nginx",
+        "namespace": "default",
+        "ownerReferences": [{"kind": "ReplicaSet", "name": "nginx-5d"}],
+    }
+    assert minimized["status"] == {"phase": "Running"}
+
+
+def test_the_json_is_minimized_to_yaml():
+    output = kube_minimizer()(json.dumps({"apiVersion": "v1", "kind": "List", "items": [pod(), pod()]}))
+
+    minimized = yaml.safe_load(output)
+    assert len(minimized["items"]) == 2  # the items of a List are kept
+    assert "uid" not in output
+
+
+def test_the_latest_conditions_are_kept():
+    conditions = [
+        {"type": f"Condition{i}", "status": "True", "lastTransitionTime": f"2024-05-01T10:00:0{i}Z", "lastProbeTime": None}
+        for i in range(8)
+    ]
+
+    minimized = yaml.safe_load(kube_minimizer(max_conditions=3)(yaml.safe_dump(pod(conditions=conditions))))
+
+    assert [condition["type"] for condition in minimized["status"]["conditions"]] == [
+        "Condition5",
+        "Condition6",
+        "Condition7",
+    ]
+    assert "lastProbeTime" not in minimized["status"]["conditions"][0]
+
+
+def test_the_repeated_items_are_collapsed():
+    env = [{"name": "MODE", "value": "debug"}] * 5
+
+    minimized = yaml.safe_load(kube_minimizer()(yaml.safe_dump(pod(env=env))))
+
+    assert minimized["status"]["env"] == [{"name": "MODE", "value": "debug"}, "... [repeated 4 more times]"]
+
+
+def test_the_prefix_and_the_trailing_note_are_kept():
+    output = kube_minimizer()("Warning: deprecated\n" + yaml.safe_dump(pod()) + "\n[cached 3s ago]")
+
+    assert output.startswith("Warning: deprecated\napiVersion: v1")
+    assert output.endswith("\n[cached 3s ago]")
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["NAME    STATUS\nnginx   Running", "kind: [unclosed", "Error from server (NotFound): pods \"nginx\" not found"],
+)
+def test_the_other_text_is_returned_as_it_is(text):
+    assert kube_minimizer()(text) == text
@@ -0,0 +1,83 @@
+import os
+import stat
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the fake kubectl is a shell script")
+
+from tool.kubectl_executor import ClusterConfig, KubectlExecutor, merge_outputs
+from type import ToolError
+
+# the fake kubectl answers by the context it's given
+KUBECTL = """#!/bin/sh
+while [ $# -gt 0 ]; do
+  [ "$1" = "--context" ] && context=$2
+  shift
+done
+case $context in
+  cluster1) printf 'NAME    STATUS\\nnginx   Running\\n' ;;
+  cluster2) printf 'NAME    STATUS\\nredis   CrashLoopBackOff\\n' ;;
+  cluster3) echo "No resources found in default namespace." ;;
+  *) echo "error: context $context was not found" >&2; exit 1 ;;
+esac
+"""
+
+
+@pytest.fixture
+def executor(tmp_path, monkeypatch):
+    kubectl = tmp_path / "bin" / "kubectl"
+    kubectl.parent.mkdir()
+    kubectl.write_text(KUBECTL)
+    kubectl.chmod(kubectl.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{kubectl.parent}{os.pathsep}{os.environ['PATH']}")
+    kubeconfig = tmp_path / "kubeconfig"
+    kubeconfig.write_text("apiVersion: v1\nkind: Config\n")
+
+    executor = KubectlExecutor(default_kubeconfig=str(kubeconfig))
+    for name, env in (("cluster1", "prod"), ("cluster2", "prod"), ("cluster3", "dev"), ("cluster4", "dev")):
+        executor.register_cluster(
+            ClusterConfig(name=name, kubeconfig=str(kubeconfig), context=name, labels={"env": env})
+        )
+    return executor
+
+
+def test_the_tables_are_merged_by_the_cluster(executor):
+    output = executor.kubectl_fanout("kubectl get pods", clusters="cluster1,cluster2,cluster3")
+
+    assert not isinstance(output, ToolError)
+    assert output.splitlines() == [
+        "CLUSTER    NAME    STATUS",
+        "cluster1   nginx   Running",
+        "cluster2   redis   CrashLoopBackOff",
+        "",
+        "No resources found: cluster3",
+    ]
+
+
+def test_the_clusters_are_selected_by_their_labels(executor):
+    output = executor.kubectl_fanout("kubectl get pods", clusters="env=prod")
+
+    assert "cluster1" in output and "cluster2" in output
+    assert "cluster3" not in output
+
+
+def test_the_failed_clusters_are_listed(executor):
+    output = executor.kubectl_fanout("kubectl get pods")
+
+    assert isinstance(output, ToolError)
+    assert output.endswith("Errors:\n  cluster4: error: context cluster4 was not found")
+    assert "cluster1   nginx" in output
+
+
+def test_an_unknown_selection(executor):
+    output = executor.kubectl_fanout("kubectl get pods", clusters="env=staging")
+
+    assert isinstance(output, ToolError)
+    assert output.startswith("No cluster matches env=staging")
+
+
+def test_the_other_outputs_are_listed_by_the_cluster():
+    output = merge_outputs({"cluster1": ("Client Version: v1.30\n", True), "cluster2": ("", True)})
+
+    assert output == "cluster1:\n  Client Version: v1.30\n\nNo resources found: cluster2"
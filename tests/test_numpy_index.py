@@ -0,0 +1,97 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from memory import NumpyVectorIndex
+
+DIM = 8
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).normal(size=(100, DIM)).astype(np.float32)
+
+
+def brute_force(vectors, query, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores)[:k]), scores
+
+
+def payloads(count, start=0):
+    return [{"content": f"memory {i}"} for i in range(start, start + count)]
+
+
+@pytest.mark.parametrize("k", [1, 5, 100, 200])
+def test_the_top_k_is_the_nearest_first(vectors, k):
+    index = NumpyVectorIndex(dim=DIM, capacity=16)  # grows on the add
+    index.add(vectors, payloads(len(vectors)))
+    query = vectors[7] + 0.1
+
+    results = index.search(query, k=k)
+
+    expected, scores = brute_force(vectors, query, k)
+    assert [id for id, _, _ in results] == expected
+    assert [score for _, score, _ in results] == pytest.approx([scores[i] for i in expected], abs=1e-5)
+    assert results[0][2] == {"content": "memory 7", "id": 7}
+
+
+def test_the_quantized_top_k(vectors):
+    index = NumpyVectorIndex(dim=DIM, quantize=True)
+    index.add(vectors, payloads(len(vectors)))
+
+    (id, score, _), *_ = index.search(vectors[42], k=3)
+
+    assert id == 42
+    assert score == pytest.approx(1, abs=0.02)
+
+
+def test_the_deleted_vectors_are_never_found(vectors):
+    index = NumpyVectorIndex(dim=DIM)
+    ids = index.add(vectors[:10], payloads(10))
+
+    index.delete(ids[:4])
+    results = index.search(vectors[0], k=10)
+
+    assert len(index) == 6
+    assert sorted(id for id, _, _ in results) == ids[4:]
+
+
+def test_the_compaction_keeps_the_ids(vectors):
+    index = NumpyVectorIndex(dim=DIM)
+    ids = index.add(vectors[:10], payloads(10))
+
+    index.delete(ids[:6])  # more dead rows than live ones
+
+    assert index.count == 4
+    assert index.search(vectors[8], k=1)[0][0] == 8
+    assert index.add(vectors[10:11], payloads(1, 10)) == [10]
+
+
+def test_an_empty_search():
+    index = NumpyVectorIndex(dim=DIM)
+
+    assert index.search(np.ones(DIM), k=3) == []
+    index.add(np.ones((1, DIM)), payloads(1))
+    assert index.search(np.ones(DIM), k=0) == []
+
+
+def test_the_index_is_reopened_from_its_path(vectors, tmp_path):
+    index = NumpyVectorIndex(dim=DIM, path=str(tmp_path), capacity=16)
+    ids = index.add(vectors[:20], payloads(20))
+    index.delete(ids[:2])
+    index.close()
+
+    index = NumpyVectorIndex(dim=DIM, path=str(tmp_path))
+
+    assert len(index) == 18
+    assert index.search(vectors[5], k=1)[0][:1] == (5,)
+    assert index.add(vectors[20:21], payloads(1, 20)) == [20]
+    index.close()
+    with pytest.raises(ValueError):
+        NumpyVectorIndex(dim=DIM * 2, path=str(tmp_path))
+
+
+def test_the_vectors_and_payloads_should_match():
+    with pytest.raises(ValueError):
+        NumpyVectorIndex(dim=DIM).add(np.ones((2, DIM)), payloads(1))
@@ -0,0 +1,145 @@
+import json
+import threading
+
+import pytest
+from openai.types.chat.chat_completion_chunk import ChoiceDelta
+
+from agent import PromptAgent
+from agent.action_stream import ActionStreamParser
+from bench.quiet_chat import QuietChat
+from bench.scripted_client import ScriptedClient, prompt_answer
+from client.stream import ChatStream
+from memory import ChatBufferMemory
+
+
+def feed(parser, content, size=3):
+    """Feed the content in pieces, return the action and the offset of the piece it was returned by."""
+    for start in range(0, len(content), size):
+        action = parser.feed(content[start : start + size])
+        if action is not None:
+            return action, start + size
+    return None, len(content)
+
+
+def test_the_action_is_returned_once_its_object_closes():
+    content = json.dumps(
+        {
+            "action": {"name": "get_pods", "edit": 0, "args": {"namespace": "default"}},
+            "thought": ["the pods first"],
+        }
+    )
+
+    action, offset = feed(ActionStreamParser(), content)
+
+    assert (action.name, action.edit, action.args) == ("get_pods", 0, {"namespace": "default"})
+    assert offset < content.index("thought")
+
+
+def test_the_braces_and_quotes_in_the_strings_are_skipped():
+    content = json.dumps(
+        {
+            "thought": ['an "action": {"name": "x"} in the thought'],
+            "action": {"name": "grep", "edit": 0, "args": {"pattern": 'a}"{b\\'}},
+        }
+    )
+
+    action, _ = feed(ActionStreamParser(), content)
+
+    assert action.name == "grep"
+    assert action.args == {"pattern": 'a}"{b\\'}
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        {"thought": ["done"], "answer": "all pods are running"},
+        {"thought": ["x"], "action": {"name": "get_pods", "args": {}}},  # no edit
+        {"thought": ["x"], "action": {"name": "get_pods", "edit": "yes", "args": {}}},
+        {"thought": ["x"], "args": {"action": {"name": "get_pods", "edit": 0, "args": {}}}},  # nested
+    ],
+)
+def test_no_action_is_returned(response):
+    assert feed(ActionStreamParser(), json.dumps(response)) == (None, len(json.dumps(response)))
+
+
+def test_the_action_is_returned_once():
+    parser = ActionStreamParser()
+    action = {"name": "get_pods", "edit": 0, "args": {}}
+
+    assert parser.feed(json.dumps({"action": action})[:-1]) is not None
+    assert parser.feed(json.dumps({"action": action})) is None
+
+
+class PausedClient(ScriptedClient):
+    """Stream the response leading with its action in two pieces, and wait for the event before the second one."""
+
+    def __init__(self, script, event, timeout=5):
+        super().__init__(script)
+        self._event = event
+        self._timeout = timeout
+        self.waited = None
+
+    def stream(self, messages, tools, response_model=None):
+        message, _ = self(messages, tools, response_model)
+        content = message.content
+        split = content.index(', "thought"') if content.startswith('{"action"') else len(content)
+
+        def deltas():
+            yield ChoiceDelta(content=content[:split])
+            if split < len(content):
+                self.waited = self._event.wait(self._timeout)
+                yield ChoiceDelta(content=content[split:])
+
+        return ChatStream(deltas())
+
+
+def prompt_agent(client, tools):
+    agent = PromptAgent(
+        client,
+        "test",
+        "You are a kubernetes engineer.",
+        tools=tools,
+        memory=ChatBufferMemory(size=20),
+        debug=False,
+        stream=True,
+    )
+    agent.chat_console = QuietChat()
+    return agent
+
+
+def test_the_action_runs_while_the_response_is_streaming():
+    started = threading.Event()
+    calls = []
+
+    def get_pods(namespace: str) -> str:
+        """Get the pods of the namespace."""
+        calls.append(namespace)
+        started.set()
+        return "nginx Running"
+
+    action = json.dumps(
+        {"action": {"name": "get_pods", "edit": 0, "args": {"namespace": "default"}}, "thought": ["check the pods"]}
+    )
+    client = PausedClient([action, prompt_answer("nginx is running")], started)
+
+    answer = prompt_agent(client, [get_pods]).run("check the pods")
+
+    assert client.waited is True
+    assert calls == ["default"]
+    assert answer == "nginx is running"
+
+
+@pytest.mark.parametrize("args", [None, "default", ["default"]])
+def test_a_malformed_action_is_left_to_the_complete_response(args):
+    def get_pods(namespace: str = "default") -> str:
+        """Get the pods of the namespace."""
+        return "nginx Running"
+
+    action = json.dumps({"action": {"name": "get_pods", "edit": 0, "args": args}, "thought": ["check the pods"]})
+    client = PausedClient([action, prompt_answer("done")], threading.Event(), timeout=0.1)
+    test_agent = prompt_agent(client, [get_pods])
+
+    test_agent.run("check the pods")
+
+    assert client.waited is False  # nothing was dispatched while streaming
+    assert test_agent._early_action is None
@@ -0,0 +1,66 @@
+import sys
+import threading
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the limits are applied by the bash ulimit")
+
+from tool.sandbox import SandboxExecutor
+
+
+def test_the_code_runs_in_a_scratch_directory(tmp_path):
+    sandbox = SandboxExecutor(scratch_root=str(tmp_path))
+
+    output = sandbox.code_executor("bash", "pwd; echo hello > hello.txt; cat hello.txt")
+
+    assert output.splitlines()[0].startswith(str(tmp_path / "sandbox-"))
+    assert "hello" in output
+    assert list(tmp_path.iterdir()) == []  # removed after the run
+    (run,) = sandbox.runs
+    assert (run.language, run.exit_code, run.rejected) == ("bash", 0, False)
+
+
+def test_the_cpu_time_limit_is_signalled():
+    sandbox = SandboxExecutor(cpu_seconds=1, timeout=10)
+
+    output = sandbox.code_executor("bash", "exec python3 -c 'while True: pass'")
+
+    assert output.endswith("[killed by the CPU time limit]")
+    assert not sandbox.runs[-1].timed_out
+
+
+def test_the_file_size_limit_is_signalled():
+    sandbox = SandboxExecutor(max_file_mb=1)
+
+    output = sandbox.code_executor("bash", "exec head -c 2000000 /dev/zero > big.bin")
+
+    assert output.endswith("[killed by the file size limit]")
+
+
+def test_the_wall_clock_timeout():
+    sandbox = SandboxExecutor(timeout=0.5)
+
+    sandbox.code_executor("bash", "sleep 10")
+
+    assert sandbox.runs[-1].timed_out
+    assert sandbox.stats()["timed_out"] == 1
+
+
+def test_a_call_queued_past_the_queue_timeout_is_rejected(tmp_path):
+    sandbox = SandboxExecutor(max_concurrency=1, queue_timeout=0.2, scratch_root=str(tmp_path))
+    running = threading.Thread(target=sandbox.code_executor, args=("bash", "sleep 1"))
+    running.start()
+    deadline = time.monotonic() + 5
+    while not any(tmp_path.iterdir()) and time.monotonic() < deadline:  # the scratch directory of the running one
+        time.sleep(0.01)
+
+    output = sandbox.code_executor("bash", "echo never")
+    running.join()
+
+    assert output.startswith("The sandbox is busy")
+    rejected, executed = sandbox.runs
+    assert rejected.rejected and rejected.exit_code is None
+    assert rejected.wait_ms >= 200
+    assert executed.exit_code == 0
+    assert sandbox.stats()["rejected"] == 1
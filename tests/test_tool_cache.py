@@ -0,0 +1,109 @@
+import pytest
+
+from cache import ToolCache
+from cache.tool_cache import kubectl_read_only
+from type import ToolError
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "kubectl get pods -n default",
+        "kubectl -n default get pods -o wide",
+        "kubectl --context hub describe managedcluster cluster1",
+        "kubectl get pods -A | grep nginx | wc -l",
+        "kubectl logs nginx --tail=100",
+    ],
+)
+def test_the_read_only_commands(command):
+    assert kubectl_read_only({"command": command})
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "kubectl apply -f deploy.yaml",
+        "kubectl -n get delete pod nginx",  # the namespace named get
+        "kubectl get pods -w",
+        "kubectl get pods --watch=true",
+        "kubectl logs -f nginx",
+        "kubectl get pods; kubectl delete pod nginx",
+        "kubectl get pods && kubectl delete pod nginx",
+        "kubectl get pods > pods.txt",
+        "kubectl get pods | xargs kubectl delete pod",
+        "kubectl get pods $(whoami)",
+        "kubectl get 'pods",
+    ],
+)
+def test_the_commands_that_are_not_read_only(command):
+    assert not kubectl_read_only({"command": command})
+
+
+class Executor:
+    """The executor of a cluster, its calls are counted."""
+
+    def __init__(self, cluster):
+        self.cache_scope = cluster
+        self.calls = []
+
+    def kubectl_cmd(self, command: str) -> str:
+        self.calls.append(command)
+        return f"{self.cache_scope}: {command}"
+
+
+def test_a_read_is_served_by_the_cache():
+    cache, executor = ToolCache(tool_ttls={"kubectl_cmd": 30}), Executor("hub")
+    kubectl_cmd = cache.wrap("kubectl_cmd", executor.kubectl_cmd)
+
+    kubectl_cmd(command="kubectl get pods")
+    assert kubectl_cmd(command="  kubectl get pods ") == "hub: kubectl get pods"
+
+    assert executor.calls == ["kubectl get pods"]
+    assert cache.stats["memory_hits"] == 1
+
+
+def test_the_results_are_keyed_by_the_cluster(tmp_path):
+    path = str(tmp_path / "tools.db")
+    hub, spoke = Executor("hub"), Executor("spoke")
+    hub_cmd = ToolCache(tool_ttls={"kubectl_cmd": 30}, path=path).wrap("kubectl_cmd", hub.kubectl_cmd)
+    spoke_cmd = ToolCache(tool_ttls={"kubectl_cmd": 30}, path=path).wrap("kubectl_cmd", spoke.kubectl_cmd)
+
+    hub_cmd(command="kubectl get pods")
+
+    assert spoke_cmd(command="kubectl get pods") == "spoke: kubectl get pods"
+    assert hub_cmd(command="kubectl get pods") == "hub: kubectl get pods"
+    assert (hub.calls, spoke.calls) == (["kubectl get pods"], ["kubectl get pods"])
+
+
+def test_a_write_clears_the_cache():
+    cache, executor = ToolCache(tool_ttls={"kubectl_cmd": 30}), Executor("hub")
+    kubectl_cmd = cache.wrap("kubectl_cmd", executor.kubectl_cmd)
+
+    kubectl_cmd(command="kubectl get pods")
+    kubectl_cmd(command="kubectl delete pod nginx")
+    kubectl_cmd(command="kubectl delete pod nginx")
+    kubectl_cmd(command="kubectl get pods")
+
+    assert executor.calls == ["kubectl get pods", "kubectl delete pod nginx", "kubectl delete pod nginx", "kubectl get pods"]
+    assert cache.stats["invalidations"] == 2
+
+
+def test_a_failure_is_not_cached():
+    calls = []
+
+    def get_pods(namespace: str) -> str:
+        calls.append(namespace)
+        return ToolError("the cluster is unreachable")
+
+    get_pods = ToolCache(ttl=30).wrap("get_pods", get_pods)
+    get_pods(namespace="default")
+    get_pods(namespace="default")
+
+    assert calls == ["default", "default"]
+
+
+@pytest.mark.parametrize("cache, func_edit", [(ToolCache(), 0), (ToolCache(ttl=30), 1)])
+def test_the_tools_that_are_not_cacheable_are_not_wrapped(cache, func_edit):
+    executor = Executor("hub")
+
+    assert cache.wrap("kubectl_cmd", executor.kubectl_cmd, func_edit=func_edit) == executor.kubectl_cmd
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+import tracing
+from agent import Agent
+from bench.quiet_chat import QuietChat
+from bench.scripted_client import ScriptedClient, tool_call_message
+from tracing import InMemoryExporter, JsonlExporter, Tracer
+from type import ActionPermission
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemoryExporter()
+    tracer = tracing.get_tracer()
+    tracing.set_tracer(Tracer(exporter))
+    yield exporter
+    tracing.set_tracer(tracer)
+
+
+def get_pods(namespace: str) -> str:
+    """Get the pods of the namespace."""
+    return "nginx Running"
+
+
+def test_the_steps_of_a_run_are_nested_in_its_span(exporter):
+    test_agent = Agent(
+        "test",
+        "You are a kubernetes engineer.",
+        ScriptedClient([tool_call_message("get_pods", {"namespace": "default"}), "ANSWER: nginx is running"]),
+        tools=[get_pods],
+        action_permission=ActionPermission.NONE,
+        chat_console=QuietChat(),
+    )
+
+    test_agent.run("check the pods")
+
+    names = {span.span_id: span.name for span in exporter.spans}
+    assert [(span.name, names.get(span.parent_id)) for span in exporter.spans] == [
+        ("agent.think", "agent.run"),
+        ("agent.before_action", "agent.act"),
+        ("agent.observe", "agent.act"),
+        ("agent.act", "agent.run"),
+        ("agent.think", "agent.run"),
+        ("agent.act", "agent.run"),
+        ("agent.run", None),
+    ]
+    assert len({span.trace_id for span in exporter.spans}) == 1
+    assert [span.attributes["status"] for span in exporter.spans if span.name == "agent.act"] == [
+        "OBSERVATION",
+        "ANSWER",
+    ]
+
+
+def test_an_exception_marks_the_span_as_an_error(exporter):
+    with pytest.raises(RuntimeError):
+        with tracing.span("agent.observe", tool="get_nodes"):
+            raise RuntimeError("the cluster is unreachable")
+
+    (span,) = exporter.spans
+    assert span.status == "error"
+    assert span.attributes == {"tool": "get_nodes", "error": "RuntimeError: the cluster is unreachable"}
+    assert span.duration >= 0
+
+
+def test_the_disabled_tracer_records_nothing():
+    tracer = Tracer()
+
+    with tracer.span("agent.think") as span:
+        span.set_attribute("iteration", 1)
+
+    assert not tracer.enabled
+    assert isinstance(span, tracing.NoopSpan)
+
+
+def test_the_jsonl_export(tmp_path):
+    path = tmp_path / "traces" / "session.jsonl"
+    tracer = Tracer(JsonlExporter(str(path)))
+
+    with tracer.span("agent.run", agent="test"):
+        with tracer.span("agent.think", iteration=1):
+            pass
+    tracer.shutdown()
+
+    think, run = [json.loads(line) for line in path.read_text().splitlines()]
+    assert (think["name"], run["name"]) == ("agent.think", "agent.run")
+    assert think["parent_id"] == run["span_id"] and run["parent_id"] is None
+    assert think["attributes"] == {"iteration": 1}
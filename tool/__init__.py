@@ -1,13 +1,62 @@
 # tools/__init__.py
-from .online_tool import wikipedia
-from .metadata import (
-    func_metadata,
-    chat_tool,
-    tool_name,
-    build_from_template,
-)
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .online_tool import wikipedia
+    from .metadata import (
+        func_metadata,
+        chat_tool,
+        tool_name,
+        build_from_template,
+    )
+    from .code_worker import CodeWorkerPool
+    from .sandbox import SandboxExecutor
+    from .capture import (
+        run_captured,
+        CaptureResult,
+        forward_output,
+        submit_relayed,
+        relayed_result,
+    )
+    from .kubectl_executor import KubectlExecutor
+    from .kube_api import KubeApiBackend
+    from .informer import Informer
+    from .serper import google
+
+# the function shadows its submodule once any tool imports it, so it can't be lazy
 from .code_executor import code_executor
-from .kubectl_executor import KubectlExecutor
-from .serper import google
 
-__all__ = [name for name in globals() if not name.startswith("_")]
+# a tool module is imported once the tool is accessed, so `from tool import code_executor` doesn't load httpx or yaml
+_exports = {
+    "wikipedia": ".online_tool",
+    "func_metadata": ".metadata",
+    "chat_tool": ".metadata",
+    "tool_name": ".metadata",
+    "build_from_template": ".metadata",
+    "CodeWorkerPool": ".code_worker",
+    "SandboxExecutor": ".sandbox",
+    "run_captured": ".capture",
+    "CaptureResult": ".capture",
+    "forward_output": ".capture",
+    "submit_relayed": ".capture",
+    "relayed_result": ".capture",
+    "KubectlExecutor": ".kubectl_executor",
+    "KubeApiBackend": ".kube_api",
+    "Informer": ".informer",
+    "google": ".serper",
+}
+
+__all__ = ["code_executor", *_exports]
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_exports])
@@ -0,0 +1,301 @@
+import os
+import select
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+HEAD_BYTES = 16 * 1024
+TAIL_BYTES = 48 * 1024
+MAX_BYTES = 64 * 1024 * 1024  # the child is killed once it has written this much
+MAX_LINE_BYTES = 4096  # the longer live lines are cut, e.g. the minified json
+MAX_HELD_LINES = 1000  # the latest lines held for the console of a tool started before it listens
+
+# the console listening to the output lines while the tool is running, e.g. set by TerminalChat.obs
+live_output: ContextVar[Optional[Callable[[str], None]]] = ContextVar(
+    "live_output", default=None
+)
+
+
+@contextmanager
+def forward_output(listener: Callable[[str], None]):
+    """Forward the lines captured in the current context to the listener."""
+    token = live_output.set(listener)
+    try:
+        yield
+    finally:
+        live_output.reset(token)
+
+
+class OutputRelay:
+    """
+    The live_output listener of a tool running on another thread: the lines are held until the console listens, e.g.
+    a tool started together with others or while the response is streaming, then forwarded as they arrive.
+    """
+
+    def __init__(self, max_lines: int = MAX_HELD_LINES):
+        self._lock = threading.Lock()
+        self._held = deque(maxlen=max_lines)
+        self._listener: Optional[Callable[[str], None]] = None
+        self._listening = False
+
+    def __call__(self, line: str):
+        with self._lock:
+            if not self._listening:
+                self._held.append(line)
+            elif self._listener is not None:
+                self._listener(line)
+
+    def listen(self, listener: Optional[Callable[[str], None]]):
+        """Forward the held lines and the following ones to the listener, None drops them."""
+        with self._lock:
+            self._listener, self._listening = listener, True
+            if listener is not None:
+                for line in self._held:
+                    listener(line)
+            self._held.clear()
+
+
+def submit_relayed(executor: Executor, func: Callable[..., Any], *args, **kwargs) -> Future:
+    """
+    Submit the function in a copy of the current context, e.g. its tracing span, with an OutputRelay as its
+    live_output listener, so the lines it writes before the console listens aren't lost. See relayed_result.
+    """
+    context = copy_context()
+    relay = OutputRelay()
+    context.run(live_output.set, relay)
+    future = executor.submit(context.run, func, *args, **kwargs)
+    future.output_relay = relay
+    return future
+
+
+def relayed_result(future: Future) -> Any:
+    """Wait for the result of the future submitted by submit_relayed, its lines go to the current listener."""
+    future.output_relay.listen(live_output.get())
+    return future.result()
+
+
+class HeadTailBuffer:
+    """Keep the first head_bytes and the last tail_bytes of a stream, and count the bytes dropped in between."""
+
+    def __init__(self, head_bytes: int = HEAD_BYTES, tail_bytes: int = TAIL_BYTES):
+        self._head_bytes = head_bytes
+        self._tail_bytes = tail_bytes
+        self._head = bytearray()
+        self._tail = bytearray()
+        self.total_bytes = 0
+
+    def write(self, data: bytes):
+        self.total_bytes += len(data)
+        if len(self._head) < self._head_bytes:
+            room = self._head_bytes - len(self._head)
+            self._head += data[:room]
+            data = data[room:]
+        if data:
+            self._tail += data
+            # trim in batches, so the ring is copied once per tail_bytes written instead of on every chunk
+            if len(self._tail) > 2 * self._tail_bytes:
+                del self._tail[: -self._tail_bytes]
+
+    def skip(self, count: int):
+        """Count the bytes dropped without reading them, e.g. the middle of a file."""
+        self.total_bytes += count
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_bytes > self._head_bytes + self._tail_bytes
+
+    def text(self) -> str:
+        if not self.truncated:
+            return (bytes(self._head) + bytes(self._tail)).decode(errors="replace")
+        tail = bytes(self._tail[-self._tail_bytes :])
+        omitted = self.total_bytes - len(self._head) - len(tail)
+        return (
+            bytes(self._head).decode(errors="replace")
+            + f"\n... [{omitted} bytes truncated] ...\n"
+            + tail.decode(errors="replace")
+        )
+
+
+@dataclass
+class CaptureResult:
+    stdout: str
+    stderr: str
+    exit_code: Optional[int]  # None if the child was killed
+    total_bytes: int  # the bytes written by the child, including the truncated ones
+    truncated: bool = False
+    timed_out: bool = False
+    exceeded_bytes: bool = False
+
+    def notes(self) -> str:
+        """The reason the output is incomplete, empty if it's complete."""
+        if self.timed_out:
+            return f"[killed after the time limit, {self.total_bytes} bytes seen]"
+        if self.exceeded_bytes:
+            return f"[killed after writing {self.total_bytes} bytes]"
+        if self.truncated:
+            return f"[{self.total_bytes} bytes seen, the middle is truncated]"
+        return ""
+
+
+def read_head_tail(file, head_bytes: int = HEAD_BYTES, tail_bytes: int = TAIL_BYTES) -> str:
+    """Read the head and the tail of the seekable binary file like the HeadTailBuffer, the middle isn't read."""
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(0)
+    buffer = HeadTailBuffer(head_bytes, tail_bytes)
+    if size <= head_bytes + tail_bytes:
+        buffer.write(file.read())
+    else:
+        buffer.write(file.read(head_bytes))
+        buffer.skip(size - head_bytes - tail_bytes)
+        file.seek(size - tail_bytes)
+        buffer.write(file.read(tail_bytes))
+    return buffer.text()
+
+
+class _LineSplitter:
+    def __init__(self, listener):
+        self._listener = listener
+        self._partial = b""
+
+    def write(self, data: bytes):
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()[-MAX_LINE_BYTES:]
+        for line in lines:
+            self._emit(line)
+
+    def close(self):
+        if self._partial:
+            self._emit(self._partial)
+            self._partial = b""
+
+    def _emit(self, line: bytes):
+        try:
+            self._listener(line[:MAX_LINE_BYTES].decode(errors="replace").rstrip("\r"))
+        except Exception:
+            pass  # a broken console never stops the capture
+
+
+def run_captured(
+    args,
+    shell: bool = False,
+    input: str | bytes = None,
+    timeout: float = None,
+    merge_stderr: bool = False,
+    max_bytes: int = MAX_BYTES,
+    head_bytes: int = HEAD_BYTES,
+    tail_bytes: int = TAIL_BYTES,
+    cwd: str = None,
+    env: Dict[str, str] = None,
+) -> CaptureResult:
+    """
+    Run the command and read its output incrementally into bounded head+tail buffers, instead of holding the whole
+    output in memory. The child and its subprocesses are killed once the timeout passes or the output exceeds
+    max_bytes. The lines are forwarded to the live_output listener of the calling context as they arrive.
+
+    Args:
+        args: The command, a string if shell is True.
+        input (str | bytes): The data written to the stdin of the command.
+        timeout (float): The seconds the command may run, None for no limit.
+        merge_stderr (bool): Capture the stderr into the stdout, in the order they're written.
+        max_bytes (int): The total output after which the command is killed.
+        head_bytes (int): The bytes kept from the start of each stream.
+        tail_bytes (int): The bytes kept from the end of each stream.
+    """
+    process = subprocess.Popen(
+        args,
+        shell=shell,
+        stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
+        cwd=cwd,
+        env=env,
+        start_new_session=True,
+    )
+    if input is not None:
+        threading.Thread(
+            target=_write_input, args=(process, input), daemon=True
+        ).start()
+
+    listener = live_output.get()
+    buffers = {process.stdout.fileno(): HeadTailBuffer(head_bytes, tail_bytes)}
+    if not merge_stderr:
+        buffers[process.stderr.fileno()] = HeadTailBuffer(head_bytes, tail_bytes)
+    splitters = {fd: _LineSplitter(listener) for fd in buffers} if listener else {}
+
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    open_fds: List[int] = list(buffers)
+    total_bytes = 0
+    timed_out = exceeded_bytes = False
+    while open_fds:
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            timed_out = True
+            break
+        readable, _, _ = select.select(open_fds, [], [], remaining)
+        for fd in readable:
+            data = os.read(fd, 65536)
+            if not data:
+                open_fds.remove(fd)
+                continue
+            buffers[fd].write(data)
+            if fd in splitters:
+                splitters[fd].write(data)
+            total_bytes += len(data)
+        if total_bytes > max_bytes:
+            exceeded_bytes = True
+            break
+
+    if not (timed_out or exceeded_bytes):
+        # the output is closed, but the command may still run, e.g. with its stdout redirected
+        try:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            process.wait(timeout=remaining)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+    if timed_out or exceeded_bytes:
+        _kill(process)
+    for splitter in splitters.values():
+        splitter.close()
+    exit_code = process.wait()
+    result = _result(buffers, exit_code, total_bytes, timed_out, exceeded_bytes)
+    for stream in (process.stdout, process.stderr):
+        if stream is not None:
+            stream.close()
+    return result
+
+
+def _result(buffers, exit_code, total_bytes, timed_out, exceeded_bytes):
+    stdout_buffer, *rest = buffers.values()
+    stderr_buffer = rest[0] if rest else None
+    return CaptureResult(
+        stdout=stdout_buffer.text(),
+        stderr=stderr_buffer.text() if stderr_buffer is not None else "",
+        exit_code=None if (timed_out or exceeded_bytes) else exit_code,
+        total_bytes=total_bytes,
+        truncated=any(buffer.truncated for buffer in buffers.values()),
+        timed_out=timed_out,
+        exceeded_bytes=exceeded_bytes,
+    )
+
+
+def _write_input(process: subprocess.Popen, input: str | bytes):
+    try:
+        process.stdin.write(input.encode() if isinstance(input, str) else input)
+        process.stdin.close()
+    except (BrokenPipeError, OSError):
+        pass  # the command exited without reading the whole input
+
+
+def _kill(process: subprocess.Popen):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
@@ -1,5 +1,9 @@
-import subprocess
 import traceback
+from typing import List
+
+from .capture import CaptureResult, run_captured
+
+CODE_TIMEOUT = 300  # the seconds a call may run before its process group is killed
 
 
 def code_executor(language, code):
@@ -28,48 +32,49 @@ def code_executor(language, code):
         print(execute_code('nodejs', js_code))
     """
     try:
-        if language == "python" or language == "python3":
-            # version_process = subprocess.run(
-            #     ["python3", "--version"], text=True, capture_output=True
-            # )
-            # print("Python version:", version_process.stdout.strip())
-            # backend_code = "import matplotlib; print(matplotlib.get_backend())"
-            # backend_process = subprocess.run(
-            #     ["python3", "-c", backend_code], text=True, capture_output=True
-            # )
-            # print("Matplotlib backend:", backend_process.stdout.strip())
-            # Execute Python code
-            process = subprocess.run(
-                ["python3", "-c", code], text=True, capture_output=True
-            )
-        elif language == "bash":
-            process = subprocess.run(
-                ["bash", "-c", code],
-                capture_output=True,
-                text=True,
-                # stdout=subprocess.PIPE,
-            )
-        elif language == "nodejs":
-            process = subprocess.run(
-                ["node", "-e", code],
-                # capture_output=True,
-                text=True,
-                # stdout=subprocess.PIPE,
-            )
-        else:
+        argv = language_command(language, code)
+        if argv is None:
             return "Unsupported language. Please specify 'python', 'bash', or 'nodejs'."
 
-        # Capture output
-        output = process.stdout
-        error = process.stderr
-
-        # Check for exit code and return both stdout and stderr for debugging
-        if not output and not error:
-            return "Execution completed with no output."
-        return output.strip() if output else f"{error.strip()}"
+        # the output is read incrementally and bounded, a runaway loop can't fill the memory or the context
+        return format_result(run_captured(argv, timeout=CODE_TIMEOUT))
 
     except Exception as e:
         # Print the full traceback for debugging
         print("An exception occurred:")
         traceback.print_exc()  # Print the full traceback
         return f"An exception occurred: {str(e)}"
+
+
+def language_command(language, code) -> List[str] | None:
+    """The command running the code in a fresh process, None if the language isn't supported."""
+    if language == "python" or language == "python3":
+        # version_process = subprocess.run(
+        #     ["python3", "--version"], text=True, capture_output=True
+        # )
+        # print("Python version:", version_process.stdout.strip())
+        # backend_code = "import matplotlib; print(matplotlib.get_backend())"
+        # backend_process = subprocess.run(
+        #     ["python3", "-c", backend_code], text=True, capture_output=True
+        # )
+        # print("Matplotlib backend:", backend_process.stdout.strip())
+        # Execute Python code
+        return ["python3", "-c", code]
+    if language == "bash":
+        return ["bash", "-c", code]
+    if language == "nodejs":
+        return ["node", "-e", code]
+    return None
+
+
+def format_output(output, error) -> str:
+    # Check for exit code and return both stdout and stderr for debugging
+    if not output and not error:
+        return "Execution completed with no output."
+    return output.strip() if output else f"{error.strip()}"
+
+
+def format_result(result: CaptureResult) -> str:
+    output = format_output(result.stdout, result.stderr)
+    notes = result.notes()
+    return f"{output}\n{notes}" if notes else output
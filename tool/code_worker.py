@@ -0,0 +1,258 @@
+import json
+import os
+import secrets
+import select
+import shlex
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Dict, Tuple
+
+from .capture import HEAD_BYTES, TAIL_BYTES, read_head_tail
+from .code_executor import code_executor, format_output
+
+PYTHON_WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "python_worker.py")
+
+
+class WorkerError(Exception):
+    pass
+
+
+class _Worker:
+    def __init__(self, argv, cwd=None):
+        self._process = subprocess.Popen(
+            argv,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=cwd,
+            start_new_session=True,  # the timeout kills the code's subprocesses along with the worker
+        )
+        self._buffer = b""
+
+    @property
+    def pid(self) -> int:
+        return self._process.pid
+
+    def alive(self) -> bool:
+        return self._process.poll() is None
+
+    def rss(self) -> int:
+        """The resident memory of the worker in bytes, 0 if it's unknown on this platform."""
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return 0
+
+    def kill(self):
+        if self.alive():
+            try:
+                os.killpg(self._process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self._process.wait()
+
+    def _send(self, data: str):
+        try:
+            self._process.stdin.write(data.encode())
+            self._process.stdin.flush()
+        except BrokenPipeError:
+            raise WorkerError()
+
+    def _readline(self, deadline: float) -> str:
+        fd = self._process.stdout.fileno()
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError()
+            readable, _, _ = select.select([fd], [], [], remaining)
+            if not readable:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise WorkerError()
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line.decode(errors="replace")
+
+
+class PythonWorker(_Worker):
+    def __init__(self, python="python3", cwd=None, head_bytes=HEAD_BYTES, tail_bytes=TAIL_BYTES):
+        super().__init__([python, "-u", PYTHON_WORKER], cwd=cwd)
+        self._bounds = {"head_bytes": head_bytes, "tail_bytes": tail_bytes}
+
+    def run(self, code: str, timeout: float) -> Tuple[str, str, int]:
+        # the worker replies with the head and tail of the outputs, so the reply line stays bounded
+        self._send(json.dumps({"code": code, **self._bounds}) + "\n")
+        response = json.loads(self._readline(time.monotonic() + timeout))
+        return response["stdout"], response["stderr"], response["status"]
+
+
+class BashWorker(_Worker):
+    def __init__(self, cwd=None, head_bytes=HEAD_BYTES, tail_bytes=TAIL_BYTES):
+        super().__init__(["bash", "--noprofile", "--norc"], cwd=cwd)
+        self._head_bytes = head_bytes
+        self._tail_bytes = tail_bytes
+        self._capture_dir = tempfile.mkdtemp(prefix="bash-worker-")
+        self._stdout = os.path.join(self._capture_dir, "stdout")
+        self._stderr = os.path.join(self._capture_dir, "stderr")
+        self._code = os.path.join(self._capture_dir, "code.sh")
+
+    def run(self, code: str, timeout: float) -> Tuple[str, str, int]:
+        # the code is sourced by the shell itself, so the variables and cwd persist, and the random token marks the
+        # end of the response
+        with open(self._code, "w") as f:
+            f.write(code)
+        token = secrets.token_hex(8)
+        self._send(
+            f"source {shlex.quote(self._code)} >{shlex.quote(self._stdout)} "
+            f"2>{shlex.quote(self._stderr)} </dev/null\n"
+            f"printf '%s %d\\n' {token} $?\n"
+        )
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                line = self._readline(deadline)
+                if line.startswith(token):
+                    status = int(line.split()[1])
+                    break
+        except WorkerError:
+            # e.g. the code called exit, the output written before is still worth returning
+            status = None
+        stdout, stderr = self._read_captures()
+        if status is None:
+            raise WorkerError((stdout or stderr).strip())
+        return stdout, stderr, status
+
+    def _read_captures(self) -> Tuple[str, str]:
+        outputs = []
+        for path in (self._stdout, self._stderr):
+            try:
+                with open(path, "rb") as f:
+                    outputs.append(read_head_tail(f, self._head_bytes, self._tail_bytes))
+            except OSError:
+                outputs.append("")
+        return outputs[0], outputs[1]
+
+    def kill(self):
+        super().kill()
+        shutil.rmtree(self._capture_dir, ignore_errors=True)
+
+
+class CodeWorkerPool:
+    """
+    Run the code in the long-lived python and bash workers of the session instead of a fresh interpreter per call, so
+    the imports, variables and cwd of one step are there for the next. A worker is restarted, losing its state, when
+    the code times out, when it crashes, or when its memory exceeds the limit. The nodejs code still runs in a fresh
+    process.
+
+    Example:
+        workers = CodeWorkerPool(timeout=60)
+        agent = Agent(..., tools=[workers.code_executor])
+        ...
+        workers.close()
+    """
+
+    def __init__(
+        self,
+        timeout: float = 120,
+        max_memory_mb: int = 2048,
+        cwd: str = None,
+        python: str = "python3",
+        head_bytes: int = HEAD_BYTES,
+        tail_bytes: int = TAIL_BYTES,
+    ):
+        """
+        Args:
+            timeout (float): The seconds each call may run before its worker is killed.
+            max_memory_mb (int): The resident memory of a worker above which it's restarted after the call.
+            cwd (str): The initial working directory of the workers.
+            python (str): The python interpreter of the python worker.
+            head_bytes (int): The bytes kept from the start of each output, like the run_captured.
+            tail_bytes (int): The bytes kept from the end of each output.
+        """
+        self._timeout = timeout
+        self._max_memory = max_memory_mb * 1024 * 1024
+        self._cwd = cwd
+        self._python = python
+        self._head_bytes = head_bytes
+        self._tail_bytes = tail_bytes
+        self._workers: Dict[str, _Worker] = {}
+        self._locks = {"python": threading.Lock(), "bash": threading.Lock()}
+
+    def code_executor(self, language: str, code: str) -> str:
+        """
+        The code_executor executes code or bash command based on the specified programming language: 'python', 'bash', 'nodejs'.
+        The python and bash sessions are persistent: the variables, imports and working directory of a call are kept for the next calls.
+
+        Args:
+            language (str): The programming language in which the code is written ('python', 'bash', 'nodejs').
+            code (str): The actual code to be executed as a string. Like shell command(kubectl, oc, ...), python code, and nodejs code.
+
+        Returns:
+            str: The result of the code execution or an error message.
+        """
+        if language == "python3":
+            language = "python"
+        if language not in self._locks:
+            return code_executor(language, code)
+
+        with self._locks[language]:
+            worker = self._worker(language)
+            try:
+                stdout, stderr, _ = worker.run(code, self._timeout)
+            except TimeoutError:
+                self._restart(language)
+                return f"Execution timed out after {self._timeout}s, the {language} session was restarted and its state is lost."
+            except WorkerError as e:
+                self._restart(language)
+                output = f"{e}\n" if f"{e}" else ""  # the output written before the worker exited
+                return f"{output}The {language} session exited, it was restarted and its state is lost."
+
+            output = format_output(stdout, stderr)
+            rss = worker.rss()
+            if rss > self._max_memory:
+                self._restart(language)
+                output += f"\nThe {language} session used {rss // (1024 * 1024)}MB, it was restarted and its state is lost."
+            return output
+
+    def restart(self, language: str = None):
+        """Restart the worker of the language, or all the workers, dropping their state."""
+        for name in [language] if language else list(self._locks):
+            with self._locks[name]:
+                self._restart(name)
+
+    def close(self):
+        self.restart()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _worker(self, language: str) -> _Worker:
+        worker = self._workers.get(language)
+        if worker is None or not worker.alive():
+            if worker is not None:
+                worker.kill()
+            bounds = {"head_bytes": self._head_bytes, "tail_bytes": self._tail_bytes}
+            if language == "python":
+                worker = PythonWorker(self._python, cwd=self._cwd, **bounds)
+            else:
+                worker = BashWorker(cwd=self._cwd, **bounds)
+            self._workers[language] = worker
+        return worker
+
+    def _restart(self, language: str):
+        # the worker is started again on its next call
+        worker = self._workers.pop(language, None)
+        if worker is not None:
+            worker.kill()
@@ -0,0 +1,279 @@
+import json
+import re
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# the watched objects are tables, so the cached rows print like `kubectl get`, and their objects like `-o yaml`
+TABLE_ACCEPT = "application/json;as=Table;v=v1;g=meta.k8s.io, application/json"
+WATCH_TIMEOUT = 300  # the seconds the server keeps a watch open, it's renewed from the last resource version
+MAX_BACKOFF = 30
+# the statuses the server keeps refusing, e.g. the RBAC forbids the list or the type is gone, the informer stops
+REFUSED_STATUSES = (401, 403, 404)
+
+# the equality selectors served from the label index, the set based ones go to the server
+SELECTOR_PATTERN = re.compile(r"^\s*(!?)([\w./-]+)\s*(?:(==|=|!=)\s*([\w.-]*))?\s*$")
+
+Key = Tuple[str, str]  # the namespace and the name
+
+
+class _Expired(Exception):
+    """The resource version of the watch is too old, the informer lists again."""
+
+
+class _Refused(Exception):
+    """The server refuses the list or the watch, the informer stops and the gets go to the server."""
+
+
+class Informer:
+    """
+    List and watch a resource across the namespaces of a cluster, and keep its objects in memory, indexed by the
+    namespace and the labels. The store is replaced on each list, and updated by the watch events in between. While
+    the watch is reconnecting the store is stale, and once it's been for max_staleness seconds, rows returns None so
+    the query goes to the server. When the server refuses the list or the watch, e.g. 403, the informer stops for
+    good, and rows always returns None.
+    """
+
+    def __init__(self, cluster, resource, max_staleness: float = 30):
+        """
+        Args:
+            cluster: The kube_api cluster of the requests.
+            resource: The ApiResource of the kind to watch.
+            max_staleness (float): The seconds the store is served after its watch broke.
+        """
+        self._cluster = cluster
+        self._resource = resource
+        self._max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._rows: Dict[Key, Dict[str, Any]] = {}
+        self._by_namespace: Dict[str, Set[Key]] = {}
+        self._by_label: Dict[Tuple[str, str], Set[Key]] = {}
+        self.columns: List[Dict[str, Any]] = []
+        self.synced = False
+        self.connected = False
+        self.refused: Optional[str] = None  # why the server refused the list or the watch
+        self.changed_at: Optional[float] = None  # the last list or event
+        self._disconnected_at: Optional[float] = None  # the store is fresh as of then, e.g. the last list
+        self._stop = threading.Event()
+        self._response = None
+        self._thread = threading.Thread(
+            target=self._run, name=f"informer-{resource.name}", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        sock = getattr(getattr(self._response, "connection", None), "sock", None)
+        if sock is not None:
+            # unblock the read of the watch, closing the response would wait for the read to return
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def fresh(self) -> bool:
+        if not self.synced:
+            return False
+        if self.connected:
+            return True
+        return time.monotonic() - self._disconnected_at < self._max_staleness
+
+    def freshness(self) -> str:
+        """The freshness stamp of the cached output."""
+        since = time.monotonic() - self.changed_at
+        if self.connected:
+            return f"[from the watch cache, last change {since:.0f}s ago]"
+        return f"[from the watch cache, reconnecting for {time.monotonic() - self._disconnected_at:.0f}s]"
+
+    def rows(self, namespace: str = None, name: str = None, selector: str = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        The table rows matching the query, each with its object, or None when the store can't answer it, e.g. it's
+        stale or the selector is set based.
+        """
+        requirements = parse_selector(selector) if selector else []
+        if requirements is None or not self.fresh():
+            return None
+        with self._lock:
+            if name is not None:
+                row = self._rows.get((namespace or "", name))
+                keys = [(namespace or "", name)] if row is not None else []
+            else:
+                keys = self._by_namespace.get(namespace, set()) if namespace else set(self._rows)
+                for key, operator, value in requirements:
+                    if operator == "=":
+                        keys = keys & self._by_label.get((key, value), set())
+                keys = sorted(keys)
+            rows = [self._rows[key] for key in keys]
+        return [row for row in rows if match_labels(_labels(row), requirements)]
+
+    def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                resource_version = self._list()
+                backoff = 1
+                while not self._stop.is_set():
+                    resource_version = self._watch(resource_version)
+            except _Expired:
+                continue
+            except _Refused as e:
+                self.refused = str(e)
+                self.synced = False
+                self._disconnect()
+                break
+            except Exception:
+                if self._stop.is_set():
+                    break
+                self._disconnect()
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def _list(self) -> str:
+        response = self._cluster.request(
+            "GET",
+            self._resource.path(),
+            WATCH_TIMEOUT,
+            query=[("includeObject", "Object")],
+            headers={"Accept": TABLE_ACCEPT},
+        )
+        if response.status in REFUSED_STATUSES:
+            raise _Refused(f"list {self._resource.name}: {response.status}")
+        if response.status != 200:
+            raise RuntimeError(f"list {self._resource.name}: {response.status}")
+        table = json.loads(response.data)
+        with self._lock:
+            self._rows.clear()
+            self._by_namespace.clear()
+            self._by_label.clear()
+            self.columns = table.get("columnDefinitions") or self.columns
+            for row in table.get("rows") or []:
+                self._upsert(row)
+            self.synced = True
+            self.changed_at = self._disconnected_at = time.monotonic()
+        return table.get("metadata", {}).get("resourceVersion", "")
+
+    def _watch(self, resource_version: str) -> str:
+        response = self._cluster.request(
+            "GET",
+            self._resource.path(),
+            (10, WATCH_TIMEOUT + 30),  # the connect and read timeouts, the server closes the watch first
+            query=[
+                ("watch", "true"),
+                ("resourceVersion", resource_version),
+                ("allowWatchBookmarks", "true"),
+                ("timeoutSeconds", WATCH_TIMEOUT),
+                ("includeObject", "Object"),
+            ],
+            headers={"Accept": TABLE_ACCEPT},
+            stream=True,
+        )
+        if response.status != 200:
+            response.release_conn()
+            if response.status == 410:
+                raise _Expired()
+            if response.status in REFUSED_STATUSES:
+                raise _Refused(f"watch {self._resource.name}: {response.status}")
+            raise RuntimeError(f"watch {self._resource.name}: {response.status}")
+        self._response = response
+        self.connected = True
+        try:
+            partial = b""
+            for chunk in response.stream(65536):
+                lines = (partial + chunk).split(b"\n")
+                partial = lines.pop()
+                for line in lines:
+                    if line.strip():
+                        resource_version = self._apply(json.loads(line)) or resource_version
+        finally:
+            self._response = None
+            response.release_conn()
+        return resource_version
+
+    def _apply(self, event: Dict[str, Any]) -> Optional[str]:
+        """Apply the watch event to the store, and return its resource version."""
+        event_type, table = event.get("type"), event.get("object", {})
+        if event_type == "ERROR":
+            if table.get("code") == 410:
+                raise _Expired()
+            if table.get("code") in REFUSED_STATUSES:
+                raise _Refused(table.get("message"))
+            raise RuntimeError(table.get("message"))
+        rows = table.get("rows") or []
+        with self._lock:
+            if table.get("columnDefinitions"):
+                self.columns = table["columnDefinitions"]
+            for row in rows:
+                if event_type == "DELETED":
+                    self._remove(_key(row))
+                elif event_type in ("ADDED", "MODIFIED"):
+                    self._upsert(row)
+            self.changed_at = time.monotonic()
+        metadata = rows[-1].get("object", {}).get("metadata", {}) if rows else table.get("metadata", {})
+        return metadata.get("resourceVersion")
+
+    def _upsert(self, row: Dict[str, Any]):
+        key = _key(row)
+        self._remove(key)
+        self._rows[key] = row
+        self._by_namespace.setdefault(key[0], set()).add(key)
+        for label in _labels(row).items():
+            self._by_label.setdefault(label, set()).add(key)
+
+    def _remove(self, key: Key):
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        self._by_namespace.get(key[0], set()).discard(key)
+        for label in _labels(row).items():
+            self._by_label.get(label, set()).discard(key)
+
+    def _disconnect(self):
+        if self.connected:
+            self._disconnected_at = time.monotonic()
+        self.connected = False
+
+
+def parse_selector(selector: str) -> Optional[List[Tuple[str, str, Optional[str]]]]:
+    """
+    Parse the equality based label selector, e.g. app=web,tier!=db,!canary, into (key, operator, value) requirements
+    with the operators =, !=, exists and !exists. None for the set based selectors, e.g. env in (prod).
+    """
+    requirements = []
+    for part in selector.split(","):
+        match = SELECTOR_PATTERN.match(part)
+        if match is None:
+            return None
+        negated, key, operator, value = match.groups()
+        if operator is None:
+            requirements.append((key, "!exists" if negated else "exists", None))
+        elif negated:
+            return None
+        else:
+            requirements.append((key, "!=" if operator == "!=" else "=", value))
+    return requirements
+
+
+def match_labels(labels: Dict[str, str], requirements) -> bool:
+    """Whether the labels meet all the requirements of parse_selector."""
+    for key, operator, value in requirements:
+        if operator == "=" and labels.get(key) != value:
+            return False
+        if operator == "!=" and labels.get(key) == value:
+            return False
+        if operator == "exists" and key not in labels:
+            return False
+        if operator == "!exists" and key in labels:
+            return False
+    return True
+
+
+def _key(row: Dict[str, Any]) -> Key:
+    metadata = row.get("object", {}).get("metadata", {})
+    return metadata.get("namespace", ""), metadata.get("name", "")
+
+
+def _labels(row: Dict[str, Any]) -> Dict[str, str]:
+    return row.get("object", {}).get("metadata", {}).get("labels") or {}
@@ -0,0 +1,631 @@
+import json
+import re
+import shlex
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+from kubernetes import client, config
+from kubernetes.client.exceptions import ApiException
+from urllib3.exceptions import HTTPError
+
+from .capture import HeadTailBuffer
+from .informer import TABLE_ACCEPT, Informer
+
+PATCH_CONTENT_TYPES = {
+    "strategic": "application/strategic-merge-patch+json",
+    "merge": "application/merge-patch+json",
+    "json": "application/json-patch+json",
+}
+DISCOVERY_TTL = 600  # the seconds the resources of a cluster are cached, a miss refreshes them sooner
+DISCOVERY_MIN_AGE = 30  # the resources aren't refreshed on a miss more often than this
+
+# the shell features the in-process backend can't honor, e.g. pipes, redirects and substitutions
+SHELL_PATTERN = re.compile(r"[|;&<>`$\n]")
+
+# the flags of each verb served in-process, by the flag, their name and whether they take a value. The other flags,
+# e.g. the -f (follow) of logs or the -w of get, and the other verbs, e.g. apply and describe, go to the binary
+_COMMON_FLAGS = {
+    "-n": ("namespace", True),
+    "--namespace": ("namespace", True),
+    "--kubeconfig": ("kubeconfig", True),
+    "--context": ("context", True),
+}
+_VERB_FLAGS = {
+    "get": {
+        **_COMMON_FLAGS,
+        "-o": ("output", True),
+        "--output": ("output", True),
+        "-l": ("selector", True),
+        "--selector": ("selector", True),
+        "--field-selector": ("field_selector", True),
+        "-A": ("all_namespaces", False),
+        "--all-namespaces": ("all_namespaces", False),
+    },
+    "logs": {
+        **_COMMON_FLAGS,
+        "-c": ("container", True),
+        "--container": ("container", True),
+        "--tail": ("tail", True),
+        "--since": ("since", True),
+        "-p": ("previous", False),
+        "--previous": ("previous", False),
+        "--timestamps": ("timestamps", False),
+    },
+    "patch": {
+        **_COMMON_FLAGS,
+        "--type": ("patch_type", True),
+        "-p": ("patch", True),
+        "--patch": ("patch", True),
+    },
+}
+VERBS = tuple(_VERB_FLAGS)
+
+
+class UnsupportedCommand(Exception):
+    """The command is run by the kubectl binary instead."""
+
+
+@dataclass
+class ApiResource:
+    group: str
+    version: str
+    name: str  # the plural, e.g. deployments
+    kind: str
+    namespaced: bool
+    singular: str = ""
+    short_names: List[str] = field(default_factory=list)
+
+    @property
+    def type_name(self) -> str:
+        """The type printed by kubectl, e.g. pod or deployment.apps."""
+        return f"{self.kind.lower()}.{self.group}" if self.group else self.kind.lower()
+
+    def path(self, namespace: str = None, name: str = None, version: str = None) -> str:
+        version = version or self.version
+        path = f"/apis/{self.group}/{version}" if self.group else f"/api/{version}"
+        if self.namespaced and namespace:
+            path += f"/namespaces/{namespace}"
+        path += f"/{self.name}"
+        return f"{path}/{name}" if name else path
+
+
+class _ErrorResponse:
+    """The error status raised by the earlier clients, read like the raw response."""
+
+    def __init__(self, status: int, data: bytes):
+        self.status = status
+        self.data = data if isinstance(data, bytes) else (data or "").encode()
+
+    def stream(self, amount: int):
+        yield self.data
+
+    def release_conn(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Cluster:
+    """The pooled ApiClient of a kubeconfig context, with its cached discovery of the resources."""
+
+    def __init__(self, kubeconfig: str, context: str, pool_size: int):
+        configuration = client.Configuration()
+        config.load_kube_config(
+            config_file=kubeconfig,
+            context=context,
+            client_configuration=configuration,
+            persist_config=False,
+        )
+        configuration.connection_pool_maxsize = pool_size
+        self.api_client = client.ApiClient(configuration)
+        self.namespace = _context_namespace(kubeconfig, context)
+        self._resources: List[ApiResource] = []
+        self._discovered_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self.informers: Dict[Tuple[str, str], Informer] = {}  # by the group and the name of the resource
+        self.watched: Optional[List[ApiResource]] = None
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        timeout: float,
+        query: List[Tuple[str, Any]] = None,
+        headers: Dict[str, str] = None,
+        body: Any = None,
+        stream: bool = False,
+    ):
+        # the raw response, so an error status is returned instead of raised
+        header_params = {"Accept": "application/json", **(headers or {})}
+        if hasattr(self.api_client, "param_serialize"):
+            # the client generated since kubernetes 37 serializes the request apart, and never preloads the response
+            method, url, header_params, body, post_params = self.api_client.param_serialize(
+                method,
+                path,
+                query_params=query or [],
+                header_params=header_params,
+                body=body,
+                auth_settings=["BearerToken"],
+            )
+            response = self.api_client.call_api(
+                method, url, header_params=header_params, body=body, post_params=post_params, _request_timeout=timeout
+            ).response
+        else:
+            try:
+                response = self.api_client.call_api(
+                    path,
+                    method,
+                    query_params=query or [],
+                    header_params=header_params,
+                    body=body,
+                    auth_settings=["BearerToken"],
+                    _return_http_data_only=True,
+                    _preload_content=False,
+                    _request_timeout=timeout,
+                )
+            except ApiException as e:
+                # the earlier clients raise the error status even when the response isn't preloaded
+                if not e.status:
+                    raise HTTPError(e.reason)
+                return _ErrorResponse(e.status, e.body)
+        if not stream:
+            response.data  # read the body, so the connection goes back to the pool
+            response.release_conn()
+        return response
+
+    def resource(self, type_name: str, timeout: float) -> Optional[ApiResource]:
+        """Find the resource of a type like pods, po, pod, Pod, deployments.apps or deployments.v1.apps."""
+        name, _, group = type_name.partition(".")
+        version = None
+        if group and "." in group and re.match(r"^v\d", group):
+            version, _, group = group.partition(".")
+        name = name.lower()
+        for refresh in (False, True):
+            for resource in self._discover(timeout, refresh):
+                if group and resource.group != group:
+                    continue
+                if version and resource.version != version:
+                    continue
+                if name in (resource.name, resource.singular, resource.kind.lower(), *resource.short_names):
+                    return resource
+        return None
+
+    def _discover(self, timeout: float, refresh: bool) -> List[ApiResource]:
+        with self._lock:
+            age = None if self._discovered_at is None else time.monotonic() - self._discovered_at
+            if refresh and age is not None and age < DISCOVERY_MIN_AGE:
+                return []  # the fresh resources were already searched
+            if age is None or refresh or age > DISCOVERY_TTL:
+                self._resources = self._fetch_resources(timeout)
+                self._discovered_at = time.monotonic()
+            return self._resources
+
+    def _fetch_resources(self, timeout: float) -> List[ApiResource]:
+        group_versions = [("", "v1")]
+        groups = _json(self.request("GET", "/apis", timeout))
+        for group in groups.get("groups", []):
+            group_versions.append((group["name"], group["preferredVersion"]["version"]))
+
+        resources = []
+        for group, version in group_versions:
+            path = f"/apis/{group}/{version}" if group else f"/api/{version}"
+            response = self.request("GET", path, timeout)
+            if response.status != 200:
+                continue  # e.g. an aggregated api that is down, kubectl skips it too
+            for resource in _json(response).get("resources", []):
+                if "/" in resource["name"]:
+                    continue  # the subresources, e.g. pods/log
+                resources.append(
+                    ApiResource(
+                        group=group,
+                        version=version,
+                        name=resource["name"],
+                        kind=resource["kind"],
+                        namespaced=resource["namespaced"],
+                        singular=resource.get("singularName") or resource["kind"].lower(),
+                        short_names=resource.get("shortNames", []),
+                    )
+                )
+        return resources
+
+
+class KubeApiBackend:
+    """
+    Serve the common kubectl commands (get, logs, patch) in-process through one long-lived ApiClient per kubeconfig
+    context, so a call reuses the pooled connections and the discovered resources instead of starting the binary,
+    reading the kubeconfig and running the discovery again. The output follows kubectl's. The other commands, e.g.
+    describe and apply whose output and semantics only the binary has, the other flags and the shell features raise
+    UnsupportedCommand, and are run by the binary.
+
+    The gets of the watched resource types are answered from the memory of their informers, e.g. watch=["pods",
+    "managedclusters"]. An informer lists and watches its type across the namespaces from the first get of the type on
+    the cluster, the gets are sent to the server until it's synced, and the output from the memory ends with a
+    freshness stamp.
+    """
+
+    def __init__(self, pool_size: int = 8, watch: List[str] = None, max_staleness: float = 30):
+        """
+        Args:
+            pool_size (int): The connections kept to each cluster.
+            watch (List[str]): The resource types cached by the informers, e.g. pods or managedclusters.
+            max_staleness (float): The seconds the cache of a broken watch is still served.
+        """
+        self._pool_size = pool_size
+        self._watch = watch or []
+        self._max_staleness = max_staleness
+        self._clusters: Dict[Tuple[str, str], _Cluster] = {}
+        self._lock = threading.Lock()
+
+    def run(
+        self,
+        command: str,
+        kubeconfig: str = None,
+        context: str = None,
+        input: str = None,
+        timeout: float = 10,
+    ) -> Tuple[str, int]:
+        """
+        Run the kubectl command against the API.
+
+        Returns:
+            Tuple[str, int]: The output of the command and its exit code.
+
+        Raises:
+            UnsupportedCommand: The command needs the kubectl binary.
+        """
+        if SHELL_PATTERN.search(command):
+            raise UnsupportedCommand(command)
+        try:
+            args = shlex.split(command)
+        except ValueError:
+            raise UnsupportedCommand(command)
+        if len(args) < 2 or args[0] != "kubectl":
+            raise UnsupportedCommand(command)
+
+        verb = args[1]
+        if verb not in VERBS:
+            raise UnsupportedCommand(command)
+        positional, flags = _parse_flags(verb, args[2:])
+        try:
+            cluster = self._cluster(flags.pop("kubeconfig", kubeconfig), flags.pop("context", context))
+        except config.ConfigException as e:
+            return f"error: {e}", 1
+        try:
+            return getattr(self, f"_{verb}")(cluster, positional, flags, input, timeout)
+        except (HTTPError, OSError) as e:
+            return f"Unable to connect to the server: {e}", 1
+
+    def close(self):
+        with self._lock:
+            for cluster in self._clusters.values():
+                for informer in cluster.informers.values():
+                    informer.stop()
+                cluster.api_client.close()
+            self._clusters.clear()
+
+    def _cluster(self, kubeconfig: str, context: str) -> _Cluster:
+        key = (kubeconfig, context)
+        with self._lock:
+            if key not in self._clusters:
+                self._clusters[key] = _Cluster(kubeconfig, context, self._pool_size)
+            return self._clusters[key]
+
+    def _get(self, cluster: _Cluster, positional, flags, input, timeout) -> Tuple[str, int]:
+        output = flags.get("output", "")
+        if output not in ("", "wide", "yaml", "json", "name"):
+            raise UnsupportedCommand(f"-o {output}")
+        resource, name, error = self._target(cluster, positional, timeout)
+        if error:
+            return error, 1
+        namespace = self._namespace(cluster, flags)
+        query = _list_query(flags) if name is None else []
+
+        informer = self._informer(cluster, resource, timeout)
+        if informer is not None and "field_selector" not in flags:
+            rows = informer.rows(namespace if resource.namespaced else None, name, flags.get("selector"))
+            # a missing name is asked to the server, it may be just created
+            if rows is not None and (rows or name is None):
+                output = self._format_rows(informer, resource, rows, name, namespace, output)
+                return f"{output.rstrip()}\n{informer.freshness()}", 0
+
+        if output in ("", "wide"):
+            response = cluster.request(
+                "GET",
+                resource.path(namespace, name),
+                timeout,
+                query=query,
+                headers={"Accept": TABLE_ACCEPT},
+            )
+            if response.status != 200:
+                return _error(response), 1
+            table = _json(response)
+            if not table.get("rows"):
+                return _no_resources(resource, namespace), 0
+            return _format_table(table, output == "wide", namespace is None and resource.namespaced), 0
+
+        response = cluster.request("GET", resource.path(namespace, name), timeout, query=query)
+        if response.status != 200:
+            return _error(response), 1
+        content = _json(response)
+        items = [content] if name else content.get("items", [])
+        if not items:
+            return _no_resources(resource, namespace), 0
+        return _format_items(resource, items, name, output), 0
+
+    def _format_rows(self, informer: Informer, resource: ApiResource, rows, name, namespace, output) -> str:
+        if not rows:
+            return _no_resources(resource, namespace)
+        if output in ("", "wide"):
+            table = {"columnDefinitions": informer.columns, "rows": [_refresh_age(row, informer.columns) for row in rows]}
+            return _format_table(table, output == "wide", namespace is None and resource.namespaced)
+        return _format_items(resource, [row["object"] for row in rows], name, output)
+
+    def _informer(self, cluster: _Cluster, resource: ApiResource, timeout: float) -> Optional[Informer]:
+        """The informer of the watched resource, started on its first get."""
+        if not self._watch:
+            return None
+        if cluster.watched is None:
+            # the discovery is outside of the lock, so it doesn't hold up the commands of the other clusters
+            watched = [cluster.resource(type_name, timeout) for type_name in self._watch]
+            with self._lock:
+                if cluster.watched is None:
+                    cluster.watched = watched
+        if resource not in cluster.watched:
+            return None
+        with self._lock:
+            key = (resource.group, resource.name)
+            if key not in cluster.informers:
+                cluster.informers[key] = Informer(cluster, resource, self._max_staleness)
+                cluster.informers[key].start()
+            return cluster.informers[key]
+
+    def _logs(self, cluster: _Cluster, positional, flags, input, timeout) -> Tuple[str, int]:
+        if len(positional) != 1:
+            raise UnsupportedCommand("logs of several pods")
+        kind, _, name = positional[0].rpartition("/")
+        if kind not in ("", "pod", "pods", "po"):
+            raise UnsupportedCommand(f"logs of {kind}")
+        namespace = self._namespace(cluster, flags) or cluster.namespace
+        query = []
+        if "container" in flags:
+            query.append(("container", flags["container"]))
+        if "tail" in flags and _tail_lines(flags["tail"]) >= 0:
+            query.append(("tailLines", _tail_lines(flags["tail"])))
+        if "since" in flags:
+            query.append(("sinceSeconds", _duration_seconds(flags["since"])))
+        for flag in ("previous", "timestamps"):
+            if flags.get(flag):
+                query.append((flag, "true"))
+        response = cluster.request(
+            "GET", f"/api/v1/namespaces/{namespace}/pods/{name}/log", timeout, query=query, stream=True
+        )
+        if response.status != 200:
+            error = _error(response)
+            response.release_conn()
+            return error, 1
+        # a long log keeps its head and tail, like the output of the binary
+        buffer = HeadTailBuffer()
+        for chunk in response.stream(65536):
+            buffer.write(chunk)
+        response.release_conn()
+        return buffer.text(), 0
+
+    def _patch(self, cluster: _Cluster, positional, flags, input, timeout) -> Tuple[str, int]:
+        resource, name, error = self._target(cluster, positional, timeout)
+        if error:
+            return error, 1
+        if name is None:
+            raise UnsupportedCommand("patch without a name")
+        patch_type = flags.get("patch_type", "strategic")
+        if patch_type not in PATCH_CONTENT_TYPES:
+            return f'error: --type must be one of {sorted(PATCH_CONTENT_TYPES)}, not "{patch_type}"', 1
+        patch = flags.get("patch") or input
+        if not patch:
+            return "error: must specify -p to patch", 1
+        try:
+            body = yaml.safe_load(patch)  # the json is yaml too
+        except yaml.YAMLError as e:
+            return f"error: unable to parse {patch}: {e}", 1
+        namespace = self._namespace(cluster, flags) or cluster.namespace
+        response = cluster.request(
+            "PATCH",
+            resource.path(namespace, name),
+            timeout,
+            headers={"Content-Type": PATCH_CONTENT_TYPES[patch_type]},
+            body=body,
+        )
+        if response.status != 200:
+            return _error(response), 1
+        return f"{resource.type_name}/{name} patched", 0
+
+    def _target(self, cluster: _Cluster, positional, timeout) -> Tuple[Optional[ApiResource], Optional[str], str]:
+        """The resource and the name of the positional args, e.g. `pods nginx` or `pod/nginx`."""
+        if not positional or len(positional) > 2 or "," in positional[0]:
+            raise UnsupportedCommand("several resource types")
+        type_name, name = positional[0], positional[1] if len(positional) == 2 else None
+        if "/" in type_name:
+            if name is not None:
+                raise UnsupportedCommand("several resources")
+            type_name, _, name = type_name.partition("/")
+        resource = cluster.resource(type_name, timeout)
+        if resource is None:
+            return None, None, f'error: the server doesn\'t have a resource type "{type_name}"'
+        return resource, name, ""
+
+    def _namespace(self, cluster: _Cluster, flags) -> Optional[str]:
+        # None lists across the namespaces
+        if flags.get("all_namespaces"):
+            return None
+        return flags.get("namespace") or cluster.namespace
+
+
+def _parse_flags(verb: str, args: List[str]) -> Tuple[List[str], Dict[str, Any]]:
+    verb_flags = _VERB_FLAGS[verb]
+    positional, flags = [], {}
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if not arg.startswith("-") or arg == "-":
+            positional.append(arg)
+            continue
+        flag, has_value, value = arg.partition("=")
+        if flag not in verb_flags:
+            raise UnsupportedCommand(flag)
+        name, takes_value = verb_flags[flag]
+        if not takes_value:
+            flags[name] = value.lower() != "false" if has_value else True
+            continue
+        if not has_value:
+            if not args or args[0].startswith("--"):
+                if name == "patch":
+                    continue  # the patch is the input, e.g. `kubectl patch deployment nginx -p`
+                raise UnsupportedCommand(f"{flag} without a value")
+            value = args.pop(0)
+        flags[name] = value
+    return positional, flags
+
+
+def _list_query(flags) -> List[Tuple[str, str]]:
+    query = []
+    if "selector" in flags:
+        query.append(("labelSelector", flags["selector"]))
+    if "field_selector" in flags:
+        query.append(("fieldSelector", flags["field_selector"]))
+    return query
+
+
+def _context_namespace(kubeconfig: str, context: str) -> str:
+    contexts, active = config.list_kube_config_contexts(config_file=kubeconfig)
+    for item in contexts:
+        if item["name"] == (context or active["name"]):
+            return item["context"].get("namespace") or "default"
+    return "default"
+
+
+def _json(response) -> Dict[str, Any]:
+    data = response.data
+    return json.loads(data) if data else {}
+
+
+def _error(response) -> str:
+    # kubectl's format, e.g. Error from server (NotFound): pods "nginx" not found
+    try:
+        status = _json(response)
+        return f"Error from server ({status.get('reason') or 'Unknown'}): {status.get('message', '')}"
+    except ValueError:
+        return f"Error from server: {response.status} {response.data.decode(errors='replace')}"
+
+
+def _no_resources(resource: ApiResource, namespace: Optional[str]) -> str:
+    if resource.namespaced and namespace:
+        return f"No resources found in {namespace} namespace."
+    return "No resources found"
+
+
+def _format_table(table: Dict[str, Any], wide: bool, with_namespace: bool) -> str:
+    columns = [
+        (index, column)
+        for index, column in enumerate(table["columnDefinitions"])
+        if wide or column.get("priority", 0) == 0
+    ]
+    rows = [[column["name"].upper() for _, column in columns]]
+    if with_namespace:
+        rows[0].insert(0, "NAMESPACE")
+    for row in table["rows"]:
+        cells = [_format_cell(row["cells"][index], column) for index, column in columns]
+        if with_namespace:
+            cells.insert(0, row.get("object", {}).get("metadata", {}).get("namespace", ""))
+        rows.append(cells)
+    return _align(rows)
+
+
+def _format_items(resource: ApiResource, items: List[Dict[str, Any]], name: Optional[str], output: str) -> str:
+    api_version = f"{resource.group}/{resource.version}".lstrip("/")
+    # the items of a list have no kind, and the managed fields are hidden like kubectl does
+    items = [{"apiVersion": api_version, "kind": resource.kind, **item} for item in items]
+    for item in items:
+        item["metadata"] = {key: value for key, value in item.get("metadata", {}).items() if key != "managedFields"}
+    if output == "name":
+        return "\n".join(f"{resource.type_name}/{item['metadata']['name']}" for item in items)
+    content = items[0] if name else {"apiVersion": "v1", "items": items, "kind": "List", "metadata": {"resourceVersion": ""}}
+    if output == "json":
+        return json.dumps(content, indent=4)
+    return yaml.safe_dump(content, default_flow_style=False)
+
+
+def _refresh_age(row: Dict[str, Any], columns: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # the age cell of a cached row is the one of its last event, it's counted again from the creation
+    created = row.get("object", {}).get("metadata", {}).get("creationTimestamp")
+    if created is None:
+        return row
+    cells = [
+        _human_duration(_since(created)) if column["name"] == "Age" else cell
+        for cell, column in zip(row["cells"], columns)
+    ]
+    return {**row, "cells": cells}
+
+
+def _format_cell(value, column) -> str:
+    if value is None or value == "":
+        return "<none>"
+    if column.get("format") == "date" or column.get("type") == "date":
+        return _human_duration(_since(value))
+    if isinstance(value, list):
+        return ",".join(f"{item}" for item in value)
+    return f"{value}"
+
+
+def _align(rows: List[List[str]]) -> str:
+    # the columns are padded by 3 spaces, like the tabwriter of kubectl
+    widths = [max(len(row[index]) for row in rows) for index in range(len(rows[0]))]
+    return "\n".join(
+        "   ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows
+    )
+
+
+def _since(timestamp: str) -> float:
+    created = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    return (datetime.now(timezone.utc) - created).total_seconds()
+
+
+def _human_duration(seconds: float) -> str:
+    # the age of kubectl, e.g. 45s, 7m3s, 3h12m, 5d
+    seconds = int(max(seconds, 0))
+    minutes, hours, days = seconds // 60, seconds // 3600, seconds // 86400
+    if seconds < 120:
+        return f"{seconds}s"
+    if minutes < 10:
+        return f"{minutes}m{seconds % 60}s" if seconds % 60 else f"{minutes}m"
+    if minutes < 180:
+        return f"{minutes}m"
+    if hours < 8:
+        return f"{hours}h{minutes % 60}m" if minutes % 60 else f"{hours}h"
+    if hours < 48:
+        return f"{hours}h"
+    if hours < 192:
+        return f"{days}d{hours % 24}h" if hours % 24 else f"{days}d"
+    if days < 365 * 2:
+        return f"{days}d"
+    if days < 365 * 8:
+        return f"{days // 365}y{days % 365}d" if days % 365 else f"{days // 365}y"
+    return f"{days // 365}y"
+
+
+def _tail_lines(tail: str) -> int:
+    # the --tail of kubectl logs, -1 for all the lines, the binary reports the invalid ones
+    if not re.fullmatch(r"-?\d+", tail):
+        raise UnsupportedCommand(f"--tail {tail}")
+    return int(tail)
+
+
+def _duration_seconds(duration: str) -> int:
+    # the --since of kubectl logs, e.g. 30s, 5m or 1h30m
+    parts = re.findall(r"(\d+)([hms])", duration)
+    if not parts or "".join(number + unit for number, unit in parts) != duration:
+        raise UnsupportedCommand(f"--since {duration}")
+    return sum(int(number) * {"h": 3600, "m": 60, "s": 1}[unit] for number, unit in parts)
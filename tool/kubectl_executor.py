@@ -1,9 +1,17 @@
 import re
 import os
+import hashlib
 import yaml
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from pydantic import BaseModel, Field
-import subprocess
+
+from type import ToolError
+
+from .capture import run_captured
+from .informer import match_labels, parse_selector
+
+NO_RESOURCES = "No resources found"
 
 
 class ClusterConfig(BaseModel):
@@ -17,6 +25,10 @@ class ClusterConfig(BaseModel):
     )
     context: Optional[str] = Field(None, description="Context name for the cluster")
     namespace: Optional[str] = Field(None, description="Namespace for the cluster")
+    labels: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Labels of the cluster, e.g. env: prod, to select it in kubectl_fanout",
+    )
 
     @property
     def resolved_kubeconfig(self) -> str:
@@ -51,13 +63,25 @@ class KubectlExecutor:
     --kubeconfig and --context options to kubectl commands.
     """
 
-    def __init__(self, default_kubeconfig: str = None, default_context: str = None):
+    def __init__(
+        self,
+        default_kubeconfig: str = None,
+        default_context: str = None,
+        use_api: bool = False,
+        watch: List[str] = None,
+        fanout_workers: int = 8,
+    ):
         """
         Initialize the ClusterManager.
 
         Args:
             default_kubeconfig (str): Path to the default kubeconfig file.
             default_context (str): Default context name for the default kubeconfig.
+            use_api (bool): Serve the get, logs and patch commands through a pooled API client per cluster instead
+                of the kubectl binary, the other commands still run it. It needs the kubernetes package.
+            watch (List[str]): The resource types, e.g. ["managedclusters", "pods"], whose gets are answered from an
+                in-memory cache kept in sync by a watch, it implies use_api.
+            fanout_workers (int): The clusters kubectl_fanout runs the command on at once.
         """
         self.default_kubeconfig = (
             default_kubeconfig
@@ -70,6 +94,12 @@ class KubectlExecutor:
             )
         self.default_context = default_context or None
         self._cluster_registry = {}
+        self._fanout_workers = fanout_workers
+        self._api = None
+        if use_api or watch:
+            from .kube_api import KubeApiBackend
+
+            self._api = KubeApiBackend(watch=watch)
 
     def register_cluster(self, cluster: ClusterConfig):
         """
@@ -82,7 +112,12 @@ class KubectlExecutor:
 
     @classmethod
     def from_yaml(
-        cls, yaml_path: str, default_kubeconfig: str = None, default_context: str = None
+        cls,
+        yaml_path: str,
+        default_kubeconfig: str = None,
+        default_context: str = None,
+        use_api: bool = False,
+        watch: List[str] = None,
     ):
         """
         Create a MultiKubeConfig instance from a YAML file.
@@ -91,6 +126,8 @@ class KubectlExecutor:
             yaml_path (str): Path to the YAML file containing cluster configurations.
             default_kubeconfig (str): Path to the default kubeconfig file.
             default_context (str): Default context name for the default kubeconfig.
+            use_api (bool): Serve the common commands through the API clients, see __init__.
+            watch (List[str]): The resource types cached in memory, see __init__.
 
         Returns:
             MultiKubeConfig: An instance of MultiKubeConfig initialized with the clusters from the YAML file.
@@ -106,7 +143,10 @@ class KubectlExecutor:
             raise ValueError("Invalid YAML format: 'clusters' must be a list.")
 
         instance = cls(
-            default_kubeconfig=default_kubeconfig, default_context=default_context
+            default_kubeconfig=default_kubeconfig,
+            default_context=default_context,
+            use_api=use_api,
+            watch=watch,
         )
 
         for cluster_data in clusters:
@@ -116,6 +156,7 @@ class KubectlExecutor:
                 kubeconfig=cluster_data.get("kubeconfig", None),
                 context=cluster_data.get("context", None),
                 namespace=cluster_data.get("namespace", None),
+                labels=cluster_data.get("labels") or {},
             )
             instance.register_cluster(cluster)
 
@@ -140,9 +181,8 @@ class KubectlExecutor:
         Returns:
             str: The output of the command execution.
 
-        Raises:
-          subprocess.CalledProcessError: If the command fails.
-          subprocess.TimeoutExpired: If the command exceeds the given timeout.
+        The failed or timed out command returns its output prefixed with the command, and an output over the capture
+        limits keeps its head and tail.
 
         Examples:
             1. Run a simple kubectl command:
@@ -168,6 +208,74 @@ class KubectlExecutor:
             4. Use a timeout to limit execution:
                 output = kubectl_command("cluster1", "kubectl get pods -n default", timeout=10)
         """
+        adapt_kubectl, output, ok = self._run(cluster_name, command, input, timeout)
+        return output if ok else ToolError(f"{adapt_kubectl}: \n{output}")
+
+    def kubectl_fanout(self, command: str, clusters: str = "all", timeout: float = 10) -> str:
+        """
+        Run the kubectl command on many clusters at once and merge their outputs into one table keyed by the cluster,
+        e.g. to check a resource across the fleet in one step.
+
+        Args:
+          command (str): The kubectl command to execute on each cluster (e.g., "kubectl get klusterlet").
+          clusters (str): The comma separated cluster names, a label selector of the clusters (e.g., "env=prod"), or "all".
+          timeout (int): Timeout for the command execution on each cluster in seconds.
+
+        Returns:
+            str: The table outputs merged with a CLUSTER column, followed by the other outputs and the errors of each cluster.
+        """
+        names = self._select_clusters(clusters)
+        if isinstance(names, str):
+            return ToolError(names)  # the error of the selection
+        with ThreadPoolExecutor(max_workers=min(self._fanout_workers, len(names))) as pool:
+            results = list(
+                pool.map(lambda name: self._run(name, command, None, timeout), names)
+            )
+        output = merge_outputs(
+            {name: (output, ok) for name, (_, output, ok) in zip(names, results)}
+        )
+        return output if all(ok for _, _, ok in results) else ToolError(output)
+
+    @property
+    def cache_scope(self) -> str:
+        """
+        The identity of the clusters the commands reach, the ToolCache keys the results by it. It covers the contexts
+        and the content of the kubeconfigs, so the processes on other clusters or switched contexts never share results.
+        """
+        targets = [("default", self.default_kubeconfig, self.default_context)]
+        targets += [
+            (name, cluster.kubeconfig, cluster.context)
+            for name, cluster in sorted(self._cluster_registry.items())
+        ]
+        digest = hashlib.sha256()
+        for name, kubeconfig, context in targets:
+            digest.update(f"{name}\0{kubeconfig}\0{context}\0".encode())
+            if kubeconfig and os.path.exists(kubeconfig):
+                with open(kubeconfig, "rb") as f:
+                    digest.update(f.read())
+        return digest.hexdigest()
+
+    def _select_clusters(self, clusters: str) -> List[str] | str:
+        registered = list(self._cluster_registry)
+        if clusters.strip() in ("", "all", "*"):
+            return registered or ["default"]
+        names = [name.strip() for name in clusters.split(",") if name.strip()]
+        if all(name in self._cluster_registry or name == "default" for name in names):
+            return names
+        requirements = parse_selector(clusters)
+        if requirements is None:
+            return f"Unknown clusters {clusters}, the registered clusters: {', '.join(registered)}"
+        selected = [
+            name
+            for name, cluster in self._cluster_registry.items()
+            if match_labels(cluster.labels, requirements)
+        ]
+        return selected or f"No cluster matches {clusters}, the registered clusters: {', '.join(registered)}"
+
+    def _run(
+        self, cluster_name: str, command: str, input: str, timeout: float
+    ) -> Tuple[str, str, bool]:
+        """Run the command on the cluster, and return the adapted command, its output and whether it succeeded."""
         cluster_config: ClusterConfig = self._cluster_registry.get(cluster_name, None)
         # Use cluster-specific configuration or fallback to default
         kubeconfig = (
@@ -175,19 +283,29 @@ class KubectlExecutor:
         )
         context = cluster_config.context if cluster_config else self.default_context
         adapt_kubectl = self.override_kubectl_command(command, kubeconfig, context)
-        try:
-            output = subprocess.run(
-                adapt_kubectl,
-                shell=True,
-                check=True,
-                input=input,
-                timeout=float(timeout),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-            ).stdout.decode()
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as error:
-            return f"{adapt_kubectl}: \n{error.stdout.decode()}"
-        return output
+        if self._api is not None:
+            from .kube_api import UnsupportedCommand
+
+            try:
+                output, exit_code = self._api.run(
+                    adapt_kubectl, input=input, timeout=float(timeout)
+                )
+                return adapt_kubectl, output, exit_code == 0
+            except UnsupportedCommand:
+                pass  # e.g. exec, or a pipe, the binary runs it
+
+        result = run_captured(
+            adapt_kubectl,
+            shell=True,
+            input=input,
+            timeout=float(timeout),
+            merge_stderr=True,
+        )
+        output = result.stdout
+        notes = result.notes()
+        if notes:
+            output = f"{output}\n{notes}"
+        return adapt_kubectl, output, result.exit_code == 0
 
     def list_clusters(self):
         """
@@ -250,3 +368,55 @@ class KubectlExecutor:
             kubectl_command += f" --context {context}"
 
         return kubectl_command.strip()
+
+
+def merge_outputs(outputs: Dict[str, Tuple[str, bool]]) -> str:
+    """
+    Merge the outputs of the clusters: the tables sharing a header become one table with a CLUSTER column, the other
+    outputs are listed under their cluster, and the errors and empty results are one line each.
+    """
+    tables: Dict[Tuple[str, ...], List[List[str]]] = {}
+    sections, errors, empty = [], [], []
+    for cluster, (output, ok) in outputs.items():
+        lines = [line for line in output.strip().splitlines() if line.strip()]
+        if not ok:
+            errors.append(f"{cluster}: {lines[-1] if lines else 'failed with no output'}")
+        elif not lines or lines[0].startswith(NO_RESOURCES):
+            empty.append(cluster)
+        elif _is_header(lines[0]):
+            header = tuple(_cells(lines[0]))
+            rows = tables.setdefault(header, [])
+            for line in lines[1:]:
+                # e.g. the freshness stamp of the watch cache
+                if not line.startswith("["):
+                    rows.append([cluster, *_cells(line)])
+        else:
+            body = "\n".join(f"  {line}" for line in lines)
+            sections.append(f"{cluster}:\n{body}")
+
+    parts = [_align([["CLUSTER", *header], *rows]) for header, rows in tables.items()]
+    parts += sections
+    if empty:
+        parts.append(f"{NO_RESOURCES}: {', '.join(empty)}")
+    if errors:
+        parts.append("Errors:\n" + "\n".join(f"  {error}" for error in errors))
+    return "\n\n".join(parts)
+
+
+def _is_header(line: str) -> bool:
+    # the header of a kubectl table, e.g. NAME   READY   STATUS
+    cells = _cells(line)
+    return cells[0] in ("NAME", "NAMESPACE") and all(cell.upper() == cell for cell in cells)
+
+
+def _cells(line: str) -> List[str]:
+    # the cells are padded by 3 spaces, a cell like `3 (5m ago)` has single spaces
+    return re.split(r"\s{2,}", line.strip())
+
+
+def _align(rows: List[List[str]]) -> str:
+    widths = [max(len(row[index]) if index < len(row) else 0 for row in rows) for index in range(max(map(len, rows)))]
+    return "\n".join(
+        "   ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+        for row in rows
+    )
@@ -89,7 +89,7 @@ def func_metadata(func):
     for node in tree.body:
         if isinstance(node, ast.FunctionDef):
             func_name = node.name
-            func_args = [arg.arg for arg in node.args.args]
+            func_args = [arg.arg for arg in node.args.args if arg.arg != "self"]
             func_description = ast.get_docstring(node)
             return func_name, func_args, func_description
 
@@ -0,0 +1,69 @@
+"""
+The long-lived python process behind the CodeWorkerPool. Each request is a json line {"code": ..., "head_bytes": ...,
+"tail_bytes": ...} on stdin and each response a json line {"stdout": ..., "stderr": ..., "status": ...} on stdout,
+with the head and tail bytes of each output only. The code runs in one namespace, so the variables, imports and cwd
+persist across the requests.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import traceback
+
+
+def main():
+    # keep the protocol on private descriptors, the code and its subprocesses write to the capture files instead
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    responses = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    stdout, stderr = tempfile.TemporaryFile(), tempfile.TemporaryFile()
+    os.dup2(stdout.fileno(), 1)
+    os.dup2(stderr.fileno(), 2)
+
+    namespace = {"__name__": "__main__"}
+    for line in requests:
+        request = json.loads(line)
+        code = request["code"]
+        for capture in (stdout, stderr):
+            capture.seek(0)
+            capture.truncate()
+        status = 0
+        try:
+            exec(compile(code, "<code>", "exec"), namespace)
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else int(e.code is not None)
+        except BaseException as e:
+            # skip the frame of the worker itself
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+            status = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        response = {"status": status}
+        for name, capture in (("stdout", stdout), ("stderr", stderr)):
+            response[name] = read_head_tail(capture, request["head_bytes"], request["tail_bytes"])
+        responses.write(json.dumps(response) + "\n")
+        responses.flush()
+
+
+# the script runs apart from the tool package, so it bounds the outputs like tool.capture.read_head_tail by itself
+def read_head_tail(capture, head_bytes: int, tail_bytes: int) -> str:
+    size = capture.seek(0, os.SEEK_END)
+    capture.seek(0)
+    if size <= head_bytes + tail_bytes:
+        return capture.read().decode(errors="replace")
+    head = capture.read(head_bytes)
+    capture.seek(size - tail_bytes)
+    tail = capture.read(tail_bytes)
+    omitted = size - head_bytes - tail_bytes
+    return (
+        head.decode(errors="replace")
+        + f"\n... [{omitted} bytes truncated] ...\n"
+        + tail.decode(errors="replace")
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import collections
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional
+
+import tracing
+
+from .capture import run_captured
+from .code_executor import format_result, language_command
+
+# the limits are applied by the shell's ulimit before it execs the code, so the spawn stays safe in a threaded agent.
+# the CPU soft limit sends the SIGXCPU, and the hard limit a second later the SIGKILL
+LIMITS_WRAPPER = (
+    "ulimit -S -H -v {memory} -n {files} -u {processes} -f {file_size} -t {cpu_hard} "
+    '&& ulimit -S -t {cpu} && exec "$@"'
+)
+
+# the signals of the exceeded limits, the memory limit fails the allocation instead, e.g. a MemoryError in python
+LIMIT_SIGNALS = {
+    signal.SIGXCPU: "the CPU time limit",
+    signal.SIGXFSZ: "the file size limit",
+}
+
+
+@dataclass
+class SandboxRun:
+    language: str
+    wait_ms: float  # the time queued behind the other executions
+    runtime_ms: float
+    exit_code: Optional[int]
+    timed_out: bool = False
+    rejected: bool = False  # still queued once the queue timeout passed
+
+
+class SandboxExecutor:
+    """
+    Run each code in a fresh process with resource limits and a scratch working directory, and cap the executions
+    running at once across all the agents sharing the executor, the others wait in a queue. The queue wait and the
+    runtime of each call are recorded in the runs and on a "sandbox.exec" span.
+
+    The limits are the plain rlimits of the process (CPU seconds, address space, open files, processes, file size),
+    it's not an isolation against hostile code: the files outside the scratch directory and the network are reachable.
+    The process count limit is per user, so it counts the other processes of the agent's user and root ignores it.
+
+    Example:
+        sandbox = SandboxExecutor(max_concurrency=4, memory_mb=1024)
+        agent = Agent(..., tools=[sandbox.code_executor])
+        ...
+        print(sandbox.runs[-1])
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        queue_timeout: float = None,
+        timeout: float = 120,
+        cpu_seconds: int = 60,
+        memory_mb: int = 1024,
+        max_open_files: int = 256,
+        max_processes: int = 256,
+        max_file_mb: int = 256,
+        scratch_root: str = None,
+        keep_runs: int = 1000,
+    ):
+        """
+        Args:
+            max_concurrency (int): The executions running at once.
+            queue_timeout (float): The seconds a call waits for its turn before it's rejected, None to wait forever.
+            timeout (float): The wall clock seconds an execution may run, e.g. a sleep uses no CPU.
+            cpu_seconds (int): The CPU seconds of an execution.
+            memory_mb (int): The address space of each process, the node runtime reserves a few GB of it.
+            max_open_files (int): The open file descriptors of each process.
+            max_processes (int): The processes of the user, see the note above.
+            max_file_mb (int): The size of each file written.
+            scratch_root (str): The directory of the scratch directories, the system temp directory by default.
+            keep_runs (int): The recent runs kept in the runs.
+        """
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._queue_timeout = queue_timeout
+        self._timeout = timeout
+        self._scratch_root = scratch_root
+        self._limits = LIMITS_WRAPPER.format(
+            cpu=cpu_seconds,
+            cpu_hard=cpu_seconds + 1,
+            memory=memory_mb * 1024,
+            files=max_open_files,
+            processes=max_processes,
+            file_size=max_file_mb * 1024,
+        )
+        self._lock = threading.Lock()
+        self.runs: Deque[SandboxRun] = collections.deque(maxlen=keep_runs)
+        self.waiting = 0
+
+    def code_executor(self, language: str, code: str) -> str:
+        """
+        The code_executor executes code or bash command based on the specified programming language: 'python', 'bash', 'nodejs'.
+
+        Args:
+            language (str): The programming language in which the code is written ('python', 'bash', 'nodejs').
+            code (str): The actual code to be executed as a string. Like shell command(kubectl, oc, ...), python code, and nodejs code.
+
+        Returns:
+            str: The result of the code execution or an error message.
+        """
+        argv = language_command(language, code)
+        if argv is None:
+            return "Unsupported language. Please specify 'python', 'bash', or 'nodejs'."
+
+        with tracing.span("sandbox.exec", language=language) as span:
+            queued = time.perf_counter()
+            with self._lock:
+                self.waiting += 1
+            acquired = self._slots.acquire(timeout=self._queue_timeout)
+            with self._lock:
+                self.waiting -= 1
+            wait_ms = (time.perf_counter() - queued) * 1000
+            if not acquired:
+                self._record(span, SandboxRun(language, wait_ms, 0, None, rejected=True))
+                return f"The sandbox is busy, the execution waited {wait_ms / 1000:.1f}s in the queue and was not run."
+
+            scratch = tempfile.mkdtemp(prefix="sandbox-", dir=self._scratch_root)
+            try:
+                started = time.perf_counter()
+                result = run_captured(
+                    ["bash", "-c", self._limits, "sandbox", *argv],
+                    timeout=self._timeout,
+                    cwd=scratch,
+                    env=self._env(scratch),
+                )
+                runtime_ms = (time.perf_counter() - started) * 1000
+            finally:
+                self._slots.release()
+                shutil.rmtree(scratch, ignore_errors=True)
+
+            self._record(
+                span,
+                SandboxRun(language, wait_ms, runtime_ms, result.exit_code, result.timed_out),
+            )
+            output = format_result(result)
+            if result.exit_code is not None and -result.exit_code in LIMIT_SIGNALS:
+                output += f"\n[killed by {LIMIT_SIGNALS[-result.exit_code]}]"
+            return output
+
+    def stats(self) -> Dict[str, float]:
+        """The totals of the recent runs."""
+        runs = list(self.runs)
+        executed = [run for run in runs if not run.rejected]
+        return {
+            "runs": len(runs),
+            "rejected": len(runs) - len(executed),
+            "timed_out": sum(run.timed_out for run in executed),
+            "waiting": self.waiting,
+            "max_wait_ms": max((run.wait_ms for run in runs), default=0),
+            "mean_runtime_ms": (
+                sum(run.runtime_ms for run in executed) / len(executed) if executed else 0
+            ),
+        }
+
+    def _env(self, scratch: str) -> Dict[str, str]:
+        # the temp files of the code go to the scratch directory, the HOME is kept for the ~/.kube/config of kubectl
+        return {**os.environ, "TMPDIR": scratch}
+
+    def _record(self, span, run: SandboxRun):
+        span.set_attributes(wait_ms=run.wait_ms, runtime_ms=run.runtime_ms)
+        if run.exit_code is not None:
+            span.set_attribute("exit_code", run.exit_code)
+        span.set_attributes(timed_out=run.timed_out, rejected=run.rejected)
+        self.runs.append(run)
@@ -59,6 +59,3 @@ def google(keyword: str) -> str:
     except Exception as e:
         # Return a detailed error message if an exception occurs
         return f"An error occurred: {str(e)}"
-
-
-google("when was the chinese academy of sciences founded?")
@@ -0,0 +1,5 @@
+from .span import Span, NoopSpan, current_span
+from .tracer import Tracer, get_tracer, set_tracer, span, usage_attributes
+from .exporter import SpanExporter, JsonlExporter, OtlpJsonExporter, InMemoryExporter
+
+__all__ = [name for name in globals() if not name.startswith("_")]
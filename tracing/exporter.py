@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+from typing import Any, Dict, List, Protocol
+
+from .span import Span
+
+
+class SpanExporter(Protocol):
+    def export(self, span: Span) -> None: ...
+
+    def shutdown(self) -> None: ...
+
+
+class _FileExporter:
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def _write(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def shutdown(self):
+        with self._lock:
+            self._file.close()
+
+
+class JsonlExporter(_FileExporter):
+    """Append each ended span as a json line, e.g. to be queried by `jq` after a slow session."""
+
+    def export(self, span: Span):
+        self._write(span.to_dict())
+
+
+class OtlpJsonExporter(_FileExporter):
+    """
+    Append each ended span as a line of the OTLP/JSON ExportTraceServiceRequest, the format read by the
+    OpenTelemetry Collector `otlpjsonfile` receiver and accepted by the OTLP/HTTP `/v1/traces` endpoints.
+    """
+
+    def __init__(self, path: str, service_name: str = "agent"):
+        super().__init__(path)
+        self._resource = {
+            "attributes": [_otlp_attribute("service.name", service_name)]
+        }
+
+    def export(self, span: Span):
+        otlp_span = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_time),
+            "endTimeUnixNano": str(span.end_time),
+            "attributes": [
+                _otlp_attribute(key, value) for key, value in span.attributes.items()
+            ],
+            # STATUS_CODE_OK or STATUS_CODE_ERROR
+            "status": {"code": 2 if span.status == "error" else 1},
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        self._write(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": self._resource,
+                        "scopeSpans": [
+                            {"scope": {"name": "agent"}, "spans": [otlp_span]}
+                        ],
+                    }
+                ]
+            }
+        )
+
+
+class InMemoryExporter:
+    """Keep the ended spans in a list, for the benchmarks and the notebooks."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def shutdown(self):
+        pass
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": f"{value}"}}
@@ -0,0 +1,104 @@
+import random
+import time
+from contextvars import ContextVar
+from typing import Any, Dict
+
+# the innermost open span of the current thread or asyncio task
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    A timed operation of the agent, like thinking or a tool call, nested in the span open when it starts. It's used
+    as a context manager: the end time is taken on exit and an exception marks the span as an error.
+    """
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_time",
+        "end_time",
+        "attributes",
+        "status",
+        "_tracer",
+        "_token",
+    )
+
+    def __init__(self, tracer, name: str, attributes: Dict[str, Any]):
+        parent = _current_span.get()
+        self.name = name
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.start_time = 0  # unix nanoseconds
+        self.end_time = 0
+        self.attributes = attributes
+        self.status = "ok"
+        self._tracer = tracer
+        self._token = None
+
+    @property
+    def duration(self) -> float:
+        """The seconds from the start to the end of the span."""
+        return (self.end_time - self.start_time) / 1e9
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration": self.duration,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        self.start_time = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_time = time.time_ns()
+        if exc is not None:
+            self.status = "error"
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        self._tracer.export(self)
+        return False
+
+
+class NoopSpan:
+    """The span returned when the tracing is disabled, it records nothing."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def __enter__(self) -> "NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = NoopSpan()
+
+
+def current_span() -> Span | NoopSpan:
+    span = _current_span.get()
+    return span if span is not None else NOOP_SPAN
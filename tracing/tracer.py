@@ -0,0 +1,66 @@
+from typing import Any
+
+from .exporter import SpanExporter
+from .span import NOOP_SPAN, NoopSpan, Span
+
+
+class Tracer:
+    """
+    Create the spans and hand the ended ones to the exporter. Without an exporter the tracer is disabled and every
+    span is the shared no-op one, so the instrumented agent pays only a function call per step.
+
+    Example:
+        tracing.set_tracer(Tracer(JsonlExporter("./traces/session.jsonl")))
+        agent.run("why is the cluster unknown?")
+    """
+
+    def __init__(self, exporter: SpanExporter | None = None):
+        self._exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self._exporter is not None
+
+    def span(self, name: str, **attributes: Any) -> Span | NoopSpan:
+        if self._exporter is None:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def export(self, span: Span):
+        try:
+            self._exporter.export(span)
+        except Exception as e:
+            # the tracing never breaks the agent
+            print(f"failed to export the span {span.name}: {e}")
+
+    def shutdown(self):
+        if self._exporter is not None:
+            self._exporter.shutdown()
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def set_tracer(tracer: Tracer):
+    global _tracer
+    _tracer = tracer
+
+
+def span(name: str, **attributes: Any) -> Span | NoopSpan:
+    """Open a span on the global tracer, nested in the current one."""
+    return _tracer.span(name, **attributes)
+
+
+def usage_attributes(usage) -> dict:
+    """The token counts of the openai CompletionUsage, empty if the client didn't report it."""
+    if usage is None:
+        return {}
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+    }
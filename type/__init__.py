@@ -1,4 +1,10 @@
 from .chat_message import ChatMessage, ChatAction
-from .chat_client import ChatBinaryClient, ChatStructuredClient, ChatClient
+from .chat_client import (
+    ChatBinaryClient,
+    ChatStructuredClient,
+    ChatClient,
+    AsyncChatBinaryClient,
+)
 from .status_code import StatusCode
 from .action_permission import ActionPermission
+from .tool_error import ToolError
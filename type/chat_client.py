@@ -3,7 +3,8 @@ from openai.types.chat import (
     ChatCompletionMessageParam,
     ChatCompletionToolParam,
 )
-from typing import Protocol, runtime_checkable, Iterable, Union
+from typing import Protocol, runtime_checkable, Iterable, Union, Tuple
+from pydantic import BaseModel
 from .chat_message import ChatMessage
 from typing_extensions import TypeAlias
 
@@ -29,6 +30,18 @@ class ChatStructuredClient(Protocol):
         ...
 
 
+@runtime_checkable
+class AsyncChatBinaryClient(Protocol):
+    async def __call__(
+        self,
+        messages: Iterable[ChatCompletionMessageParam],
+        tools: Iterable[ChatCompletionToolParam],
+        response_model: BaseModel = None,
+    ) -> Tuple[ChatCompletionMessage, float | str]:
+        """the awaitable counterpart of the client invoked by Agent.arun, return the assistant message and the total price"""
+        ...
+
+
 ChatClient: TypeAlias = Union[
     ChatBinaryClient,
     ChatStructuredClient,
@@ -0,0 +1,4 @@
+class ToolError(str):
+    """
+    The output of a failed tool call. It's observed by the model like any other result, but the caches never keep it.
+    """